@@ -0,0 +1,344 @@
+"""Reproduzierbarer Benchmark für object_search.py.
+
+Erzeugt synthetische Testvideos (ffmpeg lavfi, verschiedene Auflösungen/Codecs/Längen)
+mit einer roten Testfläche zu bekannten Zeitpunkten und scannt sie mit einem
+deterministischen Ersatz-Detektor über dieselbe Schnittstelle wie YOLO. Läuft offline
+auf CPU; Ergebnisse (JSON) sind über --compare zwischen Commits vergleichbar.
+
+Beispiel:
+    python benchmark.py --preset quick --export --merge --out bench_main.json
+    python benchmark.py --preset quick --export --merge --compare bench_main.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+import object_search
+
+# ------------------------
+# Testvideos
+# ------------------------
+# (Breite, Höhe, Codec, Sekunden); Codec = Name des ffmpeg-Encoders
+PRESETS = {
+    "quick": [
+        (640, 360, "libx264", 10),
+        (1280, 720, "libx264", 10),
+        (1280, 720, "mpeg4", 10),
+    ],
+    "full": [
+        (w, h, codec, secs)
+        for w, h in ((640, 360), (1280, 720), (1920, 1080))
+        for codec in ("libx264", "libx265", "mpeg4")
+        for secs in (10, 60)
+    ],
+}
+BENCH_FPS = 25
+# Klasse, die der Ersatz-Detektor für die rote Fläche meldet (0 = person)
+STUB_CLASS = 0
+
+
+def object_windows(secs):
+    """Bekannte Zeitfenster (Start, Ende in s) der Testfläche: ganzzahlige Starts,
+    Abstand größer als --cluster-gap + --post, damit jede Fläche eine eigene Szene ist."""
+    return [(int(secs * 0.2), int(secs * 0.2) + 1), (int(secs * 0.6), int(secs * 0.6) + 1)]
+
+
+def spec_name(spec):
+    w, h, codec, secs = spec
+    return f"{w}x{h}_{codec}_{secs}s"
+
+
+def available_encoders():
+    try:
+        out = subprocess.check_output(["ffmpeg", "-hide_banner", "-encoders"], stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError):
+        return set()
+    names = set()
+    for line in out.decode("utf-8", "replace").splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].startswith("V"):
+            names.add(parts[1])
+    return names
+
+
+def make_video(spec, video_dir):
+    """Erzeugt das Testvideo einmalig (Cache über den Dateinamen) und liefert den Pfad.
+    Grauer Hintergrund mit festem Rauschen (Seed), damit der Encoder realistisch arbeitet."""
+    w, h, codec, secs = spec
+    path = os.path.join(video_dir, spec_name(spec) + ".mp4")
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        return path
+    os.makedirs(video_dir, exist_ok=True)
+    boxes = ",".join(
+        f"drawbox=x={w // 4}:y={h // 4}:w={w // 6}:h={h // 5}:color=red:t=fill"
+        f":enable='between(t,{start},{end})'"
+        for start, end in object_windows(secs)
+    )
+    tmp = path + ".tmp.mp4"
+    subprocess.run([
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", f"color=c=0x404040:s={w}x{h}:r={BENCH_FPS}:d={secs}",
+        "-vf", f"noise=alls=12:allf=t+u:all_seed=42,{boxes}",
+        "-c:v", codec, "-pix_fmt", "yuv420p", "-g", str(2 * BENCH_FPS), "-threads", "1",
+        tmp
+    ], check=True)
+    os.replace(tmp, path)
+    return path
+
+# ------------------------
+# Ersatz-Detektor (gleiche Schnittstelle wie ultralytics.YOLO)
+# ------------------------
+class StubBoxes:
+    """Minimaler Ersatz für results.boxes (xyxy/cls/conf mit .tolist(), len())."""
+
+    def __init__(self, rows):
+        arr = np.array(rows, dtype=np.float32).reshape(-1, 6)
+        self.xyxy = arr[:, :4]
+        self.conf = arr[:, 4]
+        self.cls = arr[:, 5]
+
+    def __len__(self):
+        return len(self.xyxy)
+
+
+class StubResult:
+    def __init__(self, rows, speed):
+        self.boxes = StubBoxes(rows)
+        self.speed = speed
+
+
+class StubDetector:
+    """Deterministischer Detektor: meldet die rote Testfläche per Farbschwelle als STUB_CLASS.
+    'cost_ms' simuliert zusätzlich eine feste Modell-Latenz pro Frame."""
+
+    def __init__(self, cost_ms=0.0, score=0.9):
+        self.cost_ms = cost_ms
+        self.score = score
+
+    def __call__(self, source, classes=None, conf=0.25, verbose=False):
+        frames = source if isinstance(source, list) else [source]
+        results = []
+        for frame in frames:
+            t0 = time.perf_counter()
+            rows = []
+            if (classes is None or STUB_CLASS in classes) and self.score >= conf:
+                # Jeder 4. Pixel genügt für die Fläche und hält den Detektor billig
+                small = frame[::4, ::4]
+                mask = (small[..., 2] > 180) & (small[..., 1] < 80) & (small[..., 0] < 80)
+                if mask.any():
+                    ys, xs = np.nonzero(mask)
+                    rows.append((xs.min() * 4, ys.min() * 4, xs.max() * 4 + 3, ys.max() * 4 + 3,
+                                 self.score, STUB_CLASS))
+            if self.cost_ms > 0:
+                time.sleep(self.cost_ms / 1000.0)
+            ms = 1000.0 * (time.perf_counter() - t0)
+            results.append(StubResult(rows, {"preprocess": 0.0, "inference": ms, "postprocess": 0.0}))
+        return results
+
+# ------------------------
+# Messung
+# ------------------------
+def peak_rss_mb():
+    """Spitzen-RSS (MB) dieses Prozesses und der beendeten Kindprozesse (ffmpeg), sofern verfügbar."""
+    try:
+        import resource
+    except ImportError:
+        return None, None
+    # Linux: KiB, macOS: Byte
+    unit = 1024.0 * 1024.0 if sys.platform == "darwin" else 1024.0
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit
+    child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit
+    return round(self_rss, 1), round(child_rss, 1)
+
+
+def git_commit():
+    try:
+        rev = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                      stderr=subprocess.DEVNULL).decode().strip()
+        dirty = subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"],
+                                        stderr=subprocess.DEVNULL).decode().strip()
+        return rev + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def median(values):
+    values = sorted(values)
+    n = len(values)
+    if not n:
+        return 0.0
+    return values[n // 2] if n % 2 else 0.5 * (values[n // 2 - 1] + values[n // 2])
+
+
+def expected_log(path, secs):
+    stamps = [f"{start // 60:02d}:{start % 60:02d}" for start, _ in object_windows(secs)]
+    return f"{path}: {', '.join(stamps)}"
+
+
+def bench_video(path, spec, detector, args, export_dir):
+    """Scannt (und exportiert) ein Testvideo args.repeat-mal; Kennzahlen als Median."""
+    runs = []
+    clips = []
+    log_line = ""
+    for _ in range(args.repeat):
+        shutil.rmtree(export_dir, ignore_errors=True)
+        metrics = object_search.Metrics()
+        log = io.StringIO()
+        t0 = time.perf_counter()
+        clips = object_search.process_video(
+            path, detector, [STUB_CLASS], log,
+            export=args.export, export_dir=export_dir, quiet=True, progress=False,
+            confidence=0.5, no_boxes=args.no_boxes, cut_mode=args.cut_mode,
+            batch_size=args.batch_size, decode_queue=args.decode_queue,
+            decoder=args.decoder, decode_width=args.decode_width,
+            sample_fps=args.sample_fps, detect_every=args.detect_every, metrics=metrics
+        )
+        wall = time.perf_counter() - t0
+        stages = metrics.to_dict()
+        # Export läuft parallel zum Scan im Export-Thread (Stufe export_job); ohne Thread
+        # (Stichproben-Scan) im Abschluss 'finalize'. Scanzeit = Scan-Schleife selbst.
+        export_s = stages.get("export_job", {}).get("sum", 0.0) or stages.get("finalize", {}).get("sum", 0.0)
+        frames = stages.get("decode", {}).get("items", 0)
+        scan_s = stages.get("scan", {}).get("sum", 0.0) or wall - export_s
+        runs.append({"wall": wall, "scan": scan_s, "export": export_s, "frames": frames,
+                     "fps": frames / scan_s if scan_s > 0 else 0.0})
+        log_line = log.getvalue().strip()
+    return {
+        "video": spec_name(spec),
+        "frames": runs[-1]["frames"],
+        "scan_seconds": round(median([r["scan"] for r in runs]), 4),
+        "scan_fps": round(median([r["fps"] for r in runs]), 2),
+        "export_seconds": round(median([r["export"] for r in runs]), 4),
+        # Scan und Export überlappen → Gesamtzeit getrennt ausweisen
+        "wall_seconds": round(median([r["wall"] for r in runs]), 4),
+        "clips": len(clips),
+        # Ersatz-Detektor + bekannte Zeitfenster → Logzeile muss exakt stimmen
+        "scenes_ok": log_line == expected_log(path, spec[3]),
+    }, clips
+
+
+def print_report(report, baseline=None):
+    base = {v["video"]: v for v in (baseline or {}).get("videos", [])}
+    print(f"\nCommit {report['commit']} | Preset {report['preset']} | Wiederholungen {report['settings']['repeat']}")
+    print(f"{'Video':<26}{'Frames':>8}{'Scan s':>10}{'fps':>10}{'Export s':>10}{'Clips':>7}  OK")
+    for v in report["videos"]:
+        delta = ""
+        old = base.get(v["video"])
+        if old and old["scan_fps"]:
+            delta = f"  ({100.0 * (v['scan_fps'] / old['scan_fps'] - 1):+.1f}% fps)"
+        print(f"{v['video']:<26}{v['frames']:>8}{v['scan_seconds']:>10.3f}{v['scan_fps']:>10.1f}"
+              f"{v['export_seconds']:>10.3f}{v['clips']:>7}  {'ja' if v['scenes_ok'] else 'NEIN'}{delta}")
+    if report["merge_seconds"] is not None:
+        line = f"Merge: {report['merge_seconds']:.3f}s"
+        if baseline and baseline.get("merge_seconds"):
+            line += f"  ({100.0 * (report['merge_seconds'] / baseline['merge_seconds'] - 1):+.1f}%)"
+        print(line)
+    print(f"Peak RSS: {report['peak_rss_mb']} MB (Kindprozesse: {report['peak_rss_children_mb']} MB)")
+    if baseline:
+        print(f"Vergleich mit Commit {baseline.get('commit')}")
+
+# ------------------------
+# CLI
+# ------------------------
+def build_argparser():
+    parser = argparse.ArgumentParser(description="Benchmark mit synthetischen Videos und Ersatz-Detektor")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="quick")
+    parser.add_argument("--workdir", default=".bench",
+                        help="Ordner für Testvideos (wiederverwendet) und Exporte")
+    parser.add_argument("--repeat", type=int, default=3, help="Wiederholungen pro Video (Median)")
+    parser.add_argument("--stub-ms", type=float, default=0.0,
+                        help="Simulierte Modell-Latenz pro Frame in ms (Default 0)")
+    parser.add_argument("--export", action="store_true", help="Szenen exportieren und Exportzeit messen")
+    parser.add_argument("--merge", action="store_true", help="Exportierte Clips mergen und Merge-Zeit messen")
+    parser.add_argument("--no-boxes", action="store_true")
+    parser.add_argument("--cut-mode", choices=["encode", "copy", "smart"], default="encode")
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--decode-queue", type=int, default=0)
+    parser.add_argument("--decoder", choices=["opencv", "ffmpeg"], default="opencv")
+    parser.add_argument("--decode-width", type=int, default=0)
+    parser.add_argument("--sample-fps", type=float)
+    parser.add_argument("--detect-every", type=int, default=1)
+    parser.add_argument("--out", help="Ergebnis als JSON speichern")
+    parser.add_argument("--compare", help="Früheres JSON-Ergebnis zum Vergleich")
+    return parser
+
+
+def main():
+    args = build_argparser().parse_args()
+    if args.merge and not args.export:
+        print("[!] --merge benötigt --export.")
+        return
+    encoders = available_encoders()
+    if not encoders:
+        print("[!] ffmpeg nicht gefunden – Testvideos können nicht erzeugt werden.")
+        return
+    specs = [s for s in PRESETS[args.preset] if s[2] in encoders]
+    skipped = [spec_name(s) for s in PRESETS[args.preset] if s[2] not in encoders]
+    if skipped:
+        print(f"[i] Encoder fehlt, übersprungen: {', '.join(skipped)}")
+
+    video_dir = os.path.join(args.workdir, "videos")
+    print(f"[i] Erzeuge/verwende {len(specs)} Testvideos in {video_dir}")
+    paths = [make_video(spec, video_dir) for spec in specs]
+
+    detector = StubDetector(cost_ms=args.stub_ms)
+    export_root = os.path.join(args.workdir, "export")
+    videos, all_clips = [], []
+    for spec, path in zip(specs, paths):
+        result, clips = bench_video(path, spec, detector, args, os.path.join(export_root, spec_name(spec)))
+        videos.append(result)
+        all_clips.extend(clips)
+
+    merge_seconds = None
+    if args.merge and all_clips:
+        merge_dir = os.path.join(export_root, "merge")
+        shutil.rmtree(merge_dir, ignore_errors=True)
+        os.makedirs(merge_dir)
+        t0 = time.perf_counter()
+        object_search.merge_clips(all_clips, os.path.join(merge_dir, "highlights.mp4"),
+                                  export_dir=merge_dir, quiet=True)
+        merge_seconds = round(time.perf_counter() - t0, 4)
+
+    rss, rss_children = peak_rss_mb()
+    report = {
+        "commit": git_commit(),
+        "preset": args.preset,
+        "host": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "opencv": cv2.__version__,
+        },
+        "settings": {k: getattr(args, k) for k in (
+            "repeat", "stub_ms", "export", "merge", "no_boxes", "cut_mode", "batch_size",
+            "decode_queue", "decoder", "decode_width", "sample_fps", "detect_every")},
+        "videos": videos,
+        "merge_seconds": merge_seconds,
+        "peak_rss_mb": rss,
+        "peak_rss_children_mb": rss_children,
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("settings") != report["settings"]:
+            print("[!] Vergleichslauf hat andere Einstellungen – Werte nur bedingt vergleichbar.")
+    print_report(report, baseline)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[✓] Ergebnis gespeichert: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
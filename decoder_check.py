@@ -0,0 +1,120 @@
+"""Prüft, dass --decoder ffmpeg jedem Frame-Index die richtigen Pixel zuordnet.
+
+FFmpegCapture liefert Frames aus einem Ring vorab allokierter Puffer; Frames, die im Batch auf
+das Modell warten, dürfen nicht überschrieben werden – auch nicht, wenn das Motion-Gate oder
+--detect-every dazwischen Frames ohne Inferenz lesen. Das Testvideo zeigt eine rote Fläche, die
+alle STEP_FRAMES Frames um STEP_PX Pixel springt; aus der gemeldeten Box-Position lässt sich also
+ablesen, aus welchem Abschnitt die ausgewerteten Pixel stammen. Geprüft wird über den
+Detektionsindex (--index-db), dass jeder ausgewertete Frame die Box seines eigenen Abschnitts
+trägt – einmal ohne, einmal mit Motion-Gate und mit --detect-every, jeweils mit Batching.
+
+Beispiel:
+    python decoder_check.py
+"""
+import argparse
+import io
+import os
+import shutil
+import subprocess
+import sys
+
+import benchmark
+import object_search
+
+CHECK_FPS = 25
+CHECK_SECONDS = 8
+# Sprungweite der Testfläche: alle STEP_FRAMES Frames um STEP_PX nach rechts
+STEP_FRAMES = 10
+STEP_PX = 12
+X0, Y0 = 8, 72
+
+
+def make_step_video(video_dir):
+    """Statischer schwarzer Hintergrund mit springender Fläche. Kein Rauschen und genug Helligkeits-
+    abstand (Rot ≈ 76 Graustufen über Schwarz, mehr als MotionGate.pixel_delta), damit das
+    Motion-Gate jeden Sprung sieht; auf dem Grau von benchmark.py bliebe Rot unter der Schwelle."""
+    path = os.path.join(video_dir, "step_black_320x180.mp4")
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        return path
+    os.makedirs(video_dir, exist_ok=True)
+    tmp = path + ".tmp.mp4"
+    subprocess.run([
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", f"color=c=black:s=320x180:r={CHECK_FPS}:d={CHECK_SECONDS}",
+        "-f", "lavfi", "-i", f"color=c=red:s=24x36:r={CHECK_FPS}:d={CHECK_SECONDS}",
+        "-filter_complex", f"[0][1]overlay=x='{X0}+{STEP_PX}*floor(n/{STEP_FRAMES})':y={Y0}",
+        "-c:v", "libx264", "-pix_fmt", "yuv420p", "-g", str(2 * CHECK_FPS), "-threads", "1",
+        tmp
+    ], check=True)
+    os.replace(tmp, path)
+    return path
+
+
+def scan(path, index_db, **kwargs):
+    """Scannt mit dem ffmpeg-Decoder in einen frischen Index; liefert {Frame: Abschnitt der Box}."""
+    if os.path.exists(index_db):
+        os.remove(index_db)
+    object_search.process_video(
+        path, benchmark.StubDetector(), [benchmark.STUB_CLASS], io.StringIO(),
+        confidence=0.5, quiet=True, progress=False, decoder="ffmpeg", index_db=index_db, **kwargs
+    )
+    index = object_search.DetectionIndex(index_db)
+    try:
+        video = index.videos()[0]
+        boxes = index.load(video, [benchmark.STUB_CLASS], 0.5)
+    finally:
+        index.close()
+    return {frame: round((frame_boxes[0][0] - X0) / STEP_PX)
+            for frame, frame_boxes in ((f, boxes.get(f)) for f in range(CHECK_FPS * CHECK_SECONDS))
+            if frame_boxes}
+
+
+def check(args):
+    shutil.rmtree(os.path.join(args.workdir, "index"), ignore_errors=True)
+    os.makedirs(os.path.join(args.workdir, "index"))
+    path = make_step_video(os.path.join(args.workdir, "videos"))
+    total = CHECK_FPS * CHECK_SECONDS
+    runs = [
+        # (Name, Scan-Parameter, ausgewertete Frames)
+        ("Referenz", {}, range(total)),
+        ("Motion-Gate", {"motion_threshold": 0.002}, range(total)),
+        ("Detect-Every", {"detect_every": args.detect_every}, range(0, total, args.detect_every)),
+    ]
+    ok = True
+    for name, kwargs, frames in runs:
+        got = scan(path, os.path.join(args.workdir, "index", name.lower() + ".db"),
+                   batch_size=args.batch_size, decode_queue=args.decode_queue, **kwargs)
+        # Ohne Inferenz übernommene Frames (Motion-Gate) liegen im selben Abschnitt wie der
+        # zuletzt ausgewertete → jeder Frame muss die Box seines eigenen Abschnitts tragen
+        wrong = [f for f in frames if got.get(f) != f // STEP_FRAMES]
+        if wrong:
+            print(f"[!] {name}: {len(wrong)} Frames mit fremden Pixeln, z. B. Frame {wrong[0]} "
+                  f"→ Abschnitt {got.get(wrong[0])} statt {wrong[0] // STEP_FRAMES}")
+            ok = False
+        else:
+            print(f"[i] {name}: {len(frames)} Frames korrekt zugeordnet")
+    print("[✓] ffmpeg-Decoder ok" if ok else "[!] ffmpeg-Decoder fehlerhaft")
+    return ok
+
+# ------------------------
+# CLI
+# ------------------------
+def build_argparser():
+    parser = argparse.ArgumentParser(description="Frame-Zuordnung des ffmpeg-Decoders mit Ersatz-Detektor prüfen")
+    parser.add_argument("--workdir", default=".bench/decoder_check")
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--decode-queue", type=int, default=0)
+    parser.add_argument("--detect-every", type=int, default=5)
+    return parser
+
+
+def main():
+    args = build_argparser().parse_args()
+    if "libx264" not in benchmark.available_encoders():
+        print("[!] ffmpeg mit libx264 nicht gefunden – Testvideo kann nicht erzeugt werden.")
+        sys.exit(2)
+    sys.exit(0 if check(args) else 1)
+
+
+if __name__ == "__main__":
+    main()
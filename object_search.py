@@ -1,9 +1,27 @@
 import argparse
 import cv2
+import io
+import numpy as np
 import os
 import time
 import subprocess
 import sys
+import json
+import queue
+import select
+import sqlite3
+import struct
+import threading
+import base64
+import bisect
+import functools
+import hashlib
+import shutil
+import socket
+import tempfile
+from array import array
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from ultralytics import YOLO
 from tqdm import tqdm
 from contextlib import contextmanager
@@ -124,15 +142,484 @@ except ImportError:
 # ------------------------
 # Dateisuche
 # ------------------------
-def find_videos(root_dir, extensions: str):
-    """Suche rekursiv nach Videodateien. 'extensions' ist eine Komma-Liste ohne Punkte, z. B. 'mp4,mov'."""
+def _scan_dir(dirpath, exts):
+    """Ein Verzeichnis per os.scandir lesen → ([(path, (size, mtime_ns, inode))], [subdirs])."""
+    files, subdirs = [], []
+    try:
+        with os.scandir(dirpath) as it:
+            for entry in it:
+                try:
+                    # Wie os.walk: Symlinks auf Verzeichnisse werden nicht verfolgt
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.name.lower().endswith(exts):
+                        st = entry.stat()
+                        files.append((entry.path, (st.st_size, st.st_mtime_ns, st.st_ino)))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return files, subdirs
+
+
+def scan_videos(root_dir, extensions: str, jobs=1):
+    """Suche rekursiv nach Videodateien inkl. Stat-Signatur (size, mtime_ns, inode).
+    Mit jobs > 1 werden Verzeichnisse parallel gelesen (lohnt sich v. a. auf NFS/SMB).
+    Liefert eine nach Pfad sortierte Liste [(path, sig), ...]."""
     exts = tuple("." + e.strip().lower() for e in extensions.split(",") if e.strip())
-    video_files = []
-    for dirpath, _, filenames in os.walk(root_dir):
-        for f in filenames:
-            if f.lower().endswith(exts):
-                video_files.append(os.path.join(dirpath, f))
-    return video_files
+    results = []
+    if jobs <= 1:
+        stack = [root_dir]
+        while stack:
+            files, subdirs = _scan_dir(stack.pop(), exts)
+            results.extend(files)
+            stack.extend(subdirs)
+    else:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            pending = {pool.submit(_scan_dir, root_dir, exts)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    files, subdirs = fut.result()
+                    results.extend(files)
+                    pending.update(pool.submit(_scan_dir, d, exts) for d in subdirs)
+    results.sort()
+    return results
+
+# ------------------------
+# Datei-Manifest (inkrementelle Rescans)
+# ------------------------
+class VideoManifest:
+    """Append-only JSON-Lines-Datei mit (size, mtime_ns, inode) je fertig verarbeitetem Video.
+    Der letzte Eintrag pro Pfad gilt; eine abgebrochene letzte Zeile wird ignoriert.
+    Beim Laden wird kompaktiert (ein Eintrag pro Pfad), wenn überholte oder kaputte Zeilen da sind."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._torn = False
+        lines = 0
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    lines += 1
+                    self._torn = not line.endswith("\n")
+                    try:
+                        rec = json.loads(line)
+                        self.entries[rec["path"]] = tuple(rec["sig"])
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        if lines > len(self.entries):
+            self.compact()
+
+    def compact(self):
+        """Datei atomar mit dem letzten Eintrag pro Pfad neu schreiben."""
+        write_text_atomic(self.path, "".join(
+            json.dumps({"path": path, "sig": list(sig)}) + "\n" for path, sig in self.entries.items()))
+        self._torn = False
+
+    def changed(self, path, sig):
+        """True, wenn das Video unbekannt ist oder sich Größe/mtime/Inode geändert haben."""
+        return self.entries.get(path) != tuple(sig)
+
+    def record(self, path, sig):
+        self.entries[path] = tuple(sig)
+        with open(self.path, "a", encoding="utf-8") as f:
+            if self._torn:
+                # Abgebrochene letzte Zeile abschließen, sonst verklebt der neue Eintrag
+                f.write("\n")
+                self._torn = False
+            f.write(json.dumps({"path": path, "sig": list(sig)}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def clear(self):
+        self.entries = {}
+        self._torn = False
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def drop_log_lines(log_path, paths):
+    """Entfernt die Logzeilen der Videos in 'paths' (atomar neu geschrieben)."""
+    with open(log_path, "r", encoding="utf-8") as f:
+        lines = [line for line in f
+                 if ": " not in line or line.rstrip("\n").rsplit(": ", 1)[0] not in paths]
+    write_text_atomic(log_path, "".join(lines))
+
+
+def is_settled(sig, settle_seconds, now=None):
+    """False, solange die Datei jünger als 'settle_seconds' ist (Recorder schreibt evtl. noch)."""
+    if settle_seconds <= 0:
+        return True
+    now = time.time() if now is None else now
+    return now - sig[1] / 1e9 >= settle_seconds
+
+# ------------------------
+# Watch-Modus: neue, fertig geschriebene Videos erkennen
+# ------------------------
+class InotifyWatcher:
+    """Rekursive Verzeichnisüberwachung per inotify (Linux, über ctypes ohne Zusatzpaket).
+    poll(timeout) liefert (Pfade, geschlossen) der seit dem letzten Aufruf geschriebenen
+    bzw. hineinverschobenen Dateien, oder None bei Queue-Überlauf (→ kompletter Rescan).
+    Ordner, deren Watch nicht angelegt werden kann, landen in 'failed' statt abzubrechen."""
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    _MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, root):
+        import ctypes
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify nicht verfügbar")
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 fehlgeschlagen")
+        self._dirs = {}
+        self.failed = []  # [(Ordner, OSError)] ohne Watch seit der letzten Abfrage
+        self._get_errno = ctypes.get_errno
+        self.add_tree(root)
+
+    def add_tree(self, root):
+        """Beobachtet root und alle Unterordner; liefert die darin schon vorhandenen Dateien."""
+        files = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(dirpath), self._MASK)
+            if wd < 0:
+                # Meist fs.inotify.max_user_watches erschöpft (ENOSPC) oder Ordner schon wieder weg
+                err = self._get_errno()
+                self.failed.append((dirpath, OSError(err, os.strerror(err))))
+            else:
+                self._dirs[wd] = dirpath
+            files.extend(os.path.join(dirpath, f) for f in filenames)
+        return files
+
+    def poll(self, timeout):
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return [], []
+        written, created = [], []
+        while True:
+            try:
+                buf = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            pos = 0
+            while pos < len(buf):
+                wd, mask, _, size = self._EVENT.unpack_from(buf, pos)
+                name = buf[pos + self._EVENT.size:pos + self._EVENT.size + size].rstrip(b"\0")
+                pos += self._EVENT.size + size
+                if mask & self.IN_Q_OVERFLOW:
+                    return None
+                if mask & self.IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                    continue
+                parent = self._dirs.get(wd)
+                if parent is None or not name:
+                    continue
+                path = os.path.join(parent, os.fsdecode(name))
+                if mask & self.IN_ISDIR:
+                    # Neuer Ordner: überwachen; was vor dem Watch schon drin lag, sofort melden
+                    if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                        created.extend(self.add_tree(path))
+                elif mask & (self.IN_CLOSE_WRITE | self.IN_MOVED_TO):
+                    written.append(path)
+                else:
+                    created.append(path)
+        return written, created
+
+    def close(self):
+        os.close(self.fd)
+
+
+class VideoWatcher:
+    """Meldet neue oder geänderte Videos unter root, sobald sie fertig geschrieben sind.
+    inotify wo verfügbar, sonst Polling per scan_videos alle 'interval' Sekunden.
+    Fertig heißt: seit 'settle' Sekunden unverändert und entweder per inotify geschlossen
+    bzw. hineinverschoben oder bei zwei aufeinanderfolgenden Prüfungen gleiche Signatur.
+    'known' = {path: sig} bereits verarbeiteter Videos. Fehlen inotify-Watches für einzelne
+    Ordner, wird zusätzlich alle 'interval' Sekunden komplett neu gesucht."""
+
+    def __init__(self, root, extensions, known, settle=0.0, interval=5.0, jobs=1, use_inotify=True,
+                 quiet=False):
+        self.root = root
+        self.extensions = extensions
+        self.exts = tuple("." + e.strip().lower() for e in extensions.split(",") if e.strip())
+        self.known = dict(known)
+        self.settle = settle
+        self.interval = interval
+        self.jobs = jobs
+        self.quiet = quiet
+        self.partial = False  # inotify deckt nicht alle Ordner ab → periodische Rescans
+        self.pending = {}  # path -> (sig bei der letzten Prüfung, geschlossen)
+        self._retry = {}  # path -> (fällig ab (monotonic, 0 = gemeldet), Versuche) für unlesbare Videos
+        self.inotify = None
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self.inotify = InotifyWatcher(root)
+            except OSError as e:
+                if not quiet:
+                    print(f"[!] inotify nicht nutzbar ({e}), nutze Polling alle {interval:g}s.")
+        # Erster Rescan holt nach, was seit der Suche beim Start hinzugekommen ist
+        self._next_scan = 0.0
+        self._check_watches()
+
+    @property
+    def mode(self):
+        if self.inotify is None:
+            return "polling"
+        return "inotify+polling" if self.partial else "inotify"
+
+    def _check_watches(self):
+        """Fehlgeschlagene inotify-Watches melden und auf periodische Rescans umschalten."""
+        if self.inotify is None or not self.inotify.failed:
+            return
+        failed, self.inotify.failed = self.inotify.failed, []
+        if not self.quiet:
+            for dirpath, err in failed[:5]:
+                print(f"[!] inotify-Watch für {dirpath} fehlgeschlagen ({err}).")
+            if len(failed) > 5:
+                print(f"    ... und {len(failed) - 5} weitere Ordner")
+            if not self.partial:
+                print(f"[!] Suche zusätzlich alle {self.interval:g}s komplett neu "
+                      f"(ggf. fs.inotify.max_user_watches erhöhen).")
+        if not self.partial:
+            self.partial = True
+            self._next_scan = min(self._next_scan, time.monotonic() + self.interval)
+
+    def _stat(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+    def _note(self, path, closed=False):
+        if not path.lower().endswith(self.exts):
+            return
+        if path in self.pending:
+            sig, was_closed = self.pending[path]
+            self.pending[path] = (sig, was_closed or closed)
+        else:
+            self.pending[path] = (None, closed)
+
+    def add(self, paths):
+        """Pfade von außen vormerken (z. B. beim Start noch nicht fertige Videos)."""
+        for path in paths:
+            self._note(path)
+
+    def retry(self, path):
+        """Unlesbares Video später erneut melden; der Abstand verdoppelt sich pro Versuch
+        (ab 'interval', höchstens 1 h). Liefert die Wartezeit in Sekunden."""
+        attempts = self._retry.get(path, (0.0, 0))[1] + 1
+        delay = min(3600.0, max(1.0, self.interval) * 2 ** (attempts - 1))
+        self.known.pop(path, None)
+        self._retry[path] = (time.monotonic() + delay, attempts)
+        return delay
+
+    def _rescan(self):
+        now = time.monotonic()
+        for path, sig in scan_videos(self.root, self.extensions, jobs=self.jobs):
+            # Unlesbare erst zum Retry-Zeitpunkt
+            if self.known.get(path) != sig and self._retry.get(path, (0.0, 0))[0] <= now:
+                self._note(path)
+
+    def _collect(self, timeout):
+        now = time.monotonic()
+        for path, (due, attempts) in list(self._retry.items()):
+            if due and now >= due:
+                self._retry[path] = (0.0, attempts)
+                self._note(path)
+        if now >= self._next_scan:
+            self._rescan()
+            # Mit vollständigem inotify nur einmal, danach kommen Änderungen als Ereignisse
+            full = self.inotify is not None and not self.partial
+            self._next_scan = float("inf") if full else now + self.interval
+            return
+        if self.inotify is not None:
+            events = self.inotify.poll(min(timeout, max(0.0, self._next_scan - now)))
+            self._check_watches()
+            if events is None:
+                if not self.quiet:
+                    print("[!] inotify-Queue übergelaufen, suche komplett neu.")
+                self._rescan()
+                return
+            written, created = events
+            for path in written:
+                self._note(path, closed=True)
+            for path in created:
+                self._note(path)
+            return
+        time.sleep(min(timeout, self._next_scan - now))
+
+    def ready(self, timeout=1.0):
+        """Wartet höchstens 'timeout' Sekunden auf Ereignisse und liefert fertige Videos
+        als [(path, sig), ...]; diese gelten danach als bekannt."""
+        self._collect(timeout)
+        done, now = [], time.time()
+        for path, (last, closed) in list(self.pending.items()):
+            sig = self._stat(path)
+            if sig is None:
+                del self.pending[path]  # gelöscht oder umbenannt
+                continue
+            if self.known.get(path) == sig:
+                del self.pending[path]
+                continue
+            if (closed or sig == last) and is_settled(sig, self.settle, now):
+                del self.pending[path]
+                self.known[path] = sig
+                done.append((path, sig))
+            else:
+                self.pending[path] = (sig, closed)
+        done.sort()
+        return done
+
+    def close(self):
+        if self.inotify is not None:
+            self.inotify.close()
+
+# ------------------------
+# Laufzeit-Metriken (Zeit pro Verarbeitungsstufe)
+# ------------------------
+# Obergrenzen der Histogramm-Buckets in Sekunden (wie Prometheus 'le')
+_METRIC_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def _empty_stage():
+    return {"count": 0, "items": 0, "sum": 0.0, "max": 0.0,
+            "buckets": [0] * (len(_METRIC_BUCKETS) + 1)}
+
+
+class Metrics:
+    """Zeitmessung pro Stufe (decode, model, results, draw, clip_write, normalize, ...).
+    Je Stufe: Aufrufe, verarbeitete Einheiten (z. B. Frames eines Batches), Summe,
+    Maximum und ein Histogramm der Aufrufdauer. Threadsicher, per merge() addierbar."""
+
+    def __init__(self):
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds, items=1):
+        bucket = bisect.bisect_left(_METRIC_BUCKETS, seconds)
+        with self._lock:
+            st = self.stages.get(stage)
+            if st is None:
+                st = self.stages[stage] = _empty_stage()
+            st["count"] += 1
+            st["items"] += items
+            st["sum"] += seconds
+            st["max"] = max(st["max"], seconds)
+            st["buckets"][bucket] += 1
+
+    @contextmanager
+    def timed(self, stage, items=1):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - t0, items)
+
+    def timed_iter(self, stage, source):
+        """Misst die Wartezeit auf jedes Element von 'source' (z. B. Frames vom Decoder)."""
+        while True:
+            t0 = time.perf_counter()
+            item = next(source, None)
+            if item is None:
+                return
+            self.observe(stage, time.perf_counter() - t0)
+            yield item
+
+    def merge(self, stages):
+        """Addiert ein to_dict()-Ergebnis (z. B. aus einem Pool-Worker)."""
+        with self._lock:
+            for stage, other in stages.items():
+                st = self.stages.setdefault(stage, _empty_stage())
+                st["count"] += other["count"]
+                st["items"] += other["items"]
+                st["sum"] += other["sum"]
+                st["max"] = max(st["max"], other["max"])
+                st["buckets"] = [a + b for a, b in zip(st["buckets"], other["buckets"])]
+
+    def to_dict(self):
+        with self._lock:
+            return {stage: dict(st, buckets=list(st["buckets"])) for stage, st in self.stages.items()}
+
+    def summary(self, wall=None):
+        """Lesbare Zusammenfassung: pro Stufe Summe, Mittel/Max in ms, Buckets und mit 'wall'
+        den Anteil an der Gesamtlaufzeit (Unterstufen wie model_inference überlappen mit model)."""
+        stages = self.to_dict()
+        out = {}
+        for stage, st in sorted(stages.items(), key=lambda kv: -kv[1]["sum"]):
+            out[stage] = {
+                "count": st["count"],
+                "items": st["items"],
+                "seconds": round(st["sum"], 6),
+                "mean_ms": round(1000.0 * st["sum"] / st["count"], 3) if st["count"] else 0.0,
+                "max_ms": round(1000.0 * st["max"], 3),
+                "buckets": {("+Inf" if i == len(_METRIC_BUCKETS) else f"{_METRIC_BUCKETS[i]:g}"): n
+                            for i, n in enumerate(st["buckets"]) if n},
+            }
+            if wall:
+                out[stage]["share"] = round(st["sum"] / wall, 4)
+        return out
+
+    def write_prometheus(self, path, videos=0):
+        """Textfile-Collector-Format (node_exporter), atomar geschrieben."""
+        write_text_atomic(path, self.prometheus_text(videos))
+
+    def prometheus_text(self, videos=0):
+        lines = [
+            "# HELP object_search_stage_seconds Dauer pro Aufruf einer Verarbeitungsstufe.",
+            "# TYPE object_search_stage_seconds histogram",
+        ]
+        stages = self.to_dict()
+        for stage in sorted(stages):
+            st = stages[stage]
+            cum = 0
+            for i, n in enumerate(st["buckets"]):
+                cum += n
+                le = "+Inf" if i == len(_METRIC_BUCKETS) else f"{_METRIC_BUCKETS[i]:g}"
+                lines.append(f'object_search_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cum}')
+            lines.append(f'object_search_stage_seconds_sum{{stage="{stage}"}} {st["sum"]:.6f}')
+            lines.append(f'object_search_stage_seconds_count{{stage="{stage}"}} {st["count"]}')
+        lines += [
+            "# HELP object_search_stage_items_total Verarbeitete Einheiten (Frames, Clips) pro Stufe.",
+            "# TYPE object_search_stage_items_total counter",
+        ]
+        lines += [f'object_search_stage_items_total{{stage="{stage}"}} {stages[stage]["items"]}'
+                  for stage in sorted(stages)]
+        lines += [
+            "# HELP object_search_videos_total Abgeschlossene Videos in diesem Lauf.",
+            "# TYPE object_search_videos_total counter",
+            f"object_search_videos_total {videos}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+# Summe über alle Videos des Laufs (Quelle für --metrics-prom)
+METRICS = Metrics()
+
+
+def observe_model_speed(metrics, res):
+    """Ultralytics misst Vor-/Nachverarbeitung und Forward selbst (ms pro Bild) → übernehmen."""
+    speed = getattr(res, "speed", None) or {}
+    for key in ("preprocess", "inference", "postprocess"):
+        if speed.get(key) is not None:
+            metrics.observe(f"model_{key}", speed[key] / 1000.0)
+
+
+def metrics_path(metrics_dir, video_path):
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+    tag = hashlib.sha1(os.path.abspath(video_path).encode("utf-8")).hexdigest()[:8]
+    return os.path.join(metrics_dir, f"{stem}_{tag}.metrics.json")
 
 # ------------------------
 # Overlay-Position
@@ -152,61 +639,1760 @@ def get_overlay_position(pos, width, height, text, font_scale=0.5, thickness=2):
         return (margin, margin + text_h)
 
 # ------------------------
-# Export einzelner Clips (mit optionalen Bounding Boxes)
+# Bounding Boxes zeichnen (Farbpalette wie Ultralytics)
 # ------------------------
-def export_clip(video_path, start_sec, end_sec, model, export_dir,
-                overlay=False, overlay_text="", overlay_pos="tl",
-                overlay_size=0.5, overlay_color=(255, 255, 255),
-                confidence=0.8, silence_decoder_warnings=False, quiet=False,
-                no_boxes=False):
-    os.makedirs(export_dir, exist_ok=True)
-    with suppress_stderr_fd(quiet or silence_decoder_warnings):
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            return None
+_BOX_PALETTE = [
+    "FF3838", "FF9D97", "FF701F", "FFB21D", "CFD231", "48F90A", "92CC17", "3DDB86",
+    "1A9334", "00D4BB", "2C99A8", "00C2FF", "344593", "6473FF", "0018EC", "8438FF",
+    "520085", "CB38FF", "FF95C8", "FF37C7"
+]
 
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
-        timestamp = time.strftime("%Y%m%d_%H%M%S")
-        out_path = os.path.join(export_dir, f"clip_{timestamp}.mp4")
-        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-        out = cv2.VideoWriter(out_path, fourcc, fps, (width, height))
+def box_color(cls_id):
+    h = _BOX_PALETTE[int(cls_id) % len(_BOX_PALETTE)]
+    r, g, b = int(h[0:2], 16), int(h[2:4], 16), int(h[4:6], 16)
+    return (b, g, r)
 
-        start_frame = int(start_sec * fps)
-        end_frame = int(end_sec * fps)
-        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
 
-        frame_idx = start_frame
+def draw_boxes(frame, boxes, line_width=None):
+    """Zeichnet [(x1, y1, x2, y2, cls, conf), ...] mit Label direkt in 'frame'."""
+    if not boxes:
+        return frame
+    lw = line_width or max(round(sum(frame.shape[:2]) / 2 * 0.003), 2)
+    font_scale = lw / 3
+    for x1, y1, x2, y2, cls_id, conf in boxes:
+        color = box_color(cls_id)
+        p1, p2 = (int(x1), int(y1)), (int(x2), int(y2))
+        cv2.rectangle(frame, p1, p2, color, lw, cv2.LINE_AA)
+        label = f"{COCO_CLASSES[int(cls_id)]} {conf:.2f}"
+        (tw, th), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, max(lw - 1, 1))
+        outside = p1[1] - th - 3 >= 0
+        p2_label = (p1[0] + tw, p1[1] - th - 3 if outside else p1[1] + th + 3)
+        cv2.rectangle(frame, p1, p2_label, color, -1, cv2.LINE_AA)
+        cv2.putText(frame, label, (p1[0], p1[1] - 2 if outside else p1[1] + th + 2),
+                    cv2.FONT_HERSHEY_SIMPLEX, font_scale, (255, 255, 255), max(lw - 1, 1), cv2.LINE_AA)
+    return frame
+
+# ------------------------
+# Export von Clips (mit optionalen Bounding Boxes)
+#   Boxen kommen aus dem Scan (FrameBoxes); nur nicht gescannte Frames
+#   werden noch einmal durch das Modell geschickt.
+# ------------------------
+def clip_path(export_dir, video_path, scene_idx):
+    """Deterministischer Clipname aus Video und Szenennummer (Hash trennt gleichnamige Videos)."""
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+    tag = hashlib.sha1(os.path.abspath(video_path).encode("utf-8")).hexdigest()[:8]
+    return os.path.join(export_dir, f"{stem}_{tag}_scene{scene_idx:03d}.mp4")
+
+
+class SceneExportSession:
+    """Eine Dekodier-Sitzung pro Video für den Export: liest strikt vorwärts ab Frame 0
+    (kein Seek – Frame-Indizes passen so auch bei GOP/VFR zu den Scan-Boxen) und bedient
+    nacheinander eintreffende Szenengruppen. Jede Gruppe muss hinter dem Ende der vorherigen
+    beginnen. Frames in überlappenden Pre/Post-Fenstern einer Gruppe gehen an alle offenen Writer.
+    Mit 'highlight' (HighlightWriter) wird jeder Szenen-Frame zusätzlich direkt ins
+    Highlight-Video geschrieben; write_clips=False spart dann die Einzel-Clips."""
+
+    def __init__(self, video_path, model, export_dir,
+                 overlay=False, overlay_pos="tl",
+                 overlay_size=0.5, overlay_color=(255, 255, 255),
+                 confidence=0.8, silence_decoder_warnings=False, quiet=False,
+                 no_boxes=False, classes=None,
+                 highlight=None, write_clips=True, metrics=None, roi=None):
+        self.video_path = video_path
+        self.model = model
+        self.export_dir = export_dir
+        self.overlay = overlay
+        self.overlay_pos = overlay_pos
+        self.overlay_size = overlay_size
+        self.overlay_color = overlay_color
+        self.confidence = confidence
+        self.silence = quiet or silence_decoder_warnings
+        self.quiet = quiet
+        self.no_boxes = no_boxes
+        self.classes = classes
+        self.highlight = highlight
+        self.write_clips = write_clips
+        self.metrics = metrics if metrics is not None else METRICS
+        self.roi = roi
+        self.cap = None
+        self.frame_idx = 0   # Index des nächsten zu lesenden Frames
+        self.failed = False  # Decoder am Ende oder defekt
+
+    def _open(self):
+        self.cap = cv2.VideoCapture(self.video_path)
+        if not self.cap.isOpened():
+            self.failed = True
+            return
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+        if self.highlight is not None:
+            self.highlight.begin_clip(self.fps)
+
+    def export(self, scenes, boxes=None):
+        """'scenes' = [(scene_idx, start_sec, end_sec, overlay_text), ...]; liefert die Clip-Pfade
+        in Szenenreihenfolge."""
+        if not scenes:
+            return []
+        os.makedirs(self.export_dir, exist_ok=True)
+        with suppress_stderr_fd(self.silence):
+            if self.cap is None:
+                self._open()
+            if self.failed:
+                return []
+            paths, written = self._export(scenes, boxes)
+        out_paths = [paths[idx] for idx in sorted(written) if idx in paths]
+        if not self.quiet:
+            for out_path in out_paths:
+                print(f"[✓] Exportiert: {out_path}")
+        return out_paths
+
+    def _export(self, scenes, boxes):
+        m, cap, fps = self.metrics, self.cap, self.fps
+        width, height = self.width, self.height
+        # (start_frame, end_frame, scene_idx, overlay_text) nach Start sortiert; was vor der
+        # aktuellen Decoder-Position liegt, ist nicht mehr lesbar (Aufrufer gruppiert Überlappungen)
+        pending = sorted((max(int(st * fps), self.frame_idx), int(en * fps), idx, text)
+                         for idx, st, en, text in scenes)
+        last_frame = max(p[1] for p in pending)
+        active = []  # [(end_frame, scene_idx, text, writer, path)]
+        paths = {}
+        written = []
+
         fail_count = 0
-        while frame_idx <= end_frame:
-            ret, frame = cap.read()
+        while self.frame_idx <= last_frame and (pending or active):
+            frame_idx = self.frame_idx
+            needed = bool(active) or (pending and pending[0][0] <= frame_idx)
+            if not needed:
+                # Nur dekodieren, nicht konvertieren (schneller als read)
+                with m.timed("export_grab"):
+                    ok = cap.grab()
+                if not ok:
+                    fail_count += 1
+                    if fail_count <= 2:
+                        continue
+                    self.failed = True
+                    break
+                fail_count = 0
+                self.frame_idx += 1
+                continue
+
+            with m.timed("export_decode"):
+                ret, frame = cap.read()
             if not ret:
                 fail_count += 1
                 if fail_count <= 2:
                     continue
+                self.failed = True
                 break
             fail_count = 0
 
-            results = model(frame, conf=confidence, verbose=False)
-            if no_boxes:
-                annotated = frame.copy()
+            # Writer für Szenen öffnen, die bei diesem Frame beginnen
+            while pending and pending[0][0] <= frame_idx:
+                _, end_frame, idx, text = pending.pop(0)
+                out_path, writer = None, None
+                if self.write_clips:
+                    out_path = clip_path(self.export_dir, self.video_path, idx)
+                    writer = cv2.VideoWriter(out_path, self.fourcc, fps, (width, height))
+                    paths[idx] = out_path
+                active.append((end_frame, idx, text, writer, out_path))
+
+            annotated = frame
+            if not self.no_boxes:
+                if boxes is not None and boxes.is_scanned(frame_idx):
+                    frame_boxes = boxes.get(frame_idx)
+                elif self.model is not None:
+                    with m.timed("export_model"):
+                        if self.roi is not None:
+                            frame_boxes = run_model_roi(self.model, [frame], self.classes,
+                                                        self.confidence, self.roi)[0][0]
+                        else:
+                            frame_boxes = result_boxes(run_model(self.model, [frame], self.classes,
+                                                                 self.confidence)[0])
+                else:
+                    frame_boxes = []
+                with m.timed("draw"):
+                    draw_boxes(annotated, frame_boxes)
+
+            rendered = {}  # Overlay-Text → fertiges Bild (einmal pro Text zeichnen)
+
+            def with_overlay(text):
+                if not (self.overlay and text):
+                    return annotated
+                if text not in rendered:
+                    img = annotated.copy() if len(active) > 1 else annotated
+                    pos_xy = get_overlay_position(self.overlay_pos, width, height, text, self.overlay_size, 2)
+                    cv2.putText(img, text, pos_xy, cv2.FONT_HERSHEY_SIMPLEX, self.overlay_size,
+                                self.overlay_color, 2, cv2.LINE_AA)
+                    rendered[text] = img
+                return rendered[text]
+
+            for _, _, text, writer, _ in active:
+                if writer is not None:
+                    img = with_overlay(text)
+                    with m.timed("clip_write"):
+                        writer.write(img)
+            if self.highlight is not None:
+                # Überlappende Szenen landen nur einmal im Highlight (Text der ältesten Szene)
+                img = with_overlay(active[0][2])
+                with m.timed("highlight_write"):
+                    self.highlight.write(img)
+
+            # Writer schließen, deren Szene mit diesem Frame endet
+            for entry in [a for a in active if a[0] <= frame_idx]:
+                if entry[3] is not None:
+                    entry[3].release()
+                active.remove(entry)
+                written.append(entry[1])
+            self.frame_idx += 1
+
+        for entry in active:
+            if entry[3] is not None:
+                entry[3].release()
+            written.append(entry[1])
+        return paths, written
+
+    def close(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+def export_scenes(video_path, scenes, model, export_dir,
+                  overlay=False, overlay_pos="tl",
+                  overlay_size=0.5, overlay_color=(255, 255, 255),
+                  confidence=0.8, silence_decoder_warnings=False, quiet=False,
+                  no_boxes=False, boxes=None, classes=None,
+                  highlight=None, write_clips=True, metrics=None, roi=None):
+    """Exportiert mehrere Szenen eines Videos in EINEM sequenziellen Dekodierdurchlauf.
+    'scenes' ist eine Liste von (scene_idx, start_sec, end_sec, overlay_text).
+    Liefert die Clip-Pfade in Szenenreihenfolge."""
+    session = SceneExportSession(
+        video_path, model, export_dir, overlay, overlay_pos, overlay_size, overlay_color,
+        confidence, silence_decoder_warnings, quiet, no_boxes, classes,
+        highlight, write_clips, metrics, roi
+    )
+    try:
+        return session.export(scenes, boxes)
+    finally:
+        session.close()
+
+# ------------------------
+# Video-Metadaten (ein ffprobe-Aufruf pro Datei, memoisiert, parallel abfragbar)
+# ------------------------
+_PROBE_CACHE = {}
+_PROBE_LOCK = threading.Lock()
+
+
+def _probe_key(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+
+def _parse_rate(rate):
+    try:
+        num, den = rate.split("/")
+        return float(num) / float(den) if float(den) else 0.0
+    except (ValueError, AttributeError):
+        return 0.0
+
+
+def _ffprobe_media(path):
+    meta = {"width": None, "height": None, "pix_fmt": None, "codec": None,
+            "fps": 0.0, "duration": 0.0, "frames": 0,
+            # Start des Videostreams minus Dateistart (ffmpeg -ss zählt ab Dateistart, vgl. keyframe_times)
+            "start_offset": 0.0,
+            # Für Stream-Copy-Concat: alle Teile müssen hierin übereinstimmen (siehe _concat_signature)
+            "profile": None, "level": None, "rate": None, "avg_rate": None, "time_base": None,
+            "sar": None, "extradata": None, "audio": None}
+    try:
+        out = subprocess.check_output([
+            "ffprobe", "-v", "error", "-show_data_hash", "sha256",
+            "-show_entries", "stream=codec_type,width,height,pix_fmt,codec_name,avg_frame_rate,r_frame_rate,"
+                             "nb_frames,profile,level,time_base,sample_aspect_ratio,extradata_hash,"
+                             "sample_rate,channels,channel_layout,start_time:format=duration,start_time",
+            "-of", "json", path
+        ])
+        info = json.loads(out.decode("utf-8"))
+        streams = info.get("streams") or []
+        st = next((x for x in streams if x.get("codec_type") == "video"), {})
+        au = next((x for x in streams if x.get("codec_type") == "audio"), None)
+        meta["width"], meta["height"] = st.get("width"), st.get("height")
+        meta["pix_fmt"], meta["codec"] = st.get("pix_fmt"), st.get("codec_name")
+        meta["profile"], meta["level"] = st.get("profile"), st.get("level")
+        meta["rate"], meta["avg_rate"] = st.get("r_frame_rate"), st.get("avg_frame_rate")
+        meta["time_base"], meta["sar"] = st.get("time_base"), st.get("sample_aspect_ratio")
+        meta["extradata"] = st.get("extradata_hash")
+        if au is not None:
+            meta["audio"] = [au.get("codec_name"), au.get("sample_rate"), au.get("channels"),
+                             au.get("channel_layout")]
+        meta["fps"] = _parse_rate(st.get("avg_frame_rate")) or _parse_rate(st.get("r_frame_rate"))
+        meta["duration"] = float((info.get("format") or {}).get("duration") or 0.0)
+        meta["frames"] = int(st.get("nb_frames") or 0) or int(meta["duration"] * meta["fps"])
+        fmt_start = float((info.get("format") or {}).get("start_time") or 0.0)
+        meta["start_offset"] = float(st.get("start_time") or fmt_start) - fmt_start
+    except Exception:
+        pass
+    if not (meta["width"] and meta["height"]):
+        # Fallback: OpenCV (z. B. wenn ffprobe fehlt)
+        cap = cv2.VideoCapture(path)
+        if cap.isOpened():
+            meta["width"] = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or None
+            meta["height"] = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or None
+            meta["fps"] = meta["fps"] or cap.get(cv2.CAP_PROP_FPS)
+            meta["frames"] = meta["frames"] or int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+    return meta
+
+
+def probe_media(path):
+    """Metadaten des ersten Videostreams: width, height, pix_fmt, codec, fps, duration, frames.
+    Memoisiert über (Pfad, Größe, mtime), damit jede Datei nur einmal geprobt wird;
+    Fehlschläge nicht (evtl. nur kurz nicht erreichbar → spätere Versuche proben neu)."""
+    key = _probe_key(path)
+    with _PROBE_LOCK:
+        if key is not None and key in _PROBE_CACHE:
+            return _PROBE_CACHE[key]
+    meta = _ffprobe_media(path)
+    if key is not None and meta["width"]:
+        with _PROBE_LOCK:
+            _PROBE_CACHE[key] = meta
+    return meta
+
+
+def probe_many(paths, jobs=8):
+    """Probt mehrere Dateien parallel (ffprobe-Subprozesse), Ergebnis {path: meta}."""
+    paths = list(paths)
+    if len(paths) <= 1 or jobs <= 1:
+        return {p: probe_media(p) for p in paths}
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        return dict(zip(paths, pool.map(probe_media, paths)))
+
+
+_PROBE_CACHE_VERSION = 3  # erhöhen, wenn _ffprobe_media neue Felder liefert
+
+
+def load_probe_cache(path):
+    """Probe-Ergebnisse früherer Läufe in den Speicher-Cache übernehmen (Schlüssel wie _probe_key).
+    Caches einer anderen Version (andere Felder) werden ignoriert."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != _PROBE_CACHE_VERSION:
+            return 0
+        entries = data.get("entries", [])
+    except (OSError, ValueError, AttributeError):
+        return 0
+    with _PROBE_LOCK:
+        for rec in entries:
+            try:
+                _PROBE_CACHE[(rec["path"], rec["size"], rec["mtime_ns"])] = rec["meta"]
+            except (KeyError, TypeError):
+                continue
+    return len(entries)
+
+
+def save_probe_cache(path, keys):
+    """Probe-Ergebnisse für 'keys' (alle gefundenen Dateien mit aktuellem Stand) atomar speichern;
+    Einträge gelöschter oder geänderter Dateien entfallen, Fehlschläge werden nicht gespeichert."""
+    with _PROBE_LOCK:
+        entries = [{"path": k[0], "size": k[1], "mtime_ns": k[2], "meta": _PROBE_CACHE[k]}
+                   for k in keys if k in _PROBE_CACHE and _PROBE_CACHE[k].get("width")]
+    write_json_atomic(path, {"version": _PROBE_CACHE_VERSION, "entries": entries})
+
+
+def probe_videos(videos, sigs, jobs=8, cache_path=None):
+    """Metadaten-Pass vor dem Scan: alle Videos parallel proben, Ergebnisse auf Platte cachen
+    (Pfad, Größe, mtime). Liefert {path: meta}; unlesbare Dateien haben meta['width'] = None.
+    'sigs' = alle gefundenen Dateien: deren Cache-Einträge bleiben erhalten, auch wenn sie in
+    diesem Lauf nicht anstehen (z. B. schon erledigt oder noch nicht fertig geschrieben)."""
+    if cache_path:
+        load_probe_cache(cache_path)
+    metas = probe_many(videos, jobs)
+    if cache_path:
+        save_probe_cache(cache_path, [(os.path.abspath(v), sig[0], sig[1]) for v, sig in sigs.items()])
+    return metas
+
+# ------------------------
+# Clip-Export per ffmpeg Stream-Copy (ohne Boxen/Overlay)
+#   copy:  Start auf vorherigen Keyframe schnappen, alles kopieren (inkl. Audio)
+#   smart: nur die angeschnittene GOP am Anfang neu kodieren, Rest kopieren
+# ------------------------
+_SMART_CUT_ENCODERS = {"h264": "libx264", "hevc": "libx265"}
+# Profilnamen laut ffprobe → Encoder-Option, Bitstream-Filter für MPEG-TS-Zwischendateien
+_SMART_CUT_PROFILES = {
+    "h264": {"baseline": "baseline", "constrainedbaseline": "baseline", "main": "main", "high": "high",
+             "high10": "high10", "high4:2:2": "high422", "high4:4:4predictive": "high444"},
+    "hevc": {"main": "main", "main10": "main10"},
+}
+_ANNEXB_BSF = {"h264": "h264_mp4toannexb", "hevc": "hevc_mp4toannexb"}
+
+
+_KEYFRAME_CACHE = {}
+_KEYFRAME_CACHE_SIZE = 8  # nur die zuletzt geschnittenen Videos (Paketlisten langer Videos sind groß)
+
+
+def keyframe_times(video_path):
+    """Keyframe-Zeitstempel (Sekunden) des ersten Videostreams, ohne zu dekodieren (Paket-Flags).
+    Liefert (kfs, offset): kfs relativ zum ersten Frame des Videostreams (wie frame_idx / fps),
+    offset = Start des Videostreams minus Dateistart. ffmpeg -ss zählt ab Dateistart, d. h.
+    Szenenzeit t liegt bei -ss t + offset (wichtig bei .ts/.mpg/.vob mit start_time != 0).
+    Memoisiert über (Pfad, Größe, mtime) wie probe_media: der Export ruft das pro Szenengruppe auf,
+    die Paketliste wird aber nur einmal pro Video gelesen."""
+    key = _probe_key(video_path)
+    with _PROBE_LOCK:
+        if key is not None and key in _KEYFRAME_CACHE:
+            return _KEYFRAME_CACHE[key]
+    result = _ffprobe_keyframes(video_path)
+    if result is None:
+        return [], 0.0
+    if key is not None:
+        with _PROBE_LOCK:
+            _KEYFRAME_CACHE[key] = result
+            while len(_KEYFRAME_CACHE) > _KEYFRAME_CACHE_SIZE:
+                _KEYFRAME_CACHE.pop(next(iter(_KEYFRAME_CACHE)))
+    return result
+
+
+def _ffprobe_keyframes(video_path):
+    """Ein ffprobe-Lauf über alle Pakete; None, wenn ffprobe scheitert (wird nicht gecacht)."""
+    try:
+        out = subprocess.check_output([
+            "ffprobe", "-v", "error", "-select_streams", "v:0",
+            "-show_entries", "format=start_time:stream=start_time:packet=pts_time,flags",
+            "-of", "json", video_path
+        ])
+        info = json.loads(out.decode("utf-8", "replace"))
+    except Exception:
+        return None
+
+    def _float(value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+    fmt_start = _float((info.get("format") or {}).get("start_time")) or 0.0
+    streams = info.get("streams") or [{}]
+    kfs = [_float(p.get("pts_time")) for p in info.get("packets") or [] if "K" in (p.get("flags") or "")]
+    kfs = sorted(k for k in kfs if k is not None)
+    v_start = _float(streams[0].get("start_time"))
+    if v_start is None:
+        v_start = kfs[0] if kfs else fmt_start
+    return [k - v_start for k in kfs], v_start - fmt_start
+
+
+def _smart_cut_profile(meta, codec):
+    """Profil/Level des Originals (aus probe_media) als Encoder-Argumente, damit kodierte Teile
+    zum kopierten passen."""
+    args = []
+    profile = _SMART_CUT_PROFILES.get(codec, {}).get(str(meta.get("profile") or "").lower().replace(" ", ""))
+    if profile:
+        args += ["-profile:v", profile]
+    level = meta.get("level")
+    if isinstance(level, int) and level > 0:
+        if codec == "h264":
+            args += ["-level:v", f"{level / 10:.1f}"]
+        elif codec == "hevc":
+            args += ["-x265-params", f"level-idc={level / 30:.1f}"]
+    return args
+
+
+def _run_ffmpeg(args):
+    subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y"] + args, check=True)
+
+
+def _cut_copy(video_path, start, end, out_path, offset=0.0):
+    _run_ffmpeg([
+        "-ss", f"{start + offset:.6f}", "-i", video_path, "-t", f"{max(end - start, 0):.6f}",
+        "-map", "0:v:0", "-map", "0:a?", "-c", "copy",
+        "-avoid_negative_ts", "make_zero", "-movflags", "+faststart", out_path
+    ])
+
+
+def _cut_smart(video_path, start, end, out_path, kfs, encoder, pix_fmt, tmp_dir,
+               codec="h264", profile_args=(), offset=0.0):
+    """Angeschnittene GOPs an beiden Schnittgrenzen neu kodieren (Start bis erster Keyframe,
+    letzter Keyframe bis Ende), dazwischen Stream-Copy; Audio separat kopieren.
+    Die Teile laufen als MPEG-TS (Annex B, Parameter-Sets im Stream) zusammen, damit der
+    kopierte Teil trotz eigener SPS/PPS dekodierbar bleibt; Profil/Level/pix_fmt wie im Original."""
+    inner = [k for k in kfs if start + 1e-3 < k < end - 1e-3]
+    video_only = os.path.join(tmp_dir, "video.mp4")
+    encode_args = ["-map", "0:v:0", "-an", "-c:v", encoder, "-crf", "18", "-preset", "veryfast"]
+    encode_args += list(profile_args)
+    if pix_fmt:
+        encode_args += ["-pix_fmt", pix_fmt]
+
+    if not inner:
+        # Kein Keyframe im Clip → kompletten (kurzen) Clip kodieren
+        _run_ffmpeg(["-ss", f"{start + offset:.6f}", "-i", video_path, "-t", f"{end - start:.6f}"]
+                    + encode_args + [video_only])
+    else:
+        k_first, k_last = inner[0], inner[-1]
+        parts = []
+
+        def encode(lo, hi, name):
+            path = os.path.join(tmp_dir, name)
+            _run_ffmpeg(["-ss", f"{lo + offset:.6f}", "-i", video_path, "-t", f"{hi - lo:.6f}"]
+                        + encode_args + ["-f", "mpegts", path])
+            parts.append(path)
+
+        encode(start, k_first, "head.ts")
+        if k_last > k_first:
+            middle = os.path.join(tmp_dir, "middle.ts")
+            _run_ffmpeg(["-ss", repr(k_first + offset), "-i", video_path, "-t", f"{k_last - k_first:.6f}",
+                         "-map", "0:v:0", "-an", "-c", "copy", "-bsf:v", _ANNEXB_BSF[codec],
+                         "-avoid_negative_ts", "make_zero", "-f", "mpegts", middle])
+            parts.append(middle)
+        encode(k_last, end, "tail.ts")
+        list_file = os.path.join(tmp_dir, "parts.txt")
+        with open(list_file, "w", encoding="utf-8") as f:
+            f.writelines(f"file '{os.path.abspath(part)}'\n" for part in parts)
+        _run_ffmpeg(["-f", "concat", "-safe", "0", "-i", list_file, "-c", "copy", video_only])
+
+    # Audio exakt [start, end] aus dem Original dazukopieren
+    _run_ffmpeg([
+        "-i", video_only, "-ss", f"{start + offset:.6f}", "-to", f"{end + offset:.6f}", "-i", video_path,
+        "-map", "0:v:0", "-map", "1:a?", "-c", "copy", "-shortest",
+        "-movflags", "+faststart", out_path
+    ])
+
+
+def export_scenes_copy(video_path, scenes, export_dir, mode="copy", quiet=False):
+    """Schneidet Szenen (scene_idx, start_sec, end_sec, _) per ffmpeg ohne Neukodierung aus.
+    mode='copy' schnappt den Start auf den vorherigen Keyframe, mode='smart' kodiert nur die
+    angeschnittenen GOPs an Start und Ende neu (nur h264/hevc, sonst wie 'copy').
+    Passen die Quell-Codecs nicht in MP4 (WMV/WMA, FLV1, PCM, …), scheitert der Schnitt; diese
+    Szenen werden dann wie bei cut_mode='encode' dekodiert und neu kodiert.
+    Liefert die Clip-Pfade in Szenenreihenfolge."""
+    if not scenes:
+        return []
+    os.makedirs(export_dir, exist_ok=True)
+    kfs, offset = keyframe_times(video_path)
+    codec, encoder, pix_fmt, profile_args = None, None, None, []
+    if mode == "smart":
+        meta = probe_media(video_path)
+        codec, pix_fmt = meta["codec"], meta["pix_fmt"]
+        encoder = _SMART_CUT_ENCODERS.get(codec)
+        if encoder is None and not quiet:
+            print(f"[i] Smart-Cut für Codec '{codec}' nicht möglich, schneide auf Keyframes.")
+        if encoder is not None:
+            profile_args = _smart_cut_profile(meta, codec)
+
+    out_paths = {}
+    failed = []
+    for scene in sorted(scenes, key=lambda sc: sc[1]):
+        idx, start, end, _ = scene
+        out_path = clip_path(export_dir, video_path, idx)
+        try:
+            if encoder is not None:
+                tmp_dir = tempfile.mkdtemp(prefix=".cut_", dir=export_dir)
+                try:
+                    _cut_smart(video_path, start, end, out_path, kfs, encoder, pix_fmt, tmp_dir,
+                               codec, profile_args, offset)
+                finally:
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
             else:
-                annotated = results[0].plot()
+                prev_kfs = [k for k in kfs if k <= start + 1e-3]
+                _cut_copy(video_path, prev_kfs[-1] if prev_kfs else start, end, out_path, offset)
+        except subprocess.CalledProcessError:
+            if not quiet:
+                print(f"[!] Schnitt ohne Neukodierung fehlgeschlagen für {video_path} "
+                      f"({start:.1f}s–{end:.1f}s), kodiere neu.")
+            if os.path.exists(out_path):
+                os.remove(out_path)
+            failed.append(scene)
+            continue
+        out_paths[idx] = out_path
+        if not quiet:
+            print(f"[✓] Exportiert: {out_path}")
+    if failed:
+        # Nichts zu zeichnen (sonst liefe kein Stream-Copy) → schlichter Re-Encode derselben Fenster
+        by_path = {clip_path(export_dir, video_path, sc[0]): sc[0] for sc in failed}
+        for path in export_scenes(video_path, failed, None, export_dir, quiet=quiet, no_boxes=True):
+            out_paths[by_path[path]] = path
+    return [out_paths[idx] for idx in sorted(out_paths)]
 
-            if overlay and overlay_text:
-                pos_xy = get_overlay_position(overlay_pos, width, height, overlay_text, overlay_size, 2)
-                cv2.putText(annotated, overlay_text, pos_xy,
-                            cv2.FONT_HERSHEY_SIMPLEX, overlay_size, overlay_color, 2, cv2.LINE_AA)
-            out.write(annotated)
+# ------------------------
+# Frame-Quellen (sequenziell oder mit Decoder-Thread)
+# ------------------------
+def iter_frames(cap, start_idx=0, step=1, end_idx=None):
+    """Liest Frames sequenziell und liefert (frame_idx, frame).
+    Mit step > 1 werden nur Frames mit frame_idx % step == 0 geliefert; die übrigen
+    werden per cap.grab() übersprungen (ohne Farbkonvertierung/Kopie).
+    Bis zu 2 kaputte Frames in Folge werden toleriert (fail_count), danach ist Schluss."""
+    frame_idx = start_idx
+    fail_count = 0
+    while end_idx is None or frame_idx <= end_idx:
+        if step > 1 and frame_idx % step:
+            if not cap.grab():
+                fail_count += 1
+                if fail_count <= 2:
+                    continue
+                break
+            fail_count = 0
             frame_idx += 1
+            continue
+        ret, frame = cap.read()
+        if not ret:
+            fail_count += 1
+            if fail_count <= 2:
+                continue
+            break
+        fail_count = 0
+        yield frame_idx, frame
+        frame_idx += 1
 
-        cap.release()
-        out.release()
+
+def refine_windows(hit_frames, step, total_frames=0):
+    """Dichte Nachscan-Fenster um Läufe von Stichproben-Treffern.
+    Pro Lauf [a, b] (Treffer im Abstand 'step'): (a-step+1 .. a-1) und (b+1 .. b+step-1).
+    Liefert zusammengefasste, inklusive Fenster [(lo, hi), ...]."""
+    if step <= 1 or not hit_frames:
+        return []
+    hits = sorted(set(hit_frames))
+    runs, run_start, prev = [], hits[0], hits[0]
+    for h in hits[1:]:
+        if h - prev > step:
+            runs.append((run_start, prev))
+            run_start = h
+        prev = h
+    runs.append((run_start, prev))
+
+    windows = []
+    last = total_frames - 1 if total_frames > 0 else None
+    for a, b in runs:
+        windows.append((max(0, a - step + 1), a - 1))
+        hi = b + step - 1
+        windows.append((b + 1, min(hi, last) if last is not None else hi))
+    merged = []
+    for lo, hi in sorted(w for w in windows if w[0] <= w[1]):
+        if merged and lo <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+class FFmpegCapture:
+    """Alternative Frame-Quelle: ffmpeg dekodiert, skaliert (und verwirft bei step > 1 Frames)
+    selbst und liefert rawvideo bgr24 über eine Pipe direkt in vorab allokierte NumPy-Puffer
+    (readinto, Ring aus 'buffers' Puffern → keine Allokation pro Frame).
+    Bietet die von process_video genutzte Teilmenge der cv2.VideoCapture-API; Frame-Indizes
+    zählen weiter in Quell-Frames, Boxen werden über box_scale auf Quellkoordinaten gerechnet.
+    Achtung: ein gelieferter Frame bleibt nur gültig, bis der Ring einmal herum ist."""
+
+    def __init__(self, path, width=0, step=1, buffers=8):
+        self.path = path
+        self.step = max(1, int(step))
+        meta = probe_media(path)
+        src_w, src_h = meta["width"] or 0, meta["height"] or 0
+        self._fps = meta["fps"] or 0.0
+        self._frames = meta["frames"] or 0
+        self._offset = meta.get("start_offset") or 0.0
+        if width and src_w and width < src_w:
+            self._w = int(width) - int(width) % 2
+            self._h = max(2, int(round(src_h * self._w / src_w)))
+            self._h -= self._h % 2
+        else:
+            self._w, self._h = src_w, src_h
+        self.box_scale = (src_w / self._w, src_h / self._h) if self._w and self._h else (1.0, 1.0)
+        self._scaled = (self._w, self._h) != (src_w, src_h)
+        self._opened = bool(self._w and self._h and self._fps > 0) and shutil.which("ffmpeg") is not None
+        self._buffers = [np.empty((self._h, self._w, 3), dtype=np.uint8)
+                         for _ in range(max(2, int(buffers)))] if self._opened else []
+        self._next_buf = 0
+        self._proc = None
+        self._pos = 0
+
+    def isOpened(self):
+        return self._opened
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self._fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return self._frames
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self._w
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self._h
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return self._pos
+        return 0
+
+    def set(self, prop, value):
+        if prop != cv2.CAP_PROP_POS_FRAMES:
+            return False
+        # Neustart ab Frame 'value' (exakt über Zeitstempel, CFR vorausgesetzt)
+        self._stop()
+        self._pos = max(0, int(value))
+        return True
+
+    def _start(self):
+        cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin"]
+        if self._pos > 0:
+            # halber Frame Vorlauf, damit Rundung den Zielframe nicht verwirft; -ss zählt ab Dateistart,
+            # Frame-Indizes ab Start des Videostreams (.ts/.mpg/.vob mit start_time != 0)
+            cmd += ["-ss", f"{(self._pos - 0.5) / self._fps + self._offset:.6f}"]
+        cmd += ["-i", self.path, "-map", "0:v:0", "-an", "-sn"]
+        filters = []
+        if self.step > 1:
+            # Nur Frames mit (Quellindex % step == 0) dekodieren/ausgeben; n zählt ab dem ersten Frame
+            # nach dem Seek, d. h. ab Quellindex _pos (Seek inkl. Stream-Offset, s. o.)
+            filters.append(f"select='not(mod(n+{self._pos}\\,{self.step}))'")
+        if self._scaled:
+            filters.append(f"scale={self._w}:{self._h}:flags=area")
+        if filters:
+            cmd += ["-vf", ",".join(filters)]
+        cmd += ["-vsync", "passthrough", "-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1"]
+        self._proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stdin=subprocess.DEVNULL)
+
+    def _stop(self):
+        if self._proc is not None:
+            try:
+                self._proc.kill()
+            except OSError:
+                pass
+            self._proc.stdout.close()
+            self._proc.wait()
+            self._proc = None
+
+    def read(self):
+        if not self._opened:
+            return False, None
+        if self._proc is None:
+            self._start()
+        buf = self._buffers[self._next_buf]
+        view = memoryview(buf).cast("B")
+        need, got = len(view), 0
+        while got < need:
+            n = self._proc.stdout.readinto(view[got:])
+            if not n:
+                return False, None
+            got += n
+        self._next_buf = (self._next_buf + 1) % len(self._buffers)
+        self._pos += 1
+        return True, buf
+
+    def grab(self):
+        if self.step > 1 and self._pos % self.step:
+            # Diesen Frame hat ffmpeg schon verworfen
+            self._pos += 1
+            return True
+        ok, _ = self.read()
+        return ok
+
+    def release(self):
+        self._stop()
+        self._opened = False
+
+
+def open_capture(video_path, decoder="opencv", decode_width=0, buffers=8):
+    """Frame-Quelle für den Scan: cv2.VideoCapture oder FFmpegCapture."""
+    if decoder == "ffmpeg":
+        return FFmpegCapture(video_path, width=decode_width, buffers=buffers)
+    return cv2.VideoCapture(video_path)
+
+
+class PrefetchReader:
+    """Producer/Consumer: ein Decoder-Thread füllt eine begrenzte Queue mit Frames,
+    die Inferenz-Schleife leert sie. close() beendet den Thread sauber (auch bei STRG+C)."""
+    _END = object()
+
+    def __init__(self, frames, maxsize=8):
+        self._frames = frames
+        self._queue = queue.Queue(maxsize=max(1, int(maxsize)))
+        self._stop = threading.Event()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="frame-decoder", daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        # Mit Timeout, damit ein volles Queue (z. B. während Pause) close() nicht blockiert
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        try:
+            for item in self._frames:
+                if not self._put(item):
+                    return
+        except Exception as e:
+            self._error = e
+        self._put(self._END)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=0.1)
+                break
+            except queue.Empty:
+                if not self._thread.is_alive() and self._queue.empty():
+                    raise StopIteration
+        if item is self._END:
+            if self._error is not None:
+                raise self._error
+            raise StopIteration
+        return item
+
+    def close(self):
+        self._stop.set()
+        # Queue leeren, damit der Producer nicht im put() hängt
+        while self._thread.is_alive():
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            self._thread.join(timeout=0.1)
+
+# ------------------------
+# Inferenz (einzeln oder als Batch)
+# ------------------------
+def run_model(model, frames, classes, confidence):
+    """Führt das Modell für eine Liste von Frames in EINEM Aufruf aus.
+    Liefert eine Ergebnisliste in derselben Reihenfolge wie 'frames'."""
+    if len(frames) == 1:
+        return model(frames[0], classes=classes, conf=confidence, verbose=False)
+    return model(list(frames), classes=classes, conf=confidence, verbose=False)
+
+def result_boxes(res):
+    """Boxen eines Ergebnisobjekts als [(x1, y1, x2, y2, cls, conf), ...]."""
+    b = res.boxes
+    if len(b) == 0:
+        return []
+    return [(*xyxy, int(c), float(cf))
+            for xyxy, c, cf in zip(b.xyxy.tolist(), b.cls.tolist(), b.conf.tolist())]
+
+# ------------------------
+# Inferenz-Backends (torch / onnx / openvino)
+#   ONNX/OpenVINO werden einmalig über ultralytics exportiert und im Cache abgelegt;
+#   geladen wird das Artefakt wieder per YOLO(), die Aufrufschnittstelle bleibt gleich.
+# ------------------------
+BACKENDS = ("torch", "onnx", "openvino")
+_EXPORT_CACHE_VERSION = 1
+
+
+def export_model(model_path, backend, imgsz=640, int8=False, cache_dir=None, int8_data=None, quiet=False):
+    """Exportiertes Modell für 'backend' aus dem Cache liefern (bei Bedarf einmalig exportieren).
+    Schlüssel: Modelldatei (Pfad, Größe, mtime), Backend, imgsz, INT8.
+    INT8: ONNX per dynamischer Quantisierung (onnxruntime, ohne Kalibrierdaten),
+    OpenVINO per NNCF-Kalibrierung über ultralytics ('int8_data' = Datensatz-YAML)."""
+    if backend == "torch":
+        return model_path
+    st = os.stat(model_path)
+    key = f"{os.path.abspath(model_path)}|{st.st_size}|{st.st_mtime_ns}|{backend}|{imgsz}|{int8}|v{_EXPORT_CACHE_VERSION}"
+    tag = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(model_path)), ".model_cache")
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    target = os.path.join(cache_dir, f"{stem}_{tag}" + (".onnx" if backend == "onnx" else "_openvino_model"))
+    if os.path.exists(target):
+        return target
+
+    os.makedirs(cache_dir, exist_ok=True)
     if not quiet:
-        print(f"[✓] Exportiert: {out_path}")
-    return out_path
+        print(f"[i] Exportiere {model_path} nach {backend}{' (INT8)' if int8 else ''}, einmalig → {target}")
+    kwargs = {"format": backend, "imgsz": imgsz, "dynamic": True}
+    if backend == "openvino" and int8:
+        kwargs.update(int8=True, dynamic=False)
+        if int8_data:
+            kwargs["data"] = int8_data
+    exported = str(YOLO(model_path).export(**kwargs))
+
+    tmp = target + f".{os.getpid()}.tmp"
+    if backend == "onnx" and int8:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(exported, tmp, weight_type=QuantType.QUInt8)
+        os.remove(exported)
+    else:
+        shutil.move(exported, tmp)
+    os.replace(tmp, target)
+    return target
+
+
+class InferenceModel:
+    """Backend-unabhängiges Modell mit derselben Aufrufschnittstelle wie YOLO:
+    model(frames, classes=..., conf=..., verbose=...). Feste Eingabegröße (imgsz),
+    Intra-Op-Threads im jeweiligen Runtime und Warm-up beim Laden."""
+
+    def __init__(self, path, backend="torch", imgsz=640, threads=0, warmup=1, batch=1, quiet=False):
+        self.path = path
+        self.backend = backend
+        self.imgsz = imgsz
+        self.quiet = quiet
+        if threads and backend == "torch":
+            try:
+                import torch
+                torch.set_num_threads(threads)
+            except Exception:
+                pass
+        self.yolo = YOLO(path, task="detect")
+        dummy = [np.zeros((imgsz, imgsz, 3), dtype=np.uint8)] * max(1, batch)
+        # Erster Aufruf legt den Predictor samt Runtime-Session an
+        self(dummy if len(dummy) > 1 else dummy[0])
+        if threads and backend != "torch":
+            self._set_runtime_threads(threads)
+        for _ in range(max(0, warmup - 1)):
+            self(dummy if len(dummy) > 1 else dummy[0])
+
+    def __call__(self, source, classes=None, conf=0.25, verbose=False):
+        return self.yolo(source, classes=classes, conf=conf, imgsz=self.imgsz, verbose=verbose)
+
+    def _set_runtime_threads(self, threads):
+        """Session mit fester Threadzahl neu anlegen (ultralytics nutzt sonst alle Kerne).
+        Greift in AutoBackend-Interna: bis 8.3 liegen session/ov_compiled_model direkt am AutoBackend,
+        ab 8.4 an AutoBackend.backend (AutoBackend leitet Lesezugriffe nur weiter, Zuweisungen
+        dort wären wirkungslos). Passt das Layout nicht, bleibt es mit Warnung beim Runtime-Default."""
+        runtime = getattr(getattr(self.yolo, "predictor", None), "model", None)
+        name = {"onnx": "session", "openvino": "ov_compiled_model"}.get(self.backend)
+        # Objekt, das das Attribut selbst hält (vars: ohne __getattr__-Weiterleitung)
+        target = next((obj for obj in (getattr(runtime, "backend", None), runtime)
+                       if obj is not None and name in vars(obj)), None)
+        try:
+            if target is not None and self.backend == "onnx":
+                import onnxruntime as ort
+                if isinstance(target.session, ort.InferenceSession):
+                    opts = ort.SessionOptions()
+                    opts.intra_op_num_threads = threads
+                    opts.inter_op_num_threads = 1
+                    target.session = ort.InferenceSession(self.path, opts, providers=["CPUExecutionProvider"])
+                    return
+            if target is not None and self.backend == "openvino":
+                import openvino as ov
+                if isinstance(target.ov_compiled_model, ov.CompiledModel):
+                    core = ov.Core()
+                    xml = next(f for f in os.listdir(self.path) if f.endswith(".xml"))
+                    config = {"INFERENCE_NUM_THREADS": threads, "PERFORMANCE_HINT": "LATENCY"}
+                    target.ov_compiled_model = core.compile_model(
+                        core.read_model(os.path.join(self.path, xml)), "CPU", config)
+                    if "compile_model" in vars(target):
+                        # ab 8.4: Neukompilieren bei Shape-Wechsel mit derselben Threadzahl
+                        target.compile_model = functools.partial(core.compile_model, device_name="CPU",
+                                                                 config=config)
+                    return
+        except Exception as e:
+            if not self.quiet:
+                print(f"[!] Threadzahl für {self.backend} nicht setzbar ({e}), nutze Runtime-Default.")
+            return
+        if not self.quiet:
+            try:
+                import ultralytics
+                version = ultralytics.__version__
+            except Exception:
+                version = "?"
+            print(f"[!] Threadzahl für {self.backend} nicht setzbar (unbekanntes Backend-Layout in "
+                  f"ultralytics {version}), nutze Runtime-Default.")
+
+
+def compare_backends(ref, test, videos, classes, confidence, frames=50, iou=0.5):
+    """Vergleicht 'test' mit dem PyTorch-Modell 'ref' auf Stichproben-Frames der Videos:
+    Recall/Präzision der Boxen (gleiche Klasse, IoU >= iou), mittlere IoU, |Δconf| und ms/Frame."""
+    samples = []
+    per_video = max(1, frames // max(1, len(videos)))
+    for v in videos:
+        if len(samples) >= frames:
+            break
+        cap = cv2.VideoCapture(v)
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        for k in range(per_video):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int((k + 0.5) * total / per_video))
+            ret, frame = cap.read()
+            if ret:
+                samples.append(frame)
+        cap.release()
+
+    n_ref = n_test = matched = 0
+    ious, conf_diffs = [], []
+    t_ref = t_test = 0.0
+    for frame in samples[:frames]:
+        t0 = time.perf_counter()
+        ref_boxes = result_boxes(run_model(ref, [frame], classes, confidence)[0])
+        t1 = time.perf_counter()
+        test_boxes = result_boxes(run_model(test, [frame], classes, confidence)[0])
+        t_test += time.perf_counter() - t1
+        t_ref += t1 - t0
+        n_ref += len(ref_boxes)
+        n_test += len(test_boxes)
+        used = set()
+        for r in ref_boxes:
+            best, best_iou = None, iou
+            for j, t in enumerate(test_boxes):
+                if j not in used and t[4] == r[4] and box_iou(r, t) >= best_iou:
+                    best, best_iou = j, box_iou(r, t)
+            if best is not None:
+                used.add(best)
+                matched += 1
+                ious.append(best_iou)
+                conf_diffs.append(abs(r[5] - test_boxes[best][5]))
+    n = max(1, len(samples[:frames]))
+    return {
+        "frames": len(samples[:frames]),
+        "boxes_ref": n_ref,
+        "boxes_test": n_test,
+        "recall": matched / n_ref if n_ref else 1.0,
+        "precision": matched / n_test if n_test else 1.0,
+        "mean_iou": sum(ious) / len(ious) if ious else 0.0,
+        "mean_conf_diff": sum(conf_diffs) / len(conf_diffs) if conf_diffs else 0.0,
+        "ms_ref": 1000.0 * t_ref / n,
+        "ms_test": 1000.0 * t_test / n,
+    }
+
+# ------------------------
+# Kompakter Detektionsspeicher (array-basiert)
+# ------------------------
+class FrameBoxes:
+    """Speichert Boxen pro Frame in flachen Arrays (Frame-Index, xyxy, Klasse, Confidence)
+    und merkt sich, welche Frame-Bereiche gescannt wurden (auch ohne Treffer).
+    Frames kommen normalerweise aufsteigend; Nachzügler (z. B. aus der Verfeinerung)
+    werden beim nächsten Lesezugriff einsortiert."""
+
+    def __init__(self):
+        self.frames = array("q")
+        self.xyxy = array("f")
+        self.cls = array("h")
+        self.conf = array("f")
+        self.scanned = []  # [[start, end], ...] inklusive, aufsteigend
+        self._dirty = False
+
+    def __len__(self):
+        return len(self.frames)
+
+    def mark_scanned(self, frame_idx):
+        if self.scanned and self.scanned[-1][0] <= frame_idx <= self.scanned[-1][1] + 1:
+            self.scanned[-1][1] = max(self.scanned[-1][1], frame_idx)
+        else:
+            if self.scanned and frame_idx < self.scanned[-1][0]:
+                self._dirty = True
+            self.scanned.append([frame_idx, frame_idx])
+
+    def _sort(self):
+        """Arrays nach Frame-Index ordnen und gescannte Bereiche zusammenfassen."""
+        if not self._dirty:
+            return
+        order = sorted(range(len(self.frames)), key=self.frames.__getitem__)
+        self.frames = array("q", (self.frames[i] for i in order))
+        self.xyxy = array("f", (v for i in order for v in self.xyxy[4 * i:4 * i + 4]))
+        self.cls = array("h", (self.cls[i] for i in order))
+        self.conf = array("f", (self.conf[i] for i in order))
+        merged = []
+        for lo, hi in sorted(self.scanned):
+            if merged and lo <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], hi)
+            else:
+                merged.append([lo, hi])
+        self.scanned = merged
+        self._dirty = False
+
+    def is_scanned(self, frame_idx):
+        self._sort()
+        i = bisect.bisect_right(self.scanned, [frame_idx, float("inf")]) - 1
+        return i >= 0 and self.scanned[i][0] <= frame_idx <= self.scanned[i][1]
+
+    def add(self, frame_idx, boxes):
+        """Boxen [(x1, y1, x2, y2, cls, conf), ...] eines gescannten Frames übernehmen."""
+        if self.frames and boxes and frame_idx < self.frames[-1]:
+            self._dirty = True
+        self.mark_scanned(frame_idx)
+        for x1, y1, x2, y2, c, cf in boxes:
+            self.frames.append(frame_idx)
+            self.xyxy.extend((x1, y1, x2, y2))
+            self.cls.append(int(c))
+            self.conf.append(cf)
+
+    def scanned_ranges(self):
+        self._sort()
+        return [list(r) for r in self.scanned]
+
+    def to_dict(self):
+        """Kompakte, JSON-fähige Form (Arrays als Base64) für Checkpoints."""
+        self._sort()
+        enc = lambda a: base64.b64encode(a.tobytes()).decode("ascii")
+        return {"frames": enc(self.frames), "xyxy": enc(self.xyxy), "cls": enc(self.cls),
+                "conf": enc(self.conf), "scanned": self.scanned}
+
+    @classmethod
+    def from_dict(cls, data):
+        fb = cls()
+        for name, code in (("frames", "q"), ("xyxy", "f"), ("cls", "h"), ("conf", "f")):
+            arr = array(code)
+            arr.frombytes(base64.b64decode(data[name]))
+            setattr(fb, name, arr)
+        fb.scanned = [list(r) for r in data["scanned"]]
+        return fb
+
+    def get(self, frame_idx):
+        self._sort()
+        lo = bisect.bisect_left(self.frames, frame_idx)
+        hi = bisect.bisect_right(self.frames, frame_idx, lo)
+        return [(*self.xyxy[4 * i:4 * i + 4], self.cls[i], self.conf[i]) for i in range(lo, hi)]
+
+    def hits(self):
+        """(frame, [Klassen-IDs]) für jeden Frame mit Boxen, aufsteigend."""
+        self._sort()
+        i, n = 0, len(self.frames)
+        while i < n:
+            j = bisect.bisect_right(self.frames, self.frames[i], i)
+            yield self.frames[i], self.cls[i:j].tolist()
+            i = j
+
+    def slice(self, lo, hi):
+        """Unabhängige Kopie für die Frames lo..hi (inklusive), z. B. für den Export-Thread."""
+        self._sort()
+        fb = FrameBoxes()
+        a = bisect.bisect_left(self.frames, lo)
+        b = bisect.bisect_right(self.frames, hi, a)
+        fb.frames = self.frames[a:b]
+        fb.xyxy = self.xyxy[4 * a:4 * b]
+        fb.cls = self.cls[a:b]
+        fb.conf = self.conf[a:b]
+        fb.scanned = [[max(s, lo), min(e, hi)] for s, e in self.scanned if s <= hi and e >= lo]
+        return fb
+
+# ------------------------
+# Szenen-Clustering (fortlaufend) und Export im Hintergrund
+# ------------------------
+class SceneClusterer:
+    """Fasst Treffer (Sekunde, Klassen-IDs) fortlaufend zu Szenen zusammen (Lücke <= cluster_gap).
+    Gespeichert werden nur Szenen als (start, end, Klassen-IDs), keine Einzeltreffer.
+    Treffer müssen aufsteigend kommen."""
+
+    def __init__(self, cluster_gap=2.0):
+        self.cluster_gap = cluster_gap
+        self.scenes = []   # abgeschlossene Szenen [(start, end, (cls, ...)), ...]
+        self._open = None  # [start, end, {cls, ...}]
+
+    def add(self, seconds, cls_ids):
+        if self._open is not None and seconds - self._open[1] > self.cluster_gap:
+            self._close()
+        if self._open is None:
+            self._open = [seconds, seconds, set(cls_ids)]
+        else:
+            self._open[1] = seconds
+            self._open[2].update(cls_ids)
+
+    def close_idle(self, seconds, idle):
+        """Offene Szene abschließen, wenn ihr letzter Treffer mehr als 'idle' Sekunden zurückliegt."""
+        if self._open is not None and seconds - self._open[1] > idle:
+            self._close()
+
+    def finish(self):
+        if self._open is not None:
+            self._close()
+        return self.scenes
+
+    @property
+    def open_start(self):
+        """Start der noch offenen Szene (None, wenn keine offen ist)."""
+        return self._open[0] if self._open is not None else None
+
+    def _close(self):
+        start, end, ids = self._open
+        self.scenes.append((start, end, tuple(sorted(ids))))
+        self._open = None
+
+
+def scenes_from_boxes(boxes, fps, cluster_gap):
+    """Szenen aus allen Frames mit Boxen (Index-Abfrage, Stichproben-Scan nach der Verfeinerung)."""
+    clusterer = SceneClusterer(cluster_gap)
+    for frame, ids in boxes.hits():
+        clusterer.add(frame / fps if fps > 0 else 0, ids)
+    return clusterer.finish()
+
+
+def scene_export_job(video_path, scene_idx, scene, pre, post, overlay):
+    """Szene → (scene_idx, start_sec, end_sec, overlay_text) für export_scenes."""
+    start, end, ids = scene
+    overlay_text = ""
+    if overlay:
+        names = sorted({COCO_CLASSES[c] for c in ids})
+        overlay_text = f"{os.path.basename(video_path)} | {', '.join(names)}"
+    return scene_idx, max(0, start - pre), end + post, overlay_text
+
+
+def export_window_joins(start_sec, group_end, pre, fps):
+    """True, wenn das Export-Fenster einer Szene ab start_sec an eine Gruppe bis group_end anschließen
+    muss. In Frames wie SceneExportSession._export: ein Start im selben Frame wie das Gruppenende
+    läge hinter der Decoder-Position und käme einen Frame zu spät."""
+    return int(max(0, start_sec - pre) * fps) <= int(group_end * fps)
+
+
+def group_export_jobs(video_path, scenes, first, pre, post, overlay, fps):
+    """Export-Aufträge ab Szene 'first', deren Fenster sich überlappen, als eine Gruppe: die
+    Export-Sitzung liest nur vorwärts und kann nicht zu einem früheren Fensterstart zurück."""
+    jobs = [scene_export_job(video_path, first, scenes[first], pre, post, overlay)]
+    while (first + len(jobs) < len(scenes)
+           and export_window_joins(scenes[first + len(jobs)][0], max(j[2] for j in jobs), pre, fps)):
+        k = first + len(jobs)
+        jobs.append(scene_export_job(video_path, k, scenes[k], pre, post, overlay))
+    return jobs
+
+
+class ExportWorker:
+    """Hintergrund-Thread, der abgeschlossene Szenen exportiert, während der Scan weiterläuft.
+    Aufträge laufen in Eingangsreihenfolge (wichtig für --merge-direct und die vorwärts lesende
+    Export-Sitzung). Jeder Auftrag wird als Stufe 'export_job' gemessen; 'finish_fn' läuft am
+    Ende im Thread (z. B. Decoder schließen). Fehler werden beim close() erneut ausgelöst."""
+
+    def __init__(self, export_fn, metrics=None, finish_fn=None):
+        self._export_fn = export_fn
+        self._metrics = metrics if metrics is not None else METRICS
+        self._finish_fn = finish_fn
+        self._queue = queue.Queue()
+        self._error = None
+        self.clips = []
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, jobs, boxes):
+        self._queue.put((jobs, boxes))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                if self._finish_fn is not None:
+                    self._finish_fn()
+                return
+            if self._error is not None:
+                continue
+            try:
+                with self._metrics.timed("export_job", len(item[0])):
+                    self.clips.extend(self._export_fn(*item))
+            except BaseException as e:
+                self._error = e
+
+    def close(self, cancel=False):
+        """Wartet auf alle Aufträge (cancel=True verwirft noch nicht begonnene) und liefert die Clips."""
+        if cancel:
+            try:
+                while True:
+                    self._queue.get_nowait()
+            except queue.Empty:
+                pass
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None and not cancel:
+            raise self._error
+        return self.clips
+
+# ------------------------
+# Bewegungs-Vorfilter (Motion-Gate) für statische Kameras
+# ------------------------
+class MotionGate:
+    """Günstiger Vorfilter auf verkleinerten Graustufen-Frames.
+    method='diff': Differenz zum zuletzt ausgewerteten Frame, method='mog2': Hintergrundmodell.
+    check() liefert True, wenn der Frame durchs Modell soll: Anteil geänderter Pixel >= threshold
+    oder spätestens nach max_skip übersprungenen Frames (Sicherheitsnetz)."""
+
+    def __init__(self, threshold=0.002, max_skip=50, method="diff", width=160, pixel_delta=25):
+        self.threshold = threshold
+        self.max_skip = max(0, int(max_skip))
+        self.method = method
+        self.width = width
+        self.pixel_delta = pixel_delta
+        self.checked = 0
+        self.skipped = 0
+        self._ref = None
+        self._force = True  # erster Frame (bzw. nach reset) wird immer ausgewertet
+        self._since_infer = 0
+        self._bg = cv2.createBackgroundSubtractorMOG2(history=500, detectShadows=False) \
+            if method == "mog2" else None
+
+    def _small_gray(self, frame):
+        h, w = frame.shape[:2]
+        sw = min(self.width, w)
+        small = cv2.resize(frame, (sw, max(1, int(h * sw / w))), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def check(self, frame):
+        self.checked += 1
+        gray = self._small_gray(frame)
+        if self._bg is not None:
+            mask = self._bg.apply(gray)
+            changed = cv2.countNonZero(mask) / mask.size
+        else:
+            if self._ref is None:
+                changed = 1.0
+            else:
+                diff = cv2.absdiff(gray, self._ref)
+                _, mask = cv2.threshold(diff, self.pixel_delta, 255, cv2.THRESH_BINARY)
+                changed = cv2.countNonZero(mask) / mask.size
+        if self._force or changed >= self.threshold or self._since_infer >= self.max_skip:
+            self._ref = gray
+            self._force = False
+            self._since_infer = 0
+            return True
+        self._since_infer += 1
+        self.skipped += 1
+        return False
+
+    def reset(self):
+        """Referenz verwerfen (z. B. nach einem Sprung im Video); Statistik bleibt erhalten."""
+        self._ref = None
+        self._force = True
+        self._since_infer = 0
+
+# ------------------------
+# Tracker zwischen Detektor-Keyframes (--detect-every)
+# ------------------------
+def box_iou(a, b):
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+class BoxTracker:
+    """Trägt Boxen zwischen Detektor-Keyframes per Sparse Optical Flow (Lucas-Kanade auf einem
+    Punktraster je Box, verkleinertes Graubild) weiter. Am Keyframe werden Detektor- und
+    getrackte Boxen per IoU abgeglichen: Detektor-Boxen gelten; Tracks ohne passende Detektion
+    bleiben bis zu max_age Keyframes erhalten, damit einzelne Aussetzer keine Lücke reißen."""
+
+    GRID = 5  # Punktraster GRID x GRID pro Box
+
+    def __init__(self, width=320, max_age=1, iou=0.3):
+        self.width = width
+        self.max_age = max_age
+        self.iou = iou
+        self.tracks = []  # [[x1, y1, x2, y2, cls, conf, age], ...] in Frame-Koordinaten
+        self._prev = None
+        self._scale = 1.0
+
+    def prepare(self, frame):
+        """Verkleinertes Graubild für den Fluss (auch für Zwischenframes im Batch gespeichert)."""
+        h, w = frame.shape[:2]
+        self._scale = min(1.0, self.width / w)
+        if self._scale < 1.0:
+            frame = cv2.resize(frame, (self.width, max(1, int(round(h * self._scale)))),
+                               interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    def keyframe(self, frame, detections):
+        """Detektor-Ergebnis übernehmen und mit den Tracks abgleichen; liefert die Boxen des Frames."""
+        tracks = [[*d, 0] for d in detections]
+        out = list(detections)
+        for t in self.tracks:
+            if any(d[4] == t[4] and box_iou(d, t) >= self.iou for d in detections):
+                continue
+            if t[6] < self.max_age:
+                tracks.append(t[:6] + [t[6] + 1])
+                out.append(tuple(t[:6]))
+        self.tracks = tracks
+        self._prev = self.prepare(frame)
+        return out
+
+    def track(self, gray):
+        """Tracks um den medianen Fluss ihrer Rasterpunkte verschieben; liefert die Boxen."""
+        if self._prev is not None and self.tracks:
+            s, n = self._scale, self.GRID
+            pts = []
+            for x1, y1, x2, y2 in (t[:4] for t in self.tracks):
+                mx, my = 0.1 * (x2 - x1), 0.1 * (y2 - y1)
+                for gx in np.linspace(x1 + mx, x2 - mx, n):
+                    for gy in np.linspace(y1 + my, y2 - my, n):
+                        pts.append((gx * s, gy * s))
+            p0 = np.array(pts, dtype=np.float32).reshape(-1, 1, 2)
+            p1, status, _ = cv2.calcOpticalFlowPyrLK(self._prev, gray, p0, None,
+                                                     winSize=(15, 15), maxLevel=2)
+            flow = (p1 - p0).reshape(-1, 2)
+            ok = status.reshape(-1) == 1
+            for k, t in enumerate(self.tracks):
+                sl = slice(k * n * n, (k + 1) * n * n)
+                good = flow[sl][ok[sl]]
+                if len(good) >= 3:
+                    dx, dy = (float(v) / s for v in np.median(good, axis=0))
+                    t[0] += dx
+                    t[2] += dx
+                    t[1] += dy
+                    t[3] += dy
+        self._prev = gray
+        return [tuple(t[:6]) for t in self.tracks]
+
+    def reset(self):
+        self.tracks = []
+        self._prev = None
+
+# ------------------------
+# Region of Interest + Kachel-Inferenz für hochauflösende Kameras
+#   ROI-Datei (JSON): <video>.roi.json, sonst roi.json im Videoordner, sonst --roi.
+#   {"polygons": [[[x, y], ...], ...], "mask": "maske.png", "relative": false,
+#    "tile": 640, "overlap": 0.2}
+#   Polygone in Quellpixeln (relative=true: Anteile 0..1), Maske relativ zur JSON-Datei.
+# ------------------------
+def nms(boxes, iou=0.5):
+    """Klassenweise Non-Maximum-Suppression über [(x1, y1, x2, y2, cls, conf), ...]."""
+    keep = []
+    for b in sorted(boxes, key=lambda b: -b[5]):
+        if all(k[4] != b[4] or box_iou(k, b) < iou for k in keep):
+            keep.append(b)
+    return keep
+
+
+class RegionOfInterest:
+    """Beschränkt die Inferenz auf Ausschnitte um die ROI (optional in überlappenden Kacheln)
+    und verwirft Boxen, deren Mittelpunkt außerhalb der Maske liegt. Ohne Polygone und Maske
+    gilt das ganze Bild als ROI (reine Kachel-Inferenz)."""
+
+    def __init__(self, polygons=None, mask=None, relative=False, tile=0, overlap=0.2,
+                 nms_iou=0.5, key=""):
+        self.polygons = [np.array(p, dtype=np.float64).reshape(-1, 2) for p in (polygons or [])]
+        self.mask_path = mask
+        self.relative = relative
+        self.tile = int(tile or 0)
+        self.overlap = min(max(float(overlap), 0.0), 0.9)
+        self.nms_iou = nms_iou
+        self.key = key  # Inhalt der ROI-Datei (Hash) für Checkpoint-Parameter
+        self._geometry = {}
+
+    def geometry(self, w, h, sx=1.0, sy=1.0):
+        """(Maske, Kacheln) für Frames der Größe w x h; sx/sy = Quelle/Frame (--decode-width)."""
+        key = (w, h)
+        if key not in self._geometry:
+            if self.mask_path:
+                mask = cv2.imread(self.mask_path, cv2.IMREAD_GRAYSCALE)
+                if mask is None:
+                    raise RuntimeError(f"ROI-Maske nicht lesbar: {self.mask_path}")
+                mask = cv2.resize(mask, (w, h), interpolation=cv2.INTER_NEAREST)
+                mask = np.where(mask > 0, 255, 0).astype(np.uint8)
+            elif self.polygons:
+                mask = np.zeros((h, w), dtype=np.uint8)
+            else:
+                # Weder Polygone noch Maske (nur tile/overlap): ganzes Bild, nur gekachelt
+                mask = np.full((h, w), 255, dtype=np.uint8)
+            for poly in self.polygons:
+                scale = (w, h) if self.relative else (1.0 / sx, 1.0 / sy)
+                cv2.fillPoly(mask, [np.round(poly * scale).astype(np.int32)], 255)
+            # [-2]: OpenCV 3 liefert (img, contours, hierarchy), OpenCV 4 (contours, hierarchy)
+            contours = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[-2]
+            tiles = []
+            for c in contours:
+                tiles.extend(self._tile(*cv2.boundingRect(c), w, h))
+            self._geometry[key] = (mask, tiles)
+        return self._geometry[key]
+
+    def _tile(self, x, y, rw, rh, w, h):
+        if not self.tile or (rw <= self.tile and rh <= self.tile):
+            return [(x, y, rw, rh)]
+        size = self.tile
+        stride = max(1, int(size * (1.0 - self.overlap)))
+
+        def starts(lo, length, limit):
+            if length <= size:
+                return [lo]
+            last = lo + length - size
+            out = list(range(lo, last, stride)) + [last]
+            return [max(0, min(v, limit - size)) for v in out]
+
+        return [(tx, ty, min(size, w - tx), min(size, h - ty))
+                for ty in starts(y, rh, h) for tx in starts(x, rw, w)]
+
+    def filter(self, w, h, boxes, sx=1.0, sy=1.0):
+        """Boxen mit Mittelpunkt in der Maske behalten; bei mehreren Ausschnitten Doppelte
+        aus den Überlappungen per NMS entfernen."""
+        mask, tiles = self.geometry(w, h, sx, sy)
+        inside = [b for b in boxes
+                  if mask[min(h - 1, max(0, int((b[1] + b[3]) / 2))),
+                          min(w - 1, max(0, int((b[0] + b[2]) / 2)))]]
+        return nms(inside, self.nms_iou) if len(tiles) > 1 else inside
+
+
+def load_roi(video_path, roi_file=None, tile=0, overlap=0.2):
+    """ROI für ein Video: <video>.roi.json, roi.json im Ordner oder 'roi_file'. None ohne ROI."""
+    candidates = (os.path.splitext(video_path)[0] + ".roi.json",
+                  os.path.join(os.path.dirname(os.path.abspath(video_path)), "roi.json"),
+                  roi_file)
+    for path in candidates:
+        if not path or not os.path.isfile(path):
+            continue
+        with open(path, "rb") as f:
+            raw = f.read()
+        try:
+            cfg = json.loads(raw.decode("utf-8"))
+        except ValueError as e:
+            raise RuntimeError(f"ROI-Datei {path} ist kein gültiges JSON: {e}")
+        mask = cfg.get("mask")
+        if mask and not os.path.isabs(mask):
+            mask = os.path.join(os.path.dirname(os.path.abspath(path)), mask)
+        return RegionOfInterest(
+            polygons=cfg.get("polygons"), mask=mask, relative=cfg.get("relative", False),
+            tile=cfg.get("tile", tile), overlap=cfg.get("overlap", overlap),
+            key=f"{tile}|{overlap}|" + hashlib.sha1(raw).hexdigest()[:16]
+        )
+    return None
+
+
+def run_model_roi(model, frames, classes, confidence, roi, sx=1.0, sy=1.0):
+    """Modell nur auf den ROI-Kacheln aller Frames (EIN Aufruf). Liefert (Boxen pro Frame in
+    Frame-Koordinaten, Rohergebnisse)."""
+    crops, owners = [], []
+    for i, frame in enumerate(frames):
+        _, tiles = roi.geometry(frame.shape[1], frame.shape[0], sx, sy)
+        for x, y, w, h in tiles:
+            crops.append(frame[y:y + h, x:x + w])
+            owners.append((i, x, y))
+    per_frame = [[] for _ in frames]
+    results = run_model(model, crops, classes, confidence) if crops else []
+    for (i, ox, oy), res in zip(owners, results):
+        per_frame[i].extend((x1 + ox, y1 + oy, x2 + ox, y2 + oy, c, cf)
+                            for x1, y1, x2, y2, c, cf in result_boxes(res))
+    boxes = [roi.filter(f.shape[1], f.shape[0], b, sx, sy) for f, b in zip(frames, per_frame)]
+    return boxes, results
+
+# ------------------------
+# Checkpoints (Sidecar-Journal pro Video, atomar per rename)
+#   Erlaubt Resume MITTEN im Video: letzter verarbeiteter Frame + bisherige Treffer.
+# ------------------------
+def _video_key(video_path, root=None):
+    """Absoluter Pfad; mit 'root' der Pfad relativ dazu (gemeinsames Journal mehrerer Hosts mit
+    unterschiedlichen Mountpunkten, gleiche Schlüssel wie die WorkQueue)."""
+    path = os.path.abspath(video_path)
+    if root:
+        return os.path.relpath(path, os.path.abspath(root)).replace(os.sep, "/")
+    return path
+
+
+def _journal_path(journal_dir, video_path, root=None):
+    key = hashlib.sha1(_video_key(video_path, root).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(journal_dir, f"{key}.json")
+
+
+def _video_identity(video_path, root=None):
+    st = os.stat(video_path)
+    return {"video": _video_key(video_path, root), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def write_text_atomic(path, text):
+    """Schreibt Text über Temp-Datei + fsync + os.replace (nie halb geschriebene Dateien)."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def write_json_atomic(path, data):
+    write_text_atomic(path, json.dumps(data))
+
+
+def save_checkpoint(journal_dir, video_path, params, frame, boxes, root=None):
+    """Treffer und Szenen lassen sich vollständig aus den Boxen rekonstruieren."""
+    os.makedirs(journal_dir, exist_ok=True)
+    data = _video_identity(video_path, root)
+    data.update({
+        "params": params,
+        "frame": frame,
+        "boxes": boxes.to_dict(),
+    })
+    write_json_atomic(_journal_path(journal_dir, video_path, root), data)
+
+
+def load_checkpoint(journal_dir, video_path, params, root=None):
+    """Liefert den Checkpoint, wenn Datei (Größe/mtime) und Scan-Parameter noch passen, sonst None."""
+    path = _journal_path(journal_dir, video_path, root)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        ident = _video_identity(video_path, root)
+    except (OSError, ValueError):
+        return None
+    if any(data.get(k) != v for k, v in ident.items()) or data.get("params") != params:
+        return None
+    return data
+
+
+def clear_checkpoint(journal_dir, video_path, root=None):
+    try:
+        os.remove(_journal_path(journal_dir, video_path, root))
+    except OSError:
+        pass
+
+# ------------------------
+# Persistenter Detektionsindex (SQLite)
+#   Scan mit --index-db speichert ALLE Klassen ab --index-floor; der Unterbefehl
+#   'query' beantwortet danach neue Klassen/Schwellen/Gaps ohne Inferenz.
+# ------------------------
+_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER, mtime_ns INTEGER,
+    fps REAL, frames INTEGER, width INTEGER, height INTEGER,
+    floor REAL, scanned TEXT, complete INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS dets (
+    video_id INTEGER NOT NULL, frame INTEGER NOT NULL, cls INTEGER NOT NULL, conf REAL NOT NULL,
+    x1 REAL, y1 REAL, x2 REAL, y2 REAL
+);
+CREATE INDEX IF NOT EXISTS dets_lookup ON dets (video_id, cls, frame);
+"""
+
+
+class DetectionIndex:
+    """SQLite-Index mit einer Zeile pro Box (Video, Frame, Klasse, Confidence, xyxy).
+    Ein Video gilt erst nach finish_video() als vollständig und abfragbar. Videos stehen unter
+    ihrem absoluten Pfad: abfragbar aus jedem Arbeitsverzeichnis, keine Doppel je Pfadschreibweise."""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_INDEX_SCHEMA)
+        self._video_id = None
+        self._rows = []
+
+    def begin_video(self, video_path, fps, frames, floor, resume_frame=-1, step=1):
+        """Video anlegen/zurücksetzen. Zeilen hinter resume_frame (Reste eines Abbruchs) werden gelöscht,
+        bei Stichproben-Scans (step > 1) auch alle Zeilen außerhalb des Stichprobenrasters: der Checkpoint
+        deckt nur den Grobscan ab, die Verfeinerungsfenster (nie ein Vielfaches von step) laufen erneut."""
+        st = os.stat(video_path)
+        meta = probe_media(video_path)
+        video_path = os.path.abspath(video_path)
+        self.conn.execute(
+            "INSERT INTO videos (path, size, mtime_ns, fps, frames, width, height, floor, complete) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0) "
+            "ON CONFLICT(path) DO UPDATE SET size=excluded.size, mtime_ns=excluded.mtime_ns, "
+            "fps=excluded.fps, frames=excluded.frames, width=excluded.width, height=excluded.height, "
+            "floor=excluded.floor, complete=0",
+            (video_path, st.st_size, st.st_mtime_ns, fps, frames, meta["width"], meta["height"], floor))
+        self._video_id = self.conn.execute("SELECT id FROM videos WHERE path = ?", (video_path,)).fetchone()[0]
+        self.conn.execute("DELETE FROM dets WHERE video_id = ? AND (frame > ? OR frame % ? != 0)",
+                          (self._video_id, resume_frame, max(1, int(step))))
+        self.conn.commit()
+        self._rows = []
+
+    def add(self, frame_idx, boxes):
+        vid = self._video_id
+        self._rows.extend((vid, frame_idx, int(c), float(cf), x1, y1, x2, y2)
+                          for x1, y1, x2, y2, c, cf in boxes)
+        if len(self._rows) >= 50000:
+            self.commit()
+
+    def commit(self):
+        if self._rows:
+            self.conn.executemany("INSERT INTO dets VALUES (?, ?, ?, ?, ?, ?, ?, ?)", self._rows)
+            self._rows = []
+        self.conn.commit()
+
+    def finish_video(self, scanned_ranges):
+        self.commit()
+        self.conn.execute("UPDATE videos SET complete = 1, scanned = ? WHERE id = ?",
+                          (json.dumps(scanned_ranges), self._video_id))
+        self.conn.commit()
+        self._video_id = None
+
+    def videos(self, prefix=None):
+        """Vollständig indizierte Videos als Dicts (nach Pfad sortiert)."""
+        cur = self.conn.execute(
+            "SELECT id, path, size, mtime_ns, fps, floor, scanned FROM videos WHERE complete = 1 ORDER BY path")
+        keys = ("id", "path", "size", "mtime_ns", "fps", "floor", "scanned")
+        rows = [dict(zip(keys, r)) for r in cur]
+        if prefix:
+            # Präfix wie die gespeicherten Pfade absolut machen (abschließendes '/' bleibt erhalten)
+            tail = os.sep if prefix.endswith(("/", os.sep)) else ""
+            prefix = os.path.abspath(prefix).rstrip(os.sep) + tail
+            rows = [r for r in rows if r["path"].startswith(prefix)]
+        return rows
+
+    def load(self, video, classes, confidence):
+        """Boxen eines Videos für neue Klassen/Schwelle als FrameBoxes."""
+        marks = ",".join("?" * len(classes))
+        cur = self.conn.execute(
+            f"SELECT frame, x1, y1, x2, y2, cls, conf FROM dets "
+            f"WHERE video_id = ? AND conf >= ? AND cls IN ({marks}) ORDER BY frame, rowid",
+            [video["id"], confidence] + list(classes))
+        boxes = FrameBoxes()
+        current, frame_boxes = None, []
+        for frame, x1, y1, x2, y2, c, cf in cur:
+            if frame != current and frame_boxes:
+                boxes.add(current, frame_boxes)
+                frame_boxes = []
+            current = frame
+            frame_boxes.append((x1, y1, x2, y2, c, cf))
+        if frame_boxes:
+            boxes.add(current, frame_boxes)
+        # Abdeckung wie beim Scan (auch Frames ohne Treffer)
+        boxes.scanned = json.loads(video["scanned"] or "[]")
+        return boxes
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+# ------------------------
+# Szenen clustern, Log schreiben, exportieren (Scan und Index-Abfrage)
+# ------------------------
+def export_scene_jobs(video_path, export_jobs, model, boxes, classes, export_dir,
+                      export=False, overlay=False, overlay_pos="tl",
+                      overlay_size=0.5, overlay_color=(255, 255, 255), confidence=0.8,
+                      silence_decoder_warnings=False, quiet=False, no_boxes=False,
+                      cut_mode="encode", highlight=None, metrics=None, roi=None, session=None):
+    """Exportiert Szenen-Aufträge per Stream-Copy (nichts zu zeichnen) oder export_scenes.
+    Mit 'session' (SceneExportSession) liest der Export in der laufenden Dekodier-Sitzung weiter."""
+    if not export_jobs:
+        return []
+    if highlight is None and cut_mode in ("copy", "smart") and no_boxes and not overlay:
+        # Nichts zu zeichnen → Stream-Copy statt Dekodieren/Neukodieren
+        with (metrics if metrics is not None else METRICS).timed("export_copy", len(export_jobs)):
+            return export_scenes_copy(video_path, export_jobs, export_dir, cut_mode, quiet=quiet)
+    if session is not None:
+        return session.export(export_jobs, boxes)
+    return export_scenes(
+        video_path, export_jobs, model, export_dir,
+        overlay, overlay_pos, overlay_size, overlay_color, confidence,
+        silence_decoder_warnings, quiet=quiet, no_boxes=no_boxes,
+        boxes=boxes, classes=classes, highlight=highlight, write_clips=export,
+        metrics=metrics, roi=roi
+    )
+
+
+def write_scene_log(log_file, video_path, scenes):
+    """Logzeile 'pfad: mm:ss, ...' (Szenenstarts) bzw. 'pfad: -' ohne Treffer."""
+    if scenes:
+        stamps = [f"{int(start // 60):02d}:{int(start % 60):02d}" for start, _, _ in scenes]
+        log_file.write(f"{video_path}: {', '.join(stamps)}\n")
+    else:
+        log_file.write(f"{video_path}: -\n")
+    log_file.flush()
+
+
+def finalize_video(video_path, scenes, boxes, model, classes, log_file,
+                   export=False, overlay=False, overlay_pos="tl",
+                   overlay_size=0.5, overlay_color=(255, 255, 255),
+                   pre=0.0, post=2.0, confidence=0.8,
+                   export_dir="./export", silence_decoder_warnings=False,
+                   quiet=False, no_boxes=False, cut_mode="encode",
+                   highlight=None, metrics=None, roi=None):
+    """Exportiert alle Szenen [(start, end, Klassen-IDs), ...] in einem Durchlauf und
+    schreibt die Logzeile. Liefert die Clip-Pfade."""
+    clips = []
+    if scenes and (export or highlight is not None):
+        export_jobs = [scene_export_job(video_path, idx, scene, pre, post, overlay)
+                       for idx, scene in enumerate(scenes)]
+        clips = export_scene_jobs(
+            video_path, export_jobs, model, boxes, classes, export_dir,
+            export=export, overlay=overlay, overlay_pos=overlay_pos,
+            overlay_size=overlay_size, overlay_color=overlay_color, confidence=confidence,
+            silence_decoder_warnings=silence_decoder_warnings, quiet=quiet,
+            no_boxes=no_boxes, cut_mode=cut_mode, highlight=highlight, metrics=metrics, roi=roi
+        )
+    write_scene_log(log_file, video_path, scenes)
+    return clips
 
 # ------------------------
 # Verarbeitung eines Videos
@@ -216,9 +2402,21 @@ def process_video(video_path, model, classes, log_file,
                   overlay_size=0.5, overlay_color=(255, 255, 255),
                   pre=0.0, post=2.0, confidence=0.8,
                   export_dir="./export", silence_decoder_warnings=False,
-                  quiet=False, cluster_gap=2.0, no_boxes=False):
+                  quiet=False, cluster_gap=2.0, no_boxes=False, batch_size=1,
+                  decode_queue=0, progress=True, cut_mode="encode", highlight=None,
+                  motion_threshold=None, motion_max_skip=50, motion_method="diff",
+                  sample_fps=None, decoder="opencv", decode_width=0,
+                  checkpoint_dir=None, checkpoint_every=0.0, checkpoint_root=None,
+                  index_db=None, index_floor=0.25, metrics=None, metrics_dir=None,
+                  detect_every=1, roi_file=None, roi_tile=0, roi_overlap=0.2):
+    vm = metrics if metrics is not None else Metrics()  # Stufenzeiten dieses Videos
+    t_start = time.perf_counter()
+    # ROI zuerst: eine defekte ROI-Datei wirft, bevor Decoder und Index offen sind
+    roi = load_roi(video_path, roi_file, roi_tile, roi_overlap)
     with suppress_stderr_fd(quiet or silence_decoder_warnings):
-        cap = cv2.VideoCapture(video_path)
+        # Ring groß genug für alle gleichzeitig referenzierten Frames (Queue + Batch)
+        cap = open_capture(video_path, decoder, decode_width,
+                           buffers=max(0, decode_queue) + max(1, int(batch_size)) + 4)
         if not cap.isOpened():
             if not quiet:
                 print(f"Fehler: {video_path} nicht geöffnet.")
@@ -228,19 +2426,188 @@ def process_video(video_path, model, classes, log_file,
 
         fps = cap.get(cv2.CAP_PROP_FPS)
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        frame_idx = 0
-        detections = []
+        boxes = FrameBoxes()
         paused = False
+        batch_size = max(1, int(batch_size))
+        batch = []  # [(frame_idx, frame, infer), ...]; infer=False → vom Motion-Gate übersprungen
+        # FFmpegCapture liefert Ringpuffer: jeder Decoder-Read belegt einen Platz, auch für übersprungene
+        # und getrackte Frames. Spätestens nach batch_size Reads seit dem ältesten wartenden Modell-Frame
+        # auswerten, sonst überschreibt der Ring ihn (Platz für Queue + Batch reserviert)
+        ring_reads = batch_size if isinstance(cap, FFmpegCapture) else 0
+        ring_start = None  # Position des ältesten wartenden Modell-Frames in 'batch'
+        gate = MotionGate(motion_threshold, motion_max_skip, motion_method) \
+            if motion_threshold is not None else None
+        last_boxes = []  # Ergebnis des zuletzt ausgewerteten Frames (für übersprungene Frames)
+        # --detect-every: Modell nur auf jedem N-ten Frame, dazwischen Optical-Flow-Tracker
+        detect_every = max(1, int(detect_every))
+        tracker = BoxTracker() if detect_every > 1 else None
+        since_key = detect_every  # Frames seit dem letzten Keyframe (Start: sofort Keyframe)
+        # Mit Index: alle Klassen ab Mindest-Confidence scannen, für diesen Lauf danach filtern
+        index = DetectionIndex(index_db) if index_db else None
+        scan_classes = None if index is not None else classes
+        scan_conf = min(index_floor, confidence) if index is not None else confidence
+        class_set = set(classes)
 
-        with tqdm(
-            total=total_frames,
-            desc=os.path.basename(video_path),
-            unit="frame",
-            leave=False,
-            file=sys.stdout,
-            disable=quiet
-        ) as pbar:
-            fail_count = 0
+        # Stichproben-Scan: nur jeden 'step'-ten Frame auswerten
+        step = 1
+        if sample_fps and fps > 0 and sample_fps < fps:
+            step = max(1, int(round(fps / sample_fps)))
+            if step / fps > cluster_gap and not quiet:
+                print(f"[!] Stichprobenabstand {step / fps:.2f}s > --cluster-gap, Szenen können zerfallen.")
+        if isinstance(cap, FFmpegCapture):
+            # ffmpeg verwirft die übrigen Frames schon im Decoder
+            cap.step = step
+        sx, sy = getattr(cap, "box_scale", (1.0, 1.0))
+
+        # Szenen fortlaufend clustern; abgeschlossene Szenen exportiert ein Hintergrund-Thread,
+        # während der Scan weiterläuft (nicht bei --sample-fps: die Verfeinerung verschiebt Grenzen)
+        clusterer = SceneClusterer(cluster_gap) if step == 1 else None
+        worker = None
+        submitted = 0  # Anzahl an den Export-Thread übergebener Szenen
+
+        # Eine Dekodier-Sitzung für alle Szenen des Videos: liest vorwärts, ohne Seek.
+        # model=None: Boxen kommen aus dem Scan, das Modell bleibt im Scan-Thread
+        session = SceneExportSession(
+            video_path, None, export_dir, overlay, overlay_pos, overlay_size, overlay_color,
+            confidence, silence_decoder_warnings, quiet, no_boxes, classes,
+            highlight, export, vm
+        )
+
+        def export_fn(jobs, scene_boxes):
+            return export_scene_jobs(
+                video_path, jobs, None, scene_boxes, classes, export_dir,
+                export=export, overlay=overlay, overlay_pos=overlay_pos,
+                overlay_size=overlay_size, overlay_color=overlay_color, confidence=confidence,
+                silence_decoder_warnings=silence_decoder_warnings, quiet=quiet,
+                no_boxes=no_boxes, cut_mode=cut_mode, highlight=highlight, metrics=vm,
+                session=session
+            )
+
+        if clusterer is not None and (export or highlight is not None):
+            worker = ExportWorker(export_fn, vm, finish_fn=session.close)
+
+        def pump(pos_sec, final=False):
+            """Szenen abschließen, deren letzter Treffer mehr als cluster_gap + post zurückliegt, und
+            an den Export-Thread geben, sobald ihr Export-Fenster komplett gescannt ist."""
+            nonlocal submitted
+            if final:
+                clusterer.finish()
+            else:
+                clusterer.close_idle(pos_sec, cluster_gap + post)
+            if worker is None:
+                return
+            scenes = clusterer.scenes
+            while submitted < len(scenes):
+                jobs = group_export_jobs(video_path, scenes, submitted, pre, post, overlay, fps)
+                group_end = max(j[2] for j in jobs)
+                if not final:
+                    if submitted + len(jobs) == len(scenes):
+                        # Künftige Szenen starten frühestens bei der offenen Szene bzw. der Scan-Position
+                        nxt = clusterer.open_start
+                        if export_window_joins(pos_sec if nxt is None else nxt, group_end, pre, fps):
+                            break
+                    if pos_sec <= group_end:
+                        break  # Export-Fenster noch nicht komplett gescannt
+                # Eigene Kopie der Boxen: der Scan-Thread schreibt weiter in 'boxes'
+                scene_boxes = None if no_boxes else boxes.slice(int(jobs[0][1] * fps), int(group_end * fps))
+                worker.submit(jobs, scene_boxes)
+                submitted += len(jobs)
+
+        # Checkpoint-Resume: nur bei unveränderter Datei und gleichen Scan-Parametern
+        ckpt_params = {"classes": sorted(classes), "confidence": confidence, "step": step,
+                       "decoder": decoder, "decode_width": decode_width,
+                       "motion_threshold": motion_threshold, "detect_every": detect_every,
+                       "roi": roi.key if roi is not None else None,
+                       "index_db": index_db, "index_floor": index_floor if index_db else None}
+        start_idx = 0
+        last_done = -1        # letzter vollständig ausgewerteter Frame im Grobscan
+        in_coarse = True
+        last_ckpt = time.monotonic()
+        if checkpoint_dir and checkpoint_every > 0:
+            ckpt = load_checkpoint(checkpoint_dir, video_path, ckpt_params, checkpoint_root)
+            if ckpt is not None:
+                last_done = ckpt["frame"]
+                boxes = FrameBoxes.from_dict(ckpt["boxes"])
+                if clusterer is not None:
+                    # Szenen aus den gesicherten Boxen; schon abgeschlossene werden erneut exportiert
+                    for frame, ids in boxes.hits():
+                        clusterer.add(frame / fps if fps > 0 else 0, ids)
+                    pump(last_done / fps if fps > 0 else 0)
+                # nächster Stichproben-Frame nach dem Checkpoint
+                start_idx = ((last_done + 1 + step - 1) // step) * step
+                cap.set(cv2.CAP_PROP_POS_FRAMES, start_idx)
+                if not quiet:
+                    print(f"[→] Checkpoint gefunden, setze {os.path.basename(video_path)} bei Frame {start_idx} fort.")
+        if index is not None:
+            index.begin_video(video_path, fps, total_frames, scan_conf, resume_frame=last_done, step=step)
+
+        def checkpoint(force=False):
+            nonlocal last_ckpt
+            if not (checkpoint_dir and checkpoint_every > 0 and in_coarse and last_done >= 0):
+                return
+            if not force and time.monotonic() - last_ckpt < checkpoint_every:
+                return
+            with vm.timed("checkpoint"):
+                if index is not None:
+                    index.commit()  # Index-Zeilen bis last_done müssen vor dem Checkpoint stehen
+                save_checkpoint(checkpoint_dir, video_path, ckpt_params, last_done, boxes, checkpoint_root)
+            last_ckpt = time.monotonic()
+
+        def flush_batch():
+            """Gesammelte Frames in einem Modellaufruf auswerten und Treffer den Frame-Indizes zuordnen.
+            Getrackte Zwischenframes (frame = kleines Graubild) bekommen die Boxen vom Tracker,
+            vom Motion-Gate übersprungene das Ergebnis des letzten ausgewerteten Frames."""
+            nonlocal last_boxes, last_done, ring_start
+            ring_start = None
+            if not batch:
+                return
+            to_infer = [f for _, f, infer in batch if infer]
+            detected = []
+            if to_infer:
+                with vm.timed("model", len(to_infer)):
+                    if roi is not None:
+                        # Nur ROI-Kacheln ins Modell, Boxen schon in Frame-Koordinaten
+                        detected, results = run_model_roi(model, to_infer, scan_classes, scan_conf, roi, sx, sy)
+                    else:
+                        results = run_model(model, to_infer, scan_classes, scan_conf)
+                for res in results:
+                    observe_model_speed(vm, res)
+                if roi is None:
+                    detected = [result_boxes(res) for res in results]
+            detected = iter(detected)
+            with vm.timed("results", len(batch)):
+                for idx, frame, infer in batch:
+                    if infer or (tracker is not None and frame is not None):
+                        if infer:
+                            last_boxes = next(detected)
+                            if tracker is not None:
+                                with vm.timed("track"):
+                                    last_boxes = tracker.keyframe(frame, last_boxes)
+                        else:
+                            with vm.timed("track"):
+                                last_boxes = tracker.track(frame)
+                        if (sx, sy) != (1.0, 1.0):
+                            # Boxen vom verkleinerten Decoder-Frame auf Quellkoordinaten
+                            last_boxes = [(x1 * sx, y1 * sy, x2 * sx, y2 * sy, c, cf)
+                                          for x1, y1, x2, y2, c, cf in last_boxes]
+                    frame_boxes = last_boxes
+                    if index is not None:
+                        index.add(idx, frame_boxes)
+                        frame_boxes = [b for b in frame_boxes if b[4] in class_set and b[5] >= confidence]
+                    boxes.add(idx, frame_boxes)
+                    if frame_boxes and clusterer is not None:
+                        clusterer.add(idx / fps if fps > 0 else 0, [b[4] for b in frame_boxes])
+            if clusterer is not None and fps > 0:
+                pump(batch[-1][0] / fps)
+            pbar.update(len(batch))
+            if in_coarse:
+                last_done = batch[-1][0]
+            batch.clear()
+            checkpoint()
+
+        def consume(source):
+            """Frames aus 'source' (Pause/Motion-Gate/Keyframes/Batching) bis zum Ende auswerten."""
+            nonlocal paused, since_key, ring_start
             while True:
                 key = key_pressed()
                 if key == "p":
@@ -248,121 +2615,385 @@ def process_video(video_path, model, classes, log_file,
                     if not quiet:
                         print("[*] Pause" if paused else "[*] Weiter")
                 if paused:
+                    # Decoder-Thread läuft nur bis die Queue voll ist und wartet dann
                     time.sleep(0.2)
                     continue
 
-                ret, frame = cap.read()
-                if not ret:
-                    fail_count += 1
-                    if fail_count <= 2:
-                        continue
+                item = next(source, None)
+                if item is None:
                     break
-                fail_count = 0
 
-                results = model(frame, classes=classes, conf=confidence, verbose=False)
-                if len(results[0].boxes) > 0:
-                    seconds = frame_idx / fps if fps > 0 else 0
-                    detections.append((seconds, [COCO_CLASSES[int(b.cls[0])] for b in results[0].boxes]))
-                frame_idx += 1
-                pbar.update(1)
+                idx, frame = item
+                if gate is not None:
+                    with vm.timed("motion_gate"):
+                        infer = gate.check(frame)
+                else:
+                    infer = True
+                if infer and tracker is not None and since_key + 1 < detect_every:
+                    # Zwischenframe: nur das kleine Graubild für den Tracker aufheben
+                    since_key += 1
+                    with vm.timed("track"):
+                        batch.append((idx, tracker.prepare(frame), False))
+                elif infer:
+                    since_key = 0
+                    if ring_start is None:
+                        ring_start = len(batch)
+                    batch.append((idx, frame, True))
+                else:
+                    batch.append((idx, None, False))
+                if sum(1 for b in batch if b[2]) >= batch_size \
+                        or (ring_reads and ring_start is not None and len(batch) - ring_start >= ring_reads):
+                    flush_batch()
+            # Rest-Batch am Ende der Quelle
+            flush_batch()
+
+        # Decoder-Thread nur bei --decode-queue > 0, sonst wie bisher sequenziell
+        frames = iter_frames(cap, start_idx=start_idx, step=step)
+        reader = PrefetchReader(frames, decode_queue) if decode_queue > 0 else None
+        # Wartezeit auf Frames (mit --decode-queue nur der Anteil, den der Decoder-Thread nicht verdeckt)
+        source = vm.timed_iter("decode", reader if reader is not None else frames)
+
+        # Stufe 'scan': Scan-Schleife inkl. Verfeinerung, ohne Abschluss-Export (Stufe 'finalize')
+        t_scan = time.perf_counter()
+        try:
+            with tqdm(
+                total=(total_frames + step - 1) // step,
+                desc=os.path.basename(video_path),
+                unit="frame",
+                leave=False,
+                file=sys.stdout,
+                disable=quiet or not progress
+            ) as pbar:
+                pbar.update(start_idx // step)
+                try:
+                    consume(source)
+                except KeyboardInterrupt:
+                    # Stand bei STRG+C sichern, nächster Lauf setzt hier fort
+                    checkpoint(force=True)
+                    raise
+                if reader is not None:
+                    reader.close()
+                    reader = None
+                # Grobscan komplett → Checkpoint steht am Ende, Verfeinerung läuft ggf. erneut
+                checkpoint(force=True)
+                in_coarse = False
+
+                # Dichte Verfeinerung um Stichproben-Treffer (Szenengrenzen framegenau)
+                hit_frames = [frame for frame, _ in boxes.hits()]
+                for lo, hi in refine_windows(hit_frames, step, total_frames):
+                    pbar.total += hi - lo + 1
+                    pbar.refresh()
+                    if isinstance(cap, FFmpegCapture):
+                        cap.step = 1
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, lo)
+                    last_boxes = []
+                    if gate is not None:
+                        gate.reset()
+                    if tracker is not None:
+                        tracker.reset()
+                        since_key = detect_every
+                    consume(vm.timed_iter("decode", iter_frames(cap, start_idx=lo, end_idx=hi)))
+        except BaseException:
+            # Abbruch: bisherige Index-Zeilen sichern (Reste hinter dem Checkpoint räumt begin_video auf)
+            if index is not None:
+                index.close()
+            if worker is not None:
+                worker.close(cancel=True)
+            raise
+        finally:
+            if reader is not None:
+                reader.close()
+            cap.release()
+        vm.observe("scan", time.perf_counter() - t_scan)
+
+        if index is not None:
+            index.finish_video(boxes.scanned_ranges())
+            index.close()
+
+        if clusterer is not None:
+            # Restliche Szenen exportieren; noch im stderr-Kontext, den auch der Export-Thread nutzt
+            with vm.timed("finalize"):
+                pump(0.0, final=True)
+                clips = worker.close() if worker is not None else []
+            write_scene_log(log_file, video_path, clusterer.scenes)
+
+    if gate is not None and not quiet and gate.checked:
+        print(f"[i] Motion-Gate {os.path.basename(video_path)}: {gate.skipped} von {gate.checked} Frames "
+              f"ohne Inferenz ({100.0 * gate.skipped / gate.checked:.1f}%)")
+
+    if clusterer is None:
+        # Stichproben-Scan: Szenen erst nach der Verfeinerung, Export in einem Durchlauf
+        with vm.timed("finalize"):
+            clips = finalize_video(
+                video_path, scenes_from_boxes(boxes, fps, cluster_gap), boxes, model, classes, log_file,
+                export=export, overlay=overlay, overlay_pos=overlay_pos,
+                overlay_size=overlay_size, overlay_color=overlay_color,
+                pre=pre, post=post, confidence=confidence, export_dir=export_dir,
+                silence_decoder_warnings=silence_decoder_warnings, quiet=quiet,
+                no_boxes=no_boxes, cut_mode=cut_mode, highlight=highlight, metrics=vm, roi=roi
+            )
+
+    # Video abgeschlossen → Checkpoint wird nicht mehr gebraucht
+    if checkpoint_dir:
+        clear_checkpoint(checkpoint_dir, video_path, checkpoint_root)
+
+    wall = time.perf_counter() - t_start
+    if metrics is None:
+        METRICS.merge(vm.to_dict())
+    if metrics_dir:
+        os.makedirs(metrics_dir, exist_ok=True)
+        decoded = vm.stages.get("decode", {}).get("items", 0)
+        write_json_atomic(metrics_path(metrics_dir, video_path), {
+            "video": video_path,
+            "wall_seconds": round(wall, 3),
+            "frames": decoded,
+            "fps": round(decoded / wall, 2) if wall > 0 else 0.0,
+            "clips": len(clips),
+            "stages": vm.summary(wall),
+        })
+    return clips
+
+# ------------------------
+# Direkter Highlight-Renderer (--merge-direct)
+#   Annotierte Frames werden skaliert/letterboxed per rawvideo-Pipe in EINEN
+#   ffmpeg-Encoder geschrieben → das Highlight wird genau einmal kodiert.
+# ------------------------
+def parse_merge_ratio(merge_ratio, quiet=False):
+    """'1920x1080' → (1920, 1080), sonst (None, None)."""
+    if merge_ratio and "x" in merge_ratio:
+        try:
+            w, h = [int(x) for x in merge_ratio.split("x")]
+            return w, h
+        except ValueError:
+            if not quiet:
+                print("[!] Ungültiges --merge-ratio Format, benutze automatische Auswahl.")
+    return None, None
+
+
+def letterbox(frame, target_w, target_h):
+    """Skaliert seitenverhältnistreu auf target_w x target_h und füllt den Rest schwarz auf."""
+    h, w = frame.shape[:2]
+    if (w, h) == (target_w, target_h):
+        return frame
+    scale = min(target_w / w, target_h / h)
+    nw, nh = max(1, int(round(w * scale))), max(1, int(round(h * scale)))
+    interp = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+    resized = cv2.resize(frame, (nw, nh), interpolation=interp)
+    left, top = (target_w - nw) // 2, (target_h - nh) // 2
+    return cv2.copyMakeBorder(resized, top, target_h - nh - top, left, target_w - nw - left,
+                              cv2.BORDER_CONSTANT, value=(0, 0, 0))
+
+
+class HighlightWriter:
+    """Persistenter ffmpeg-Encoder für das Highlight-Video (rawvideo bgr24 über stdin).
+    Zielgröße aus --merge-ratio oder vom ersten Frame; Bildrate fest (--merge-fps oder
+    die des ersten Clips). Abweichende Quell-fps werden per Frame-Duplizieren/-Auslassen angepasst."""
+
+    def __init__(self, output_path, target_w=None, target_h=None, fps=None, quiet=False):
+        self.output_path = output_path
+        self.target_w, self.target_h = target_w, target_h
+        self.fps = fps
+        self.quiet = quiet
+        self.frames_written = 0
+        self._proc = None
+        self._src_fps = None
+        self._src_n = 0
+        self._out_n = 0
+
+    def _start(self, frame):
+        if not self.target_w or not self.target_h:
+            self.target_h, self.target_w = frame.shape[:2]
+        # yuv420p braucht gerade Maße
+        self.target_w -= self.target_w % 2
+        self.target_h -= self.target_h % 2
+        self.fps = self.fps or self._src_fps or 25.0
+        out_dir = os.path.dirname(os.path.abspath(self.output_path))
+        os.makedirs(out_dir, exist_ok=True)
+        self._proc = subprocess.Popen([
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "rawvideo", "-pix_fmt", "bgr24",
+            "-s", f"{self.target_w}x{self.target_h}", "-r", f"{self.fps}",
+            "-i", "-",
+            "-c:v", "libx264", "-crf", "18", "-preset", "veryfast",
+            "-pix_fmt", "yuv420p", "-movflags", "+faststart",
+            self.output_path
+        ], stdin=subprocess.PIPE)
+
+    def begin_clip(self, src_fps):
+        """Neuer Abschnitt mit eigener Quell-Bildrate."""
+        self._src_fps = src_fps if src_fps and src_fps > 0 else None
+        self._src_n = 0
+        self._out_n = 0
+
+    def write(self, frame):
+        if self._proc is None:
+            self._start(frame)
+        self._src_n += 1
+        if self._src_fps:
+            due = int(round(self._src_n * self.fps / self._src_fps))
+        else:
+            due = self._src_n
+        if due <= self._out_n:
+            return
+        img = letterbox(frame, self.target_w, self.target_h)
+        data = img.data if img.flags["C_CONTIGUOUS"] else img.tobytes()
+        try:
+            for _ in range(due - self._out_n):
+                self._proc.stdin.write(data)
+                self.frames_written += 1
+        except BrokenPipeError:
+            raise RuntimeError("ffmpeg-Encoder für das Highlight-Video wurde beendet.")
+        self._out_n = due
+
+    def close(self):
+        if self._proc is None:
+            return False
+        try:
+            self._proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        ret = self._proc.wait()
+        self._proc = None
+        if ret == 0 and not self.quiet:
+            print(f"[✓] Highlight-Video erstellt: {self.output_path} ({self.target_w}x{self.target_h})")
+        return ret == 0
+
+# ------------------------
+# Hilfsfunktionen für Merge (Normalisierung & Concat)
+# ------------------------
+_NORM_CACHE_VERSION = 2
+# Einheitliche Zeitbasis und Tonspur aller normalisierten Clips (Voraussetzung für Concat per -c copy)
+_NORM_TIMESCALE = 90000
+_NORM_AUDIO = ["-c:a", "aac", "-ar", "48000", "-ac", "2"]
+
+
+def _norm_cache_path(norm_dir, clip, target_w, target_h, variant=""):
+    """Cache-Pfad norm_<Clip-Pfad>_<Inhaltsschlüssel>.mp4: Schlüssel aus Quelle, Größe, mtime,
+    Zielgeometrie und Variante (Kopie/Transcode, Ziel-fps); das Präfix aus dem Clip-Pfad erlaubt
+    das Aufräumen älterer Stände (_prune_norm_cache)."""
+    path = os.path.abspath(clip)
+    st = os.stat(clip)
+    key = f"{path}|{st.st_size}|{st.st_mtime_ns}|{target_w}x{target_h}|{variant}|v{_NORM_CACHE_VERSION}"
+    prefix = hashlib.sha1(path.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(norm_dir, f"norm_{prefix}_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]}.mp4")
+
+
+def _prune_norm_cache(norm_dir, used):
+    """Löscht Cache-Einträge derselben Clips, die nicht mehr gebraucht werden (älterer Stand des
+    Clips, andere Zielgröße oder Variante). Nur Namen aus _norm_cache_path werden angefasst.
+    'used' = in diesem Merge verwendete Cache-Pfade. Liefert die Anzahl gelöschter Dateien."""
+    keep = {os.path.basename(p) for p in used}
+    prefixes = {name[:len("norm_") + 13] for name in keep}  # "norm_<Clip-Pfad>_"
+    removed = 0
+    with os.scandir(norm_dir) as it:
+        for entry in it:
+            name = entry.name
+            if not name.startswith("norm_") or not name.endswith(".mp4") or name in keep:
+                continue
+            if name[:len("norm_") + 13] in prefixes and not name.endswith(".tmp.mp4"):
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except OSError:
+                    pass
+    return removed
+
 
-        cap.release()
+def _concat_signature(meta):
+    """Alles, was beim Concat per -c copy in allen Teilen gleich sein muss: Geometrie, Codec,
+    Profil/Level, SPS/PPS (Hash der Extradata), Bildrate, Zeitbasis und SAR."""
+    return (meta.get("width"), meta.get("height"), meta.get("codec"), meta.get("pix_fmt"),
+            meta.get("profile"), meta.get("level"), meta.get("extradata"),
+            meta.get("rate"), meta.get("avg_rate"), meta.get("time_base"), meta.get("sar"))
 
-    clips = []
 
-    if detections:
-        # Szenen clustern (Lücke <= cluster_gap Sekunden)
-        scenes, cluster = [], [detections[0]]
-        for t in detections[1:]:
-            if t[0] - cluster[-1][0] <= cluster_gap:
-                cluster.append(t)
-            else:
-                scenes.append(cluster)
-                cluster = [t]
-        scenes.append(cluster)
-
-        ts_entries = []
-        for cluster in scenes:
-            start, end = cluster[0][0], cluster[-1][0]
-            mm, ss = int(start // 60), int(start % 60)
-            ts_entries.append(f"{mm:02d}:{ss:02d}")
-            if export:
-                start_sec, end_sec = max(0, start - pre), end + post
-                objs = {obj for _, objs in cluster for obj in objs}
-                overlay_text = f"{os.path.basename(video_path)} | {', '.join(sorted(objs))}" if overlay else ""
-                clip = export_clip(
-                    video_path, start_sec, end_sec, model, export_dir,
-                    overlay, overlay_text, overlay_pos, overlay_size,
-                    overlay_color, confidence, silence_decoder_warnings,
-                    quiet=quiet, no_boxes=no_boxes
-                )
-                if clip:
-                    clips.append(clip)
-
-        log_file.write(f"{video_path}: {', '.join(ts_entries)}\n")
-        log_file.flush()
-    else:
-        log_file.write(f"{video_path}: -\n")
-        log_file.flush()
+def can_copy_for_concat(metas, target_w, target_h):
+    """True, wenn alle Clips ohne Transcode aneinandergehängt werden können: H.264/yuv420p in
+    Zielgröße, quadratische Pixel, konstante Bildrate und eine identische Signatur. Schon ein
+    abweichender Clip erzwingt den Transcode aller (sonst mischen sich SPS/PPS verschiedener Encoder)."""
+    metas = list(metas)
+    if not metas:
+        return False
+    for meta in metas:
+        if (meta.get("width"), meta.get("height")) != (target_w, target_h) \
+                or meta.get("codec") != "h264" or meta.get("pix_fmt") != "yuv420p" \
+                or meta.get("sar") != "1:1" or not meta.get("extradata") \
+                or not _parse_rate(meta.get("rate")) \
+                or abs(_parse_rate(meta.get("rate")) - _parse_rate(meta.get("avg_rate"))) > 0.01:
+            return False
+    return len({_concat_signature(m) for m in metas}) == 1
 
-    return clips
 
-# ------------------------
-# Hilfsfunktionen für Merge (Normalisierung & Concat)
-# ------------------------
-def ffprobe_size(path):
+def concat_target_rate(metas):
+    """Ziel-Bildrate für den Transcode: häufigste r_frame_rate der Clips (als ffmpeg-Rate)."""
+    rates = [m.get("rate") for m in metas if _parse_rate(m.get("rate"))]
+    if rates:
+        return max(sorted(set(rates)), key=rates.count)
+    fps = max((m.get("fps") or 0.0 for m in metas), default=0.0)
+    return f"{fps:.3f}".rstrip("0").rstrip(".") if fps > 0 else "25"
+
+
+def _normalize_one(clip, meta, target_w, target_h, out_path, copy=False, target_rate="25"):
+    """Normalisiert einen Clip nach out_path (atomar über .tmp). Liefert 'copy' oder 'encode'.
+    Transcode immer mit identischen x264-Parametern und fester Bildrate, damit alle Teile dieselben
+    SPS/PPS haben; Zeitbasis und Tonspur (AAC 48 kHz Stereo, bei fehlendem Ton Stille) sind in
+    beiden Fällen einheitlich."""
+    tmp_path = out_path + ".tmp.mp4"
+    if copy:
+        video_args = ["-c:v", "copy"]
+    else:
+        vf = f"scale={target_w}:{target_h}:force_original_aspect_ratio=decrease," \
+             f"pad={target_w}:{target_h}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={target_rate}"
+        video_args = ["-vf", vf, "-pix_fmt", "yuv420p",
+                      "-c:v", "libx264", "-profile:v", "high", "-crf", "18", "-preset", "veryfast"]
+    if meta.get("audio"):
+        inputs, maps = [], ["-map", "0:v:0", "-map", "0:a:0"]
+    else:
+        inputs = ["-f", "lavfi", "-i", "anullsrc=r=48000:cl=stereo"]
+        maps = ["-map", "0:v:0", "-map", "1:a:0", "-shortest"]
+
+    # Robuster Transcode mit großzügigem Probe/Analyze und „ignore_err“
+    cmd = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-analyzeduration", "100M", "-probesize", "100M",
+        "-fflags", "+genpts+discardcorrupt", "-err_detect", "ignore_err",
+        "-i", clip
+    ] + inputs + maps + video_args + _NORM_AUDIO + [
+        "-video_track_timescale", str(_NORM_TIMESCALE), "-movflags", "+faststart",
+        tmp_path
+    ]
     try:
-        out = subprocess.check_output([
-            "ffprobe", "-v", "error",
-            "-select_streams", "v:0",
-            "-show_entries", "stream=width,height",
-            "-of", "csv=s=x:p=0",
-            path
-        ])
-        s = out.decode("utf-8").strip()
-        if "x" in s:
-            w, h = s.split("x")
-            return int(w), int(h)
-    except Exception:
-        pass
-    return None, None
+        subprocess.run(cmd, check=True)
+        os.replace(tmp_path, out_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return "copy" if copy else "encode"
+
+
+def _timed_normalize(clip, meta, target_w, target_h, out_path, copy, target_rate):
+    t0 = time.perf_counter()
+    mode = _normalize_one(clip, meta, target_w, target_h, out_path, copy, target_rate)
+    METRICS.observe(f"normalize_{mode}", time.perf_counter() - t0)
+    return mode
 
 
 def normalize_clips_for_concat(clips, target_w=None, target_h=None, export_dir="./export",
-                               quiet=False, skip_bad=False):
+                               quiet=False, skip_bad=False, jobs=None):
     """Normalisiert alle Clips auf gleiche Größe (scale+pad). Bei Fehlern:
        - skip_bad=True: Clip wird ausgelassen
        - skip_bad=False: Fallback auf Original (Concat kann später scheitern)
+    Läuft mit bis zu 'jobs' parallelen ffmpeg-Prozessen; nur wenn alle Clips für Concat per
+    -c copy zusammenpassen (can_copy_for_concat), wird das Video kopiert statt kodiert.
+    Bereits normalisierte Clips (gleicher Inhaltsschlüssel) werden aus dem Cache übernommen.
     """
     if not clips:
         return [], (0, 0)
 
-    def probe_size(p):
-        try:
-            out = subprocess.check_output([
-                "ffprobe", "-v", "error", "-select_streams", "v:0",
-                "-show_entries", "stream=width,height",
-                "-of", "csv=s=x:p=0", p
-            ])
-            s = out.decode("utf-8").strip()
-            if "x" in s:
-                w, h = s.split("x")
-                return int(w), int(h)
-        except Exception:
-            pass
-        return None, None
-
-    sizes = []
-    for c in clips:
-        w, h = probe_size(c)
-        if not (w and h):
-            cap = cv2.VideoCapture(c)
-            if cap.isOpened():
-                w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            cap.release()
-        if w and h:
-            sizes.append((c, w, h))
+    with METRICS.timed("probe", len(clips)):
+        metas = probe_many(clips)
+    sizes = [(c, metas[c]["width"], metas[c]["height"]) for c in clips
+             if metas[c]["width"] and metas[c]["height"]]
 
     if not sizes:
         return clips, (0, 0)
@@ -374,59 +3005,65 @@ def normalize_clips_for_concat(clips, target_w=None, target_h=None, export_dir="
     norm_dir = os.path.join(export_dir, "normalized")
     os.makedirs(norm_dir, exist_ok=True)
 
-    keep_for_merge = []
+    usable = [metas[c] for c, _, _ in sizes]
+    copy = can_copy_for_concat(usable, target_w, target_h)
+    target_rate = concat_target_rate(usable)
+    variant = "copy" if copy else f"x264@{target_rate}"
 
-    for idx, (c, w, h) in enumerate(sizes):
-        out_path = os.path.join(norm_dir, f"norm_{idx:04d}.mp4")
-        vf = f"scale={target_w}:{target_h}:force_original_aspect_ratio=decrease," \
-             f"pad={target_w}:{target_h}:(ow-iw)/2:(oh-ih)/2"
+    jobs = jobs or min(4, os.cpu_count() or 1)
+    results = [None] * len(sizes)
+    todo = []
+    cached = 0
+    for idx, (c, _, _) in enumerate(sizes):
+        out_path = _norm_cache_path(norm_dir, c, target_w, target_h, variant)
+        if os.path.exists(out_path) and os.path.getsize(out_path) > 0:
+            results[idx] = out_path
+            cached += 1
+        else:
+            todo.append((idx, c, out_path))
 
-        # Robuster Transcode mit großzügigem Probe/Analyze und „ignore_err“
-        cmd = [
-            "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
-            "-analyzeduration", "100M", "-probesize", "100M",
-            "-fflags", "+genpts+discardcorrupt", "-err_detect", "ignore_err",
-            "-i", c,
-            "-vf", vf,
-            "-pix_fmt", "yuv420p",
-            "-c:v", "libx264", "-crf", "18", "-preset", "veryfast",
-            "-c:a", "aac", "-movflags", "+faststart",
-            out_path
-        ]
-        try:
-            subprocess.run(cmd, check=True)
-            keep_for_merge.append(out_path)
-        except subprocess.CalledProcessError:
-            if not quiet:
-                print(f"[!] Normalisierung fehlgeschlagen für {c}")
-            if skip_bad:
-                if not quiet:
-                    print(f"    → Clip wird übersprungen.")
-                continue
-            else:
+    copied = 0
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = {pool.submit(_timed_normalize, c, metas[c], target_w, target_h, out_path,
+                               copy, target_rate): (idx, c, out_path)
+                   for idx, c, out_path in todo}
+        for fut in as_completed(futures):
+            idx, c, out_path = futures[fut]
+            try:
+                if fut.result() == "copy":
+                    copied += 1
+                results[idx] = out_path
+            except subprocess.CalledProcessError:
                 if not quiet:
-                    print(f"    → Fallback: Original verwenden (Concat kann scheitern).")
-                keep_for_merge.append(c)
+                    print(f"[!] Normalisierung fehlgeschlagen für {c}")
+                if skip_bad:
+                    if not quiet:
+                        print(f"    → Clip wird übersprungen.")
+                else:
+                    if not quiet:
+                        print(f"    → Fallback: Original verwenden (Concat kann scheitern).")
+                    results[idx] = c
 
+    # Cache begrenzen: pro Clip nur der zuletzt verwendete Stand bleibt liegen
+    pruned = _prune_norm_cache(norm_dir, [r for r in results if r is not None and r.startswith(norm_dir)])
+    if not quiet and (cached or copied or pruned):
+        print(f"[i] Normalisierung: {cached} aus Cache, {copied} nur kopiert, "
+              f"{len(todo) - copied} neu kodiert, {pruned} veraltete Cache-Einträge gelöscht.")
+    keep_for_merge = [r for r in results if r is not None]
     return keep_for_merge, (target_w, target_h)
 
 
 def merge_clips(clips, output_path="highlights.mp4", merge_ratio=None, export_dir="./export",
-                quiet=False, skip_bad=False):
+                quiet=False, skip_bad=False, jobs=None):
     if not clips:
         return
 
-    target_w, target_h = None, None
-    if merge_ratio and "x" in merge_ratio:
-        try:
-            target_w, target_h = [int(x) for x in merge_ratio.split("x")]
-        except ValueError:
-            if not quiet:
-                print("[!] Ungültiges --merge-ratio Format, benutze automatische Auswahl.")
+    target_w, target_h = parse_merge_ratio(merge_ratio, quiet=quiet)
 
-    normalized, (tw, th) = normalize_clips_for_concat(
-        clips, target_w, target_h, export_dir, quiet=quiet, skip_bad=skip_bad
-    )
+    with METRICS.timed("normalize", len(clips)):
+        normalized, (tw, th) = normalize_clips_for_concat(
+            clips, target_w, target_h, export_dir, quiet=quiet, skip_bad=skip_bad, jobs=jobs
+        )
     if not normalized:
         if not quiet:
             print("[!] Keine Clips zum Mergen (evtl. alle übersprungen?).")
@@ -437,31 +3074,526 @@ def merge_clips(clips, output_path="highlights.mp4", merge_ratio=None, export_di
         for c in normalized:
             f.write(f"file '{os.path.abspath(c)}'\n")
 
-    subprocess.run([
-        "ffmpeg", "-hide_banner", "-loglevel", "error",
-        "-y", "-f", "concat", "-safe", "0",
-        "-i", list_file, "-c", "copy", output_path
-    ], check=True)
+    with METRICS.timed("concat", len(normalized)):
+        subprocess.run([
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-y", "-f", "concat", "-safe", "0",
+            "-i", list_file, "-c", "copy", output_path
+        ], check=True)
     if not quiet:
         print(f"[✓] Highlight-Video erstellt: {output_path} ({tw}x{th})")
 
+# ------------------------
+# Watch-Modus: Daemon-Schleife und Status-Endpunkt
+# ------------------------
+class WatchStatus:
+    """Zustand des Watch-Modus für den Status-Endpunkt (Warteschlange, Durchsatz, Latenz)."""
+
+    def __init__(self, watcher, jobs):
+        self.watcher = watcher
+        self.jobs = jobs
+        self.started = time.time()
+        self.current = None
+        self.current_since = None
+        self.videos_done = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.latencies = []
+        self._lock = threading.Lock()
+
+    def begin(self, path):
+        with self._lock:
+            self.current, self.current_since = path, time.time()
+
+    def end(self, queued_at, ok=True):
+        now = time.time()
+        with self._lock:
+            self.busy += now - self.current_since
+            self.current = self.current_since = None
+            if ok:
+                self.videos_done += 1
+                # Latenz ab Erkennung als fertig geschrieben bis Logzeile
+                self.latencies = (self.latencies + [now - queued_at])[-100:]
+            else:
+                self.errors += 1
+
+    def snapshot(self):
+        with self._lock:
+            now = time.time()
+            frames = METRICS.to_dict().get("decode", {}).get("items", 0)
+            uptime = now - self.started
+            return {
+                "mode": self.watcher.mode,
+                "uptime_s": round(uptime, 1),
+                "queue": self.jobs.qsize(),
+                "pending": len(self.watcher.pending),
+                "current": self.current,
+                "current_s": round(now - self.current_since, 1) if self.current_since else None,
+                "videos_done": self.videos_done,
+                "errors": self.errors,
+                "frames_done": frames,
+                "fps": round(frames / self.busy, 2) if self.busy > 0 else 0.0,
+                "videos_per_hour": round(3600.0 * self.videos_done / uptime, 2) if uptime > 0 else 0.0,
+                "latency_last_s": round(self.latencies[-1], 2) if self.latencies else None,
+                "latency_mean_s": round(sum(self.latencies) / len(self.latencies), 2) if self.latencies else None,
+            }
+
+
+def start_status_server(port, status):
+    """HTTP-Endpunkt auf localhost: / bzw. /status (JSON), /metrics (Prometheus)."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            route = self.path.split("?", 1)[0]
+            if route in ("/", "/status"):
+                body = json.dumps(status.snapshot(), indent=2).encode("utf-8")
+                ctype = "application/json"
+            elif route == "/metrics":
+                body = METRICS.prometheus_text(videos=status.videos_done).encode("utf-8")
+                ctype = "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass  # keine Zugriffszeilen zwischen den Fortschrittsausgaben
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_watch(watcher, model, classes, log_file, kwargs, on_done=None, status_port=0, quiet=False,
+              probe=False):
+    """Daemon-Schleife: ein Thread sammelt fertige Videos vom Watcher, dieser Thread scannt
+    sie nacheinander mit dem bereits geladenen Modell, bis STRG+C.
+    Fehler einzelner Videos werden gemeldet und beenden den Lauf nicht. Mit 'probe' werden
+    unlesbare Videos nicht geloggt, sondern später erneut versucht (watcher.retry).
+    'on_done(video, sig)' wird nach jedem geloggten Video aufgerufen."""
+    jobs = queue.Queue()
+    stop = threading.Event()
+    failure = []
+    status = WatchStatus(watcher, jobs)
+
+    def collect():
+        try:
+            while not stop.is_set():
+                for path, sig in watcher.ready(1.0):
+                    jobs.put((path, sig, time.time()))
+        except Exception as e:
+            failure.append(e)
+
+    collector = threading.Thread(target=collect, daemon=True)
+    collector.start()
+    server = start_status_server(status_port, status) if status_port else None
+    if not quiet:
+        print(f"[i] Watch-Modus ({watcher.mode}) auf {watcher.root}"
+              + (f", Status: http://127.0.0.1:{status_port}/status" if server else "")
+              + " – Beenden mit STRG+C.")
+    try:
+        while True:
+            try:
+                path, sig, queued_at = jobs.get(timeout=1.0)
+            except queue.Empty:
+                if failure:
+                    raise failure[0]
+                continue
+            if probe and not probe_media(path).get("width"):
+                delay = watcher.retry(path)
+                if not quiet:
+                    print(f"[!] {path} nicht lesbar, neuer Versuch in {delay:g}s.")
+                continue
+            status.begin(path)
+            try:
+                process_video(path, model, classes, log_file, **kwargs)
+            except KeyboardInterrupt:
+                raise
+            except Exception as e:
+                status.end(queued_at, ok=False)
+                if not quiet:
+                    print(f"[!] Fehler bei {path}: {e}")
+                continue
+            status.end(queued_at)
+            if on_done:
+                on_done(path, sig)
+            if not quiet:
+                print(f"[✓] {path} ({time.time() - queued_at:.1f}s nach Erkennung, "
+                      f"Warteschlange {jobs.qsize()})")
+    finally:
+        stop.set()
+        collector.join(timeout=5)
+        if server is not None:
+            server.shutdown()
+        watcher.close()
+
+# ------------------------
+# Verteilte Warteschlange: Leases auf einem gemeinsamen Dateisystem (--queue-dir)
+#   leases/<key>.lease  Anspruch eines Knotens mit Ablaufzeit, per Heartbeat verlängert
+#   done/<key>.json     Ergebnis (Logzeile, Signatur) → Quelle des konsolidierten Logs
+#   failed/<key>.json   Fehler bei unveränderter Datei → kein Knoten versucht das Video erneut
+#   Schlüssel = Pfad relativ zu root, damit unterschiedliche Mountpunkte zusammenpassen.
+# ------------------------
+class Lease:
+    """Exklusiver Anspruch auf ein Video. Ein Heartbeat-Thread verlängert die Ablaufzeit alle
+    ttl/3 Sekunden; hat ein anderer Knoten die Lease übernommen, wird 'lost' gesetzt.
+    Verlängern prüft den Token und ersetzt die Datei an Ort und Stelle, Freigeben prüft ihn
+    atomar (rename beiseite, dann link zurück), sodass nie die Lease eines anderen Knotens
+    überschrieben oder gelöscht wird."""
+
+    def __init__(self, path, info, ttl):
+        self.path = path
+        self.info = info
+        self.ttl = ttl
+        self.lost = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._heartbeat, daemon=True)
+        self._thread.start()
+
+    def _take(self):
+        """Lease-Datei beiseite schieben, wenn sie noch unsere ist. Liefert den Ablagepfad oder None;
+        die Lease eines anderen Knotens wird unverändert zurückgelegt."""
+        aside = f"{self.path}.{self.info['token']}.aside"
+        try:
+            os.rename(self.path, aside)
+        except FileNotFoundError:
+            return None
+        if (WorkQueue.read_json(aside) or {}).get("token") == self.info["token"]:
+            return aside
+        try:
+            os.link(aside, self.path)  # schlägt fehl, falls inzwischen neu angelegt
+        except OSError:
+            pass
+        os.remove(aside)
+        return None
+
+    def renew(self):
+        """Ablaufzeit verlängern, solange die Lease diesem Knoten gehört; sonst 'lost' setzen.
+        Verlängert an Ort und Stelle (os.replace), die Datei fehlt also nie. Andere Knoten übernehmen
+        nur abgelaufene Leases; eine Lease, die (mit Reserve) bald abläuft, gilt daher als verloren,
+        statt zwischen Prüfung und replace eine gerade übernommene zu überschreiben."""
+        with self._lock:
+            if self.lost:
+                return False
+            if time.time() >= self.info["expires"] - self.ttl / 10.0 \
+                    or (WorkQueue.read_json(self.path) or {}).get("token") != self.info["token"]:
+                self.lost = True
+                return False
+            info = dict(self.info, expires=time.time() + self.ttl)
+            tmp = f"{self.path}.{self.info['token']}.new"
+            write_json_atomic(tmp, info)
+            try:
+                os.replace(tmp, self.path)
+            except OSError:
+                try:
+                    os.remove(tmp)
+                except FileNotFoundError:
+                    pass
+                raise
+            self.info = info
+            return True
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.ttl / 3.0):
+            try:
+                if not self.renew():
+                    return
+            except OSError:
+                pass  # NAS kurz weg: nächster Versuch im nächsten Intervall
+
+    def release(self):
+        self._stop.set()
+        self._thread.join()
+        with self._lock:
+            if self.lost:
+                return
+            aside = self._take()
+            if aside is not None:
+                os.remove(aside)
+
+
+class WorkQueue:
+    """Koordiniert mehrere Knoten (Hosts oder Prozesse) über Lock-Dateien in 'queue_dir'.
+    Anspruch per O_CREAT|O_EXCL (atomar, auch auf NFSv3+); abgelaufene Leases werden per
+    rename übernommen, sodass nur ein Knoten gewinnt. Ablaufzeiten sind Wanduhrzeit →
+    Uhren der Hosts per NTP synchron halten, ttl deutlich größer als die Abweichung."""
+
+    def __init__(self, queue_dir, root, node=None, ttl=120.0, quiet=False):
+        self.dir = queue_dir
+        self.quiet = quiet
+        self.root = os.path.abspath(root)
+        self.log_root = root  # wie angegeben: Logpfade in derselben Form wie beim Scan (scan_videos)
+        self.node = node or f"{socket.gethostname()}-{os.getpid()}"
+        self.ttl = ttl
+        self.lease_dir = os.path.join(queue_dir, "leases")
+        self.done_dir = os.path.join(queue_dir, "done")
+        self.failed_dir = os.path.join(queue_dir, "failed")
+        os.makedirs(self.lease_dir, exist_ok=True)
+        os.makedirs(self.done_dir, exist_ok=True)
+        os.makedirs(self.failed_dir, exist_ok=True)
+
+    @staticmethod
+    def read_json(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def rel(self, video_path):
+        return _video_key(video_path, self.root)
+
+    def _key(self, video_path):
+        return hashlib.sha1(self.rel(video_path).encode("utf-8")).hexdigest()[:20]
+
+    def is_done(self, video_path, sig=None, only_changed=False):
+        """Fertig laut done-Marker; mit only_changed nur bei gleicher Signatur."""
+        rec = self.read_json(os.path.join(self.done_dir, self._key(video_path) + ".json"))
+        if rec is None:
+            return False
+        return not only_changed or tuple(rec.get("sig") or ()) == tuple(sig or ())
+
+    def is_failed(self, video_path, sig=None):
+        """Bei dieser Signatur schon gescheitert (Datei seitdem unverändert)."""
+        rec = self.read_json(os.path.join(self.failed_dir, self._key(video_path) + ".json"))
+        return rec is not None and tuple(rec.get("sig") or ()) == tuple(sig or ())
+
+    def claim(self, video_path):
+        """Lease anlegen oder eine abgelaufene übernehmen. None, wenn ein anderer Knoten sie hält."""
+        path = os.path.join(self.lease_dir, self._key(video_path) + ".lease")
+        for _ in range(2):
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                old = self.read_json(path)
+                if old is None:
+                    # Halb geschrieben oder gerade entfernt: nur sehr alte Dateien gelten als verwaist
+                    try:
+                        if time.time() - os.stat(path).st_mtime < self.ttl:
+                            return None
+                    except FileNotFoundError:
+                        continue
+                elif old.get("expires", 0) > time.time():
+                    return None
+                if not self._take_over(path, old):
+                    return None
+                continue
+            info = {"path": self.rel(video_path), "node": self.node,
+                    "token": os.urandom(8).hex(), "expires": time.time() + self.ttl}
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(info, f)
+                f.flush()
+                os.fsync(f.fileno())
+            return Lease(path, info, self.ttl)
+        return None
+
+    def _take_over(self, path, old):
+        """Abgelaufene Lease beiseite schieben. rename ist atomar: nur ein Knoten erwischt die Datei.
+        Ist die beiseite geschobene Lease inzwischen wieder gültig (vom Besitzer verlängert oder von
+        einem anderen Knoten neu angelegt), wird sie zurückgelegt."""
+        stale = f"{path}.{self.node}.{os.getpid()}.stale"
+        try:
+            os.rename(path, stale)
+        except FileNotFoundError:
+            return True
+        moved = self.read_json(stale) or {}
+        # Inzwischen verlängert (gleicher Token, neue Ablaufzeit) oder neu angelegt → noch gültig
+        if moved.get("expires", 0) > time.time():
+            try:
+                os.link(stale, path)  # schlägt fehl, falls schon wieder jemand angelegt hat
+            except OSError:
+                pass
+            os.remove(stale)
+            return False
+        os.remove(stale)
+        if old is not None and not self.quiet:
+            print(f"[i] Abgelaufene Lease von {old.get('node')} übernommen: {old.get('path')}")
+        return True
+
+    def complete(self, video_path, sig, log_text, clips=()):
+        """done-Marker atomar schreiben (vor dem Freigeben der Lease)."""
+        results = [line.rsplit(": ", 1)[1] for line in log_text.splitlines() if ": " in line]
+        write_json_atomic(os.path.join(self.done_dir, self._key(video_path) + ".json"), {
+            "path": self.rel(video_path), "sig": list(sig), "node": self.node,
+            "results": results, "clips": list(clips), "finished": time.time(),
+        })
+        try:
+            os.remove(os.path.join(self.failed_dir, self._key(video_path) + ".json"))
+        except FileNotFoundError:
+            pass
+
+    def fail(self, video_path, sig, error):
+        """failed-Marker atomar schreiben (vor dem Freigeben der Lease), damit nicht jeder Knoten
+        am selben Video scheitert. Ändert sich die Datei oder wird der Marker gelöscht, folgt ein neuer Versuch."""
+        write_json_atomic(os.path.join(self.failed_dir, self._key(video_path) + ".json"), {
+            "path": self.rel(video_path), "sig": list(sig), "node": self.node,
+            "error": error, "finished": time.time(),
+        })
+
+    def consolidate(self, log_path):
+        """Konsolidiertes Log (Format und Pfadform wie beim Einzellauf, damit Resume und --only-changed
+        die Zeilen wiedererkennen) aus allen done-Markern, atomar ersetzt.
+        Jeder Knoten schreibt es am Ende; der letzte hat alle Ergebnisse."""
+        lines = []
+        with os.scandir(self.done_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(".json"):
+                    continue
+                rec = self.read_json(entry.path)
+                if rec is None:
+                    continue
+                video = os.path.join(self.log_root, *rec["path"].split("/"))
+                lines.extend(f"{video}: {r}" for r in rec.get("results") or ["-"])
+        lines.sort()
+        write_text_atomic(log_path, "".join(line + "\n" for line in lines))
+        return len(lines)
+
+
+def run_queue(work, videos, sigs, model, classes, kwargs, video_pbar=None,
+              only_changed=False, quiet=False, on_done=None, weights=None):
+    """Bearbeitet Videos über die gemeinsame Warteschlange, bis alle einen done- oder failed-Marker haben.
+    Von anderen Knoten gehaltene Videos werden übersprungen und später erneut versucht;
+    laufen deren Leases ab (Knoten abgestürzt), übernimmt dieser Knoten. Fehler einzelner Videos
+    werden gemeldet und beenden den Knoten nicht. Liefert die eigenen Clips."""
+    weights = weights or {}
+    clips_all = []
+    remaining = list(videos)
+    idle = work.ttl / 4.0
+    while True:
+        remaining = [v for v in remaining
+                     if not work.is_done(v, sigs[v], only_changed) and not work.is_failed(v, sigs[v])]
+        if video_pbar is not None:
+            # Auch von anderen Knoten erledigte Videos zählen
+            video_pbar.n = video_pbar.total - sum(weights.get(v, 1) for v in remaining)
+            video_pbar.refresh()
+        if not remaining:
+            return clips_all
+        claimed = False
+        for v in remaining:
+            lease = work.claim(v)
+            if lease is None:
+                continue
+            claimed = True
+            try:
+                # Zwischen Prüfung und Anspruch evtl. von einem anderen Knoten abgeschlossen
+                if work.is_done(v, sigs[v], only_changed) or work.is_failed(v, sigs[v]):
+                    continue
+                buf = io.StringIO()
+                try:
+                    clips = process_video(v, model, classes, buf, **kwargs)
+                except Exception as e:
+                    if not quiet:
+                        print(f"[!] Fehler bei {v}: {e}")
+                    # Kein Logeintrag; der Marker hält die anderen Knoten davon ab, es erneut zu versuchen
+                    if lease.renew():
+                        work.fail(v, sigs[v], str(e))
+                    continue
+                # Besitz direkt vor dem done-Marker noch einmal bestätigen (verlängert zugleich)
+                if not lease.renew():
+                    if not quiet:
+                        print(f"[!] Lease für {v} verloren (Heartbeat zu spät), Ergebnis verworfen.")
+                    continue
+                work.complete(v, sigs[v], buf.getvalue(), clips)
+                clips_all.extend(clips)
+                if on_done:
+                    on_done(v)
+            finally:
+                lease.release()
+            if video_pbar is not None:
+                video_pbar.update(weights.get(v, 1))
+        if claimed:
+            idle = work.ttl / 4.0
+        else:
+            # Alles Übrige ist bei lebenden Knoten in Arbeit → auf Abschluss oder Ablauf warten,
+            # mit wachsendem Abstand (bis ttl), damit wartende Knoten das NAS nicht mit Claims fluten
+            time.sleep(max(1.0, idle))
+            idle = min(idle * 2.0, work.ttl)
+
+# ------------------------
+# Parallelverarbeitung (Prozess-Pool, ein Modell pro Worker)
+# ------------------------
+_WORKER_MODEL = None
+
+
+def _no_key():
+    return None
+
+
+def _init_worker(model_path, threads, backend_opts):
+    """Initializer für Pool-Worker: Modell EINMAL laden, Tastatur abschalten, Threads begrenzen."""
+    global _WORKER_MODEL, key_pressed
+    key_pressed = _no_key  # stdin gehört dem Hauptprozess
+    try:
+        import torch
+        torch.set_num_threads(max(1, threads))
+    except Exception:
+        pass
+    _WORKER_MODEL = InferenceModel(model_path, threads=threads, quiet=True, **backend_opts)
+
+
+def _worker_process_video(video_path, classes, kwargs):
+    """Verarbeitet ein Video im Worker. Logzeilen und Stufenzeiten werden gepuffert und an den
+    Hauptprozess zurückgegeben, der sie als einziger Schreiber ins Log übernimmt."""
+    buf = io.StringIO()
+    metrics = Metrics()
+    clips = process_video(video_path, _WORKER_MODEL, classes, buf, progress=False, metrics=metrics, **kwargs)
+    return video_path, buf.getvalue(), clips, metrics.to_dict()
+
+
+def run_pool(videos, model_path, classes, log_file, workers, kwargs, video_pbar, quiet=False, on_done=None,
+             backend_opts=None, threads=0, weights=None):
+    """Verteilt Videos auf einen Prozess-Pool. Nur dieser Prozess schreibt ins Log
+    (zeilenweise + fsync), damit das Resume-Format auch bei Abstürzen gültig bleibt.
+    Videos werden in der übergebenen Reihenfolge vergeben (längste zuerst → kein Nachzügler).
+    'model_path' ist bei ONNX/OpenVINO das bereits exportierte Artefakt (backend_opts).
+    'weights' = {video: Frames} für den Fortschritt, sonst zählt jedes Video 1.
+    'on_done(video)' wird nach jedem geloggten Video aufgerufen. Liefert {video: clips}."""
+    weights = weights or {}
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+    ctx = multiprocessing.get_context("spawn")
+    clips_by_video = {}
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                   initializer=_init_worker,
+                                   initargs=(model_path, threads, backend_opts or {}))
+    try:
+        futures = {executor.submit(_worker_process_video, v, classes, kwargs): v for v in videos}
+        for fut in as_completed(futures):
+            v = futures[fut]
+            try:
+                _, lines, clips, stages = fut.result()
+            except Exception as e:
+                # Kein Logeintrag → Video wird beim nächsten Resume erneut versucht
+                if not quiet:
+                    print(f"[!] Fehler bei {v}: {e}")
+                video_pbar.update(weights.get(v, 1))
+                continue
+            log_file.write(lines)
+            log_file.flush()
+            os.fsync(log_file.fileno())
+            METRICS.merge(stages)
+            if on_done is not None:
+                on_done(v)
+            clips_by_video[v] = clips
+            video_pbar.update(weights.get(v, 1))
+    except KeyboardInterrupt:
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown(wait=True)
+    return clips_by_video
+
 # ------------------------
 # CLI / Main
 # ------------------------
-def build_argparser():
-    classes_text = "\n".join([f"{i:2d}: {name}" for i, name in enumerate(COCO_CLASSES)])
-    parser = argparse.ArgumentParser(
-        description="YOLOv8 Batch-Videoanalyse mit Resume, Pause (Taste 'p'), STRG+C und Progressbar",
-        epilog=f"Verfügbare Objektklassen:\n{classes_text}",
-        formatter_class=argparse.RawDescriptionHelpFormatter
-    )
-    parser.add_argument("root", help="Wurzelverzeichnis")
-    parser.add_argument("--model", default="yolov8x.pt")
+def add_output_args(parser):
+    """Argumente für Suche, Log, Export und Merge (gemeinsam für Scan und 'query')."""
     parser.add_argument("--log", default="objekt_log.txt")
     parser.add_argument("--objects", required=True, help="IDs wie 0,1")
-    parser.add_argument("--video-extensions",
-                        default="mp4,mpg,mpeg,avi,mov,mkv,flv,wmv,ts,vob,vs",
-                        help="Komma-separierte Liste gültiger Video-Endungen (ohne Punkt)")
     parser.add_argument("--export", action="store_true")
     parser.add_argument("--overlay", action="store_true")
     parser.add_argument("--overlay-pos", default="tl")
@@ -474,6 +3606,13 @@ def build_argparser():
     parser.add_argument("--merge", action="store_true")
     parser.add_argument("--merge-ratio")
     parser.add_argument("--merge-file", default="highlights.mp4")
+    parser.add_argument("--merge-jobs", type=int,
+                        help="Parallele ffmpeg-Prozesse für die Normalisierung beim Merge (Default: min(4, CPUs))")
+    parser.add_argument("--merge-direct", action="store_true",
+                        help="Highlight-Video direkt beim Export in EINEN ffmpeg-Encoder schreiben "
+                             "(ohne Clip→Normalisierung→Concat). Einzel-Clips nur zusätzlich mit --export")
+    parser.add_argument("--merge-fps", type=float,
+                        help="Bildrate des Highlight-Videos bei --merge-direct (Default: fps des ersten Clips)")
     parser.add_argument("--export-dir", default="./export")
     parser.add_argument("--silence-decoder-warnings", action="store_true")
     parser.add_argument("--skip-bad-clips", action="store_true",
@@ -482,36 +3621,330 @@ def build_argparser():
                         help="Keine Ausgaben und keine Progressbars")
     parser.add_argument("--no-boxes", action="store_true",
                         help="Keine Bounding Boxes einblenden, nur Overlay-Text")
+    parser.add_argument("--cut-mode", choices=["encode", "copy", "smart"], default="encode",
+                        help="Clip-Export: encode (OpenCV), copy (ffmpeg Stream-Copy ab Keyframe) "
+                             "oder smart (nur Rand-GOP neu kodieren). copy/smart nur mit --no-boxes ohne --overlay")
+
+
+def build_argparser():
+    classes_text = "\n".join([f"{i:2d}: {name}" for i, name in enumerate(COCO_CLASSES)])
+    parser = argparse.ArgumentParser(
+        description="YOLOv8 Batch-Videoanalyse mit Resume, Pause (Taste 'p'), STRG+C und Progressbar",
+        epilog=f"Abfrage eines Detektionsindex: {os.path.basename(sys.argv[0])} query <index.db> --objects ...\n\n"
+               f"Verfügbare Objektklassen:\n{classes_text}",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("root", help="Wurzelverzeichnis")
+    parser.add_argument("--model", default="yolov8x.pt")
+    parser.add_argument("--video-extensions",
+                        default="mp4,mpg,mpeg,avi,mov,mkv,flv,wmv,ts,vob,vs",
+                        help="Komma-separierte Liste gültiger Video-Endungen (ohne Punkt)")
+    add_output_args(parser)
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="Anzahl Frames pro Modellaufruf (Batch-Inferenz, Default 1)")
+    parser.add_argument("--decode-queue", type=int, default=0,
+                        help="Frames im Decoder-Thread vorpuffern (Queue-Tiefe, 0 = ohne Thread)")
+    parser.add_argument("--motion-threshold", type=float,
+                        help="Motion-Gate aktivieren: Frames mit weniger Anteil geänderter Pixel "
+                             "(z. B. 0.002) überspringen die Inferenz")
+    parser.add_argument("--motion-max-skip", type=int, default=50,
+                        help="Spätestens nach N übersprungenen Frames trotzdem auswerten (Default 50)")
+    parser.add_argument("--motion-method", choices=["diff", "mog2"], default="diff",
+                        help="Motion-Gate: Frame-Differenz (diff) oder Hintergrundmodell (mog2)")
+    parser.add_argument("--detect-every", type=int, default=1,
+                        help="Modell nur auf jedem N-ten Frame, Boxen dazwischen per Optical Flow "
+                             "weitertragen (Default 1 = jeder Frame)")
+    parser.add_argument("--roi",
+                        help="ROI-Datei (JSON mit Polygonen/Maske), falls weder <video>.roi.json "
+                             "noch roi.json im Videoordner existiert")
+    parser.add_argument("--roi-tile", type=int, default=0,
+                        help="ROI-Ausschnitte in Kacheln dieser Größe (Pixel) zerlegen, z. B. 640 (Default 0 = aus)")
+    parser.add_argument("--roi-overlap", type=float, default=0.2,
+                        help="Überlappung benachbarter Kacheln als Anteil (Default 0.2)")
+    parser.add_argument("--sample-fps", type=float,
+                        help="Grobscan mit N Frames/s (übrige Frames per grab() übersprungen); "
+                             "um Treffer wird dicht nachgescannt")
+    parser.add_argument("--decoder", choices=["opencv", "ffmpeg"], default="opencv",
+                        help="Frame-Quelle für den Scan: OpenCV oder ffmpeg-Subprozess (rawvideo-Pipe)")
+    parser.add_argument("--decode-width", type=int, default=0,
+                        help="Mit --decoder ffmpeg: bereits im Decoder auf diese Breite skalieren (z. B. 640)")
+    parser.add_argument("--checkpoint-every", type=float, default=0.0,
+                        help="Alle N Sekunden Zwischenstand des aktuellen Videos sichern "
+                             "(Resume mitten im Video, 0 = aus)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Anzahl paralleler Worker-Prozesse (je ein Video, Default 1)")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch",
+                        help="Inferenz-Backend: PyTorch (Default) oder einmalig exportiertes ONNX/OpenVINO-Modell")
+    parser.add_argument("--imgsz", type=int, default=640,
+                        help="Feste Eingabegröße des Modells in Pixeln (Default 640)")
+    parser.add_argument("--threads", type=int, default=0,
+                        help="Intra-Op-Threads pro Modell (0 = automatisch: CPU-Kerne / --workers)")
+    parser.add_argument("--warmup", type=int, default=1,
+                        help="Warm-up-Durchläufe beim Laden des Modells (Default 1)")
+    parser.add_argument("--int8", action="store_true",
+                        help="Mit --backend onnx/openvino: INT8-quantisiertes Modell exportieren")
+    parser.add_argument("--int8-data",
+                        help="Datensatz-YAML für die INT8-Kalibrierung mit OpenVINO (ultralytics 'data')")
+    parser.add_argument("--backend-cache",
+                        help="Ordner für exportierte Modelle (Default: .model_cache neben dem Modell)")
+    parser.add_argument("--compare-backend", action="store_true",
+                        help="Nur Genauigkeit/Tempo von --backend gegen PyTorch auf Stichproben-Frames vergleichen")
+    parser.add_argument("--compare-frames", type=int, default=50,
+                        help="Anzahl Stichproben-Frames für --compare-backend (Default 50)")
+    parser.add_argument("--scan-jobs", type=int, default=8,
+                        help="Threads für die Verzeichnissuche (Default 8, 1 = sequenziell)")
+    parser.add_argument("--only-changed", action="store_true",
+                        help="Beim Resume nur neue oder geänderte Videos (Größe/mtime/Inode laut Manifest) scannen")
+    parser.add_argument("--settle-seconds", type=float,
+                        help="Videos überspringen, die jünger als N Sekunden sind (noch im Schreibvorgang; "
+                             "Default 30 mit --only-changed/--watch, sonst 0)")
+    parser.add_argument("--watch", action="store_true",
+                        help="Daemon-Modus: nach dem ersten Durchlauf Modell geladen lassen und neue, "
+                             "fertig geschriebene Videos unter root sofort scannen (bis STRG+C)")
+    parser.add_argument("--watch-poll", action="store_true",
+                        help="Mit --watch: Polling statt inotify erzwingen (z. B. NFS/SMB, wo inotify "
+                             "Schreibvorgänge anderer Hosts nicht sieht)")
+    parser.add_argument("--watch-interval", type=float, default=5.0,
+                        help="Mit --watch: Polling-Intervall in Sekunden (Default 5)")
+    parser.add_argument("--status-port", type=int, default=0,
+                        help="Mit --watch: Status-Endpunkt auf 127.0.0.1:PORT (/status JSON, /metrics Prometheus, "
+                             "0 = aus)")
+    parser.add_argument("--probe-jobs", type=int, default=8,
+                        help="Metadaten-Pass vor dem Scan mit N parallelen ffprobe-Aufrufen (Cache <log>.probe.json): "
+                             "unlesbare Videos aussortieren, ETA in Frames (0 = aus, Default 8)")
+    parser.add_argument("--order", choices=["auto", "path", "longest"], default="auto",
+                        help="Bearbeitungsreihenfolge: nach Pfad oder längste zuerst "
+                             "(Default auto: längste zuerst mit --workers/--queue-dir)")
+    parser.add_argument("--queue-dir",
+                        help="Gemeinsame Warteschlange (Ordner auf dem NAS) für mehrere Hosts/Prozesse: "
+                             "Videos per Lease beanspruchen, Ergebnisse als konsolidiertes --log")
+    parser.add_argument("--node-id",
+                        help="Mit --queue-dir: Name dieses Knotens (Default: Hostname-PID)")
+    parser.add_argument("--lease-ttl", type=float, default=120.0,
+                        help="Mit --queue-dir: Lease-Dauer in Sekunden, Heartbeat alle ttl/3 (Default 120)")
+    parser.add_argument("--index-db",
+                        help="Detektionsindex (SQLite): alle Klassen ab --index-floor speichern, "
+                             "später per 'query' ohne Inferenz abfragbar")
+    parser.add_argument("--index-floor", type=float, default=0.25,
+                        help="Mindest-Confidence für den Detektionsindex (Default 0.25)")
+    parser.add_argument("--metrics-dir",
+                        help="Pro Video eine JSON-Zusammenfassung der Stufenzeiten "
+                             "(decode, model, results, Export, ...) in diesen Ordner schreiben")
+    parser.add_argument("--metrics-prom",
+                        help="Stufen-Histogramme als Prometheus-Textfile (node_exporter textfile collector) schreiben")
     return parser
 
 
-def main():
-    parser = build_argparser()
-    args = parser.parse_args()
-    classes = [int(x.strip()) for x in args.objects.split(",")]
-    model = YOLO(args.model)
+def build_query_parser():
+    parser = argparse.ArgumentParser(
+        prog=f"{os.path.basename(sys.argv[0])} query",
+        description="Beantwortet Klassen-/Schwellen-/Gap-Abfragen aus einem Detektionsindex (--index-db) "
+                    "ohne erneute Inferenz und schreibt das übliche Log bzw. exportiert Clips."
+    )
+    parser.add_argument("index", help="Detektionsindex (SQLite) aus einem Scan mit --index-db")
+    parser.add_argument("--path-prefix", help="Nur Videos, deren Pfad so beginnt")
+    add_output_args(parser)
+    return parser
 
+
+def parse_overlay_color(value):
     try:
-        b, g, r = [int(c) for c in args.overlay_color.split(",")]
-        overlay_color = (b, g, r)
+        b, g, r = [int(c) for c in value.split(",")]
+        return (b, g, r)
     except Exception:
-        overlay_color = (255, 255, 255)
+        return (255, 255, 255)
 
-    # Konsistenz-Check
+
+def check_output_args(args):
+    """Konsistenz-Check der Export/Merge-Optionen. False → Abbruch."""
     if args.merge and not args.export:
         print("Hinweis: --merge erwartet --export. Bitte beide Optionen zusammen verwenden.")
+        return False
+    if args.cut_mode != "encode" and (not args.no_boxes or args.overlay):
+        print(f"Hinweis: --cut-mode {args.cut_mode} nur mit --no-boxes und ohne --overlay möglich, "
+              f"verwende encode.")
+        args.cut_mode = "encode"
+    return True
+
+
+def output_kwargs(args, overlay_color):
+    """Gemeinsame Parameter für finalize_video/process_video aus den CLI-Argumenten."""
+    return dict(
+        export=args.export,
+        overlay=args.overlay,
+        overlay_pos=args.overlay_pos,
+        overlay_size=args.overlay_size,
+        overlay_color=overlay_color,
+        pre=args.pre,
+        post=args.post,
+        confidence=args.confidence,
+        export_dir=args.export_dir,
+        silence_decoder_warnings=args.silence_decoder_warnings,
+        quiet=args.quiet,
+        cluster_gap=args.cluster_gap,
+        no_boxes=args.no_boxes,
+        cut_mode=args.cut_mode
+    )
+
+
+def main_query(argv):
+    """Unterbefehl 'query': Log und Export direkt aus dem Detektionsindex."""
+    args = build_query_parser().parse_args(argv)
+    classes = [int(x.strip()) for x in args.objects.split(",")]
+    overlay_color = parse_overlay_color(args.overlay_color)
+    if not check_output_args(args):
+        return
+    if not os.path.exists(args.index):
+        print(f"Fehler: Index {args.index} nicht gefunden.")
+        return
+
+    index = DetectionIndex(args.index)
+    videos = index.videos(prefix=args.path_prefix)
+    if not args.quiet:
+        print(f"Indizierte Videos: {len(videos)}")
+    floors = [v["floor"] for v in videos if v["floor"] is not None]
+    if floors and args.confidence < max(floors) and not args.quiet:
+        print(f"[!] --confidence {args.confidence} liegt unter der Index-Schwelle {max(floors)}, "
+              f"schwächere Treffer fehlen im Index.")
+
+    kwargs = output_kwargs(args, overlay_color)
+    cluster_gap = kwargs.pop("cluster_gap")
+    highlight = None
+    if args.merge_direct:
+        target_w, target_h = parse_merge_ratio(args.merge_ratio, quiet=args.quiet)
+        highlight = HighlightWriter(args.merge_file, target_w, target_h, args.merge_fps, quiet=args.quiet)
+        kwargs["highlight"] = highlight
+
+    all_clips = []
+    try:
+        with open(args.log, "w", encoding="utf-8") as log_file:
+            for v in tqdm(videos, desc="Videos", unit="video", file=sys.stdout, disable=args.quiet):
+                ident = _probe_key(v["path"])
+                if ident is None or ident[1:] != (v["size"], v["mtime_ns"]):
+                    if not args.quiet:
+                        print(f"[!] {v['path']} hat sich seit der Indizierung geändert oder fehlt.")
+                boxes = index.load(v, classes, args.confidence)
+                scenes = scenes_from_boxes(boxes, v["fps"] or 0, cluster_gap)
+                # model=None: Boxen kommen ausschließlich aus dem Index
+                all_clips.extend(finalize_video(v["path"], scenes, boxes, None, classes, log_file, **kwargs))
+    except KeyboardInterrupt:
+        if not args.quiet:
+            print("\n[!] Abbruch durch Benutzer (STRG+C).")
+        return
+    finally:
+        if highlight is not None:
+            highlight.close()
+        index.close()
+
+    if not args.quiet:
+        print(f"Fertig! Ergebnisse in {args.log}")
+    if args.export and args.merge and not args.merge_direct:
+        merge_clips(
+            all_clips, args.merge_file, args.merge_ratio, args.export_dir,
+            quiet=args.quiet, skip_bad=args.skip_bad_clips, jobs=args.merge_jobs
+        )
+
+
+def progress_bar(videos, frames, quiet=False):
+    """Gesamtfortschritt: mit Metadaten in Frames (ETA über alle Videos), sonst in Videos."""
+    if frames:
+        return tqdm(total=sum(frames.get(v, 1) for v in videos), desc="Gesamt", unit="frame",
+                    unit_scale=True, file=sys.stdout, disable=quiet)
+    return tqdm(total=len(videos), desc="Videos", unit="video", file=sys.stdout, disable=quiet)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "query" and not os.path.isdir(sys.argv[1]):
+        return main_query(sys.argv[2:])
+
+    parser = build_argparser()
+    args = parser.parse_args()
+    classes = [int(x.strip()) for x in args.objects.split(",")]
+    overlay_color = parse_overlay_color(args.overlay_color)
+
+    # Konsistenz-Check
+    if not check_output_args(args):
+        return
+    if args.merge_direct and args.workers > 1:
+        print("Hinweis: --merge-direct nutzt einen einzigen Encoder, --workers wird auf 1 gesetzt.")
+        args.workers = 1
+    if args.watch:
+        if args.workers > 1:
+            print("Hinweis: --watch scannt mit einem warm gehaltenen Modell, --workers wird auf 1 gesetzt.")
+            args.workers = 1
+        if args.merge and not args.merge_direct:
+            print("Hinweis: --merge ohne --merge-direct hat im Watch-Modus kein Ende, wird ignoriert.")
+            args.merge = False
+    if args.queue_dir:
+        if args.watch:
+            print("[!] --queue-dir und --watch lassen sich nicht kombinieren.")
+            return
+        if args.index_db:
+            print("[!] --index-db mit --queue-dir: mehrere Hosts würden in eine SQLite-Datei auf dem NAS "
+                  "schreiben (unsicher). Index pro Knoten in einem eigenen Lauf ohne --queue-dir anlegen.")
+            return
+        if args.workers > 1:
+            print("Hinweis: Mit --queue-dir ist jeder Prozess ein eigener Knoten – für mehr Parallelität "
+                  "mehrere Prozesse starten; --workers wird auf 1 gesetzt.")
+            args.workers = 1
+        if args.merge or args.merge_direct:
+            # Alle Knoten würden sonst dieselbe --merge-file auf dem NAS schreiben
+            print("Hinweis: Clips liegen auf mehreren Knoten verteilt, --merge/--merge-direct werden "
+                  "mit --queue-dir ignoriert.")
+            args.merge = args.merge_direct = False
+
+    if args.int8 and args.backend == "torch":
+        print("Hinweis: --int8 wirkt nur mit --backend onnx/openvino und wird ignoriert.")
+        args.int8 = False
+    if args.compare_backend and args.backend == "torch":
+        print("[!] --compare-backend benötigt --backend onnx oder openvino.")
         return
 
-    videos = find_videos(args.root, args.video_extensions)
+    entries = scan_videos(args.root, args.video_extensions, jobs=args.scan_jobs)
+    sigs = dict(entries)
+    videos = [path for path, _ in entries]
     if not args.quiet:
         print(f"Gefundene Videos: {len(videos)}")
-    if not videos:
+    if not videos and not args.watch:
+        return
+
+    # Export einmalig im Hauptprozess; Worker laden nur noch das Artefakt aus dem Cache
+    backend_opts = {"backend": args.backend, "imgsz": args.imgsz, "warmup": args.warmup,
+                    "batch": args.batch_size}
+    threads = args.threads or max(1, (os.cpu_count() or 1) // max(1, args.workers))
+
+    if args.compare_backend:
+        model_path = export_model(args.model, args.backend, args.imgsz, args.int8,
+                                  args.backend_cache, args.int8_data, quiet=args.quiet)
+        model = InferenceModel(model_path, threads=threads, quiet=args.quiet, **backend_opts)
+        ref = InferenceModel(args.model, "torch", args.imgsz, threads, args.warmup, quiet=args.quiet)
+        r = compare_backends(ref, model, videos, classes, args.confidence, args.compare_frames)
+        print(f"Vergleich {args.backend}{' INT8' if args.int8 else ''} gegen torch auf {r['frames']} Frames:")
+        print(f"  Boxen: torch {r['boxes_ref']}, {args.backend} {r['boxes_test']}")
+        print(f"  Recall {r['recall']:.3f}  Präzision {r['precision']:.3f}  "
+              f"mittlere IoU {r['mean_iou']:.3f}  mittlere |Δconf| {r['mean_conf_diff']:.3f}")
+        speedup = r["ms_ref"] / r["ms_test"] if r["ms_test"] > 0 else 0.0
+        print(f"  torch {r['ms_ref']:.1f} ms/Frame, {args.backend} {r['ms_test']:.1f} ms/Frame "
+              f"(Faktor {speedup:.2f})")
         return
 
-    # Resume
+    # Dateien, die gerade noch geschrieben werden, erst beim nächsten Lauf verarbeiten
+    settle = args.settle_seconds
+    if settle is None:
+        settle = 30.0 if args.only_changed or args.watch else 0.0
+    now = time.time()
+    unsettled = [v for v in videos if not is_settled(sigs[v], settle, now)]
+    if unsettled:
+        videos = [v for v in videos if is_settled(sigs[v], settle, now)]
+        if not args.quiet:
+            print(f"[i] {len(unsettled)} Videos jünger als {settle:g}s – werden noch geschrieben, übersprungen.")
+
+    manifest = VideoManifest(args.log + ".manifest")
+
+    # Resume (mit --queue-dir entscheiden die done-Marker der Warteschlange)
     processed = set()
     log_mode = "w"
-    if os.path.exists(args.log):
+    if os.path.exists(args.log) and not args.queue_dir:
         choice = "r"
         if sys.stdin.isatty():
             try:
@@ -529,56 +3962,188 @@ def main():
                     if ": " in line:
                         path = line.rsplit(": ", 1)[0]
                         processed.add(path)
-            videos = [v for v in videos if v not in processed]
+            if args.only_changed:
+                # Mit Manifest-Eintrag entscheidet die Stat-Signatur, sonst das Log
+                before = len(videos)
+                videos = [v for v in videos
+                          if (manifest.changed(v, sigs[v]) if v in manifest.entries else v not in processed)]
+                # Alte Zeilen geänderter Videos entfernen, sonst stünden sie nach dem Rescan doppelt im Log
+                rescan = processed.intersection(videos)
+                if rescan:
+                    drop_log_lines(args.log, rescan)
+                if not args.quiet:
+                    print(f"[→] Resume aktiviert (nur neue/geänderte), {before - len(videos)} Videos übersprungen.")
+            else:
+                videos = [v for v in videos if v not in processed]
+                if not args.quiet:
+                    print(f"[→] Resume aktiviert, {len(processed)} Videos übersprungen.")
             log_mode = "a"
-            if not args.quiet:
-                print(f"[→] Resume aktiviert, {len(processed)} Videos übersprungen.")
         else:
             log_mode = "w"
+            # Alte Checkpoints gehören zum verworfenen Lauf
+            shutil.rmtree(args.log + ".journal", ignore_errors=True)
             if not args.quiet:
                 print("[→] Neu gestartet, Logdatei wird überschrieben.")
 
+    if log_mode == "w" and not args.queue_dir:
+        # Neues Log → Manifest des alten Laufs ist bedeutungslos
+        manifest.clear()
+
+    # Metadaten-Pass: unlesbare Dateien aussortieren, bevor das Modell geladen wird,
+    # Reihenfolge und Fortschritt (ETA) nach Frames statt Videoanzahl
+    frames = {}
+    unreadable = []
+    if args.probe_jobs > 0 and videos:
+        metas = probe_videos(videos, sigs, args.probe_jobs, args.log + ".probe.json")
+        unreadable = [v for v in videos if not metas[v].get("width")]
+        if unreadable:
+            videos = [v for v in videos if metas[v].get("width")]
+            if not args.quiet:
+                retry = "Watch-Modus versucht es erneut" if args.watch else "nächster Lauf versucht es erneut"
+                print(f"[!] {len(unreadable)} Videos nicht lesbar, übersprungen ({retry}):")
+                for v in unreadable[:10]:
+                    print(f"    {v}")
+                if len(unreadable) > 10:
+                    print(f"    ... und {len(unreadable) - 10} weitere")
+        frames = {v: max(1, int(metas[v].get("frames") or 0)) for v in videos}
+        order = args.order
+        if order == "auto":
+            # Nur parallel zählt die Reihenfolge: lange Videos zuerst, sonst hängt am Ende ein Worker
+            order = "longest" if args.workers > 1 or args.queue_dir else "path"
+        if order == "longest":
+            videos.sort(key=lambda v: -frames[v])
+        if not args.quiet:
+            total_s = sum(metas[v].get("duration") or 0.0 for v in videos)
+            print(f"[i] {len(videos)} Videos, {sum(frames.values())} Frames ({total_s / 3600.0:.1f} h), "
+                  f"Reihenfolge: {'längste zuerst' if order == 'longest' else 'Pfad'}")
+
+    model_path = args.model
+    if videos or args.watch:
+        model_path = export_model(args.model, args.backend, args.imgsz, args.int8,
+                                  args.backend_cache, args.int8_data, quiet=args.quiet)
+    # Bei --workers lädt jeder Worker sein eigenes Modell; ohne Arbeit gar keins
+    model = (InferenceModel(model_path, threads=threads, quiet=args.quiet, **backend_opts)
+             if args.workers <= 1 and (videos or args.watch) else None)
+
+    proc_kwargs = output_kwargs(args, overlay_color)
+    proc_kwargs.update(
+        batch_size=args.batch_size,
+        decode_queue=args.decode_queue,
+        motion_threshold=args.motion_threshold,
+        motion_max_skip=args.motion_max_skip,
+        motion_method=args.motion_method,
+        sample_fps=args.sample_fps,
+        detect_every=args.detect_every,
+        roi_file=args.roi,
+        roi_tile=args.roi_tile,
+        roi_overlap=args.roi_overlap,
+        decoder=args.decoder,
+        decode_width=args.decode_width,
+        # Mit --queue-dir gemeinsam: ein Knoten setzt nach Lease-Übernahme am Checkpoint fort
+        checkpoint_dir=os.path.join(args.queue_dir, "journal") if args.queue_dir else args.log + ".journal",
+        checkpoint_root=args.root if args.queue_dir else None,
+        checkpoint_every=args.checkpoint_every,
+        index_db=args.index_db,
+        index_floor=args.index_floor,
+        metrics_dir=args.metrics_dir
+    )
+
+    videos_done = 0
+
+    def video_done(v, sig=None):
+        nonlocal videos_done
+        # Signatur vom Scan-Zeitpunkt: ändert sich die Datei währenddessen,
+        # wird sie mit --only-changed beim nächsten Lauf erneut gescannt
+        manifest.record(v, sig or sigs[v])
+        videos_done += 1
+        if args.metrics_prom:
+            METRICS.write_prometheus(args.metrics_prom, videos=videos_done)
+
+    highlight = None
+    if args.merge_direct:
+        target_w, target_h = parse_merge_ratio(args.merge_ratio, quiet=args.quiet)
+        highlight = HighlightWriter(args.merge_file, target_w, target_h, args.merge_fps, quiet=args.quiet)
+        proc_kwargs["highlight"] = highlight
+
+    if args.queue_dir:
+        work = WorkQueue(args.queue_dir, args.root, args.node_id, args.lease_ttl, quiet=args.quiet)
+        if not args.quiet:
+            print(f"[i] Knoten {work.node}, Warteschlange {args.queue_dir}")
+
+        def node_done(v):
+            nonlocal videos_done
+            videos_done += 1
+            if args.metrics_prom:
+                METRICS.write_prometheus(args.metrics_prom, videos=videos_done)
+
+        try:
+            with progress_bar(videos, frames, args.quiet) as video_pbar:
+                run_queue(work, videos, sigs, model, classes, proc_kwargs, video_pbar,
+                          only_changed=args.only_changed, quiet=args.quiet, on_done=node_done,
+                          weights=frames)
+        except KeyboardInterrupt:
+            if not args.quiet:
+                print("\n[!] Abbruch durch Benutzer (STRG+C). Offene Lease wurde freigegeben.")
+            return
+        finally:
+            if highlight is not None:
+                highlight.close()
+        n = work.consolidate(args.log)
+        if not args.quiet:
+            print(f"Fertig! {videos_done} Videos auf diesem Knoten, {n} Einträge konsolidiert in {args.log}")
+        return
+
     all_clips = []
     try:
         with open(args.log, log_mode, encoding="utf-8") as log_file:
-            with tqdm(
-                total=len(videos),
-                desc="Videos",
-                unit="video",
-                file=sys.stdout,
-                disable=args.quiet
-            ) as video_pbar:
-                for v in videos:
-                    clips = process_video(
-                        v, model, classes, log_file,
-                        export=args.export,
-                        overlay=args.overlay,
-                        overlay_pos=args.overlay_pos,
-                        overlay_size=args.overlay_size,
-                        overlay_color=overlay_color,
-                        pre=args.pre,
-                        post=args.post,
-                        confidence=args.confidence,
-                        export_dir=args.export_dir,
-                        silence_decoder_warnings=args.silence_decoder_warnings,
-                        quiet=args.quiet,
-                        cluster_gap=args.cluster_gap,
-                        no_boxes=args.no_boxes
+            with progress_bar(videos, frames, args.quiet) as video_pbar:
+                if args.workers > 1:
+                    clips_by_video = run_pool(
+                        videos, model_path, classes, log_file, args.workers,
+                        proc_kwargs, video_pbar, quiet=args.quiet,
+                        on_done=video_done, backend_opts=backend_opts, threads=args.threads,
+                        weights=frames
                     )
-                    all_clips.extend(clips)
-                    video_pbar.update(1)
+                else:
+                    clips_by_video = {}
+                    for v in videos:
+                        clips_by_video[v] = process_video(v, model, classes, log_file, **proc_kwargs)
+                        video_done(v)
+                        video_pbar.update(frames.get(v, 1))
+                # Merge-Reihenfolge nach Pfad, unabhängig von der Bearbeitungsreihenfolge
+                for v in sorted(clips_by_video):
+                    all_clips.extend(clips_by_video[v])
+            if args.watch:
+                # Alles beim Start Gefundene gilt als erledigt; Unfertiges wird nachverfolgt,
+                # Unlesbares später erneut versucht
+                pending = set(unsettled) | set(unreadable)
+                known = {v: sig for v, sig in entries if v not in pending}
+                watcher = VideoWatcher(args.root, args.video_extensions, known, settle,
+                                       args.watch_interval, args.scan_jobs, use_inotify=not args.watch_poll,
+                                       quiet=args.quiet)
+                watcher.add(unsettled)
+                for v in unreadable:
+                    watcher.retry(v)
+                run_watch(watcher, model, classes, log_file, proc_kwargs, on_done=video_done,
+                          status_port=args.status_port, quiet=args.quiet, probe=args.probe_jobs > 0)
     except KeyboardInterrupt:
         if not args.quiet:
             print("\n[!] Abbruch durch Benutzer (STRG+C). Logdatei gespeichert.")
         return
+    finally:
+        # Highlight-Datei auch bei Abbruch sauber abschließen
+        if highlight is not None:
+            highlight.close()
 
     if not args.quiet:
         print(f"Fertig! Ergebnisse in {args.log}")
-    if args.export and args.merge:
+    if args.export and args.merge and not args.merge_direct:
         merge_clips(
             all_clips, args.merge_file, args.merge_ratio, args.export_dir,
-            quiet=args.quiet, skip_bad=args.skip_bad_clips
+            quiet=args.quiet, skip_bad=args.skip_bad_clips, jobs=args.merge_jobs
         )
+        if args.metrics_prom:
+            METRICS.write_prometheus(args.metrics_prom, videos=videos_done)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,220 @@
+"""Lokaler Test der verteilten Warteschlange (--queue-dir) mit mehreren Prozessen als Hosts.
+
+Erzeugt synthetische Testvideos (wie benchmark.py), startet N Knoten über die echte CLI von
+object_search.py mit dem Ersatz-Detektor statt YOLO und lässt einen weiteren Knoten mitten
+in einem Video abstürzen. Geprüft wird:
+  - jedes Video wird genau einmal abgeschlossen (done-Marker, Protokoll der Knoten),
+  - die Lease des abgestürzten Knotens wird nach Ablauf von einem anderen übernommen, der
+    am Checkpoint im gemeinsamen Journal fortsetzt (weniger Frames als das ganze Video),
+  - das konsolidierte Log ist vollständig und stimmt mit den bekannten Zeitfenstern überein.
+
+Beispiel:
+    python queue_check.py --nodes 3 --videos 8
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import benchmark
+import object_search
+
+# Video-Spezifikation für alle Testvideos (klein, damit der Test schnell bleibt)
+CHECK_SPEC = (320, 180, "libx264", 10)
+# Kurz genug, dass der Absturz-Knoten sicher mitten im ersten Video einen Checkpoint schreibt
+CHECKPOINT_EVERY = 0.2
+
+# ------------------------
+# Knoten (Kindprozess)
+# ------------------------
+class CountingDetector(benchmark.StubDetector):
+    """Ersatz-Detektor, der Frames zählt. Mit 'crash_journal' beendet er den Prozess hart
+    (wie ein Host-Ausfall), sobald dort ein Checkpoint liegt – also mitten im Video."""
+
+    def __init__(self, cost_ms=0.0, crash_journal=None):
+        super().__init__(cost_ms=cost_ms)
+        self.crash_journal = crash_journal
+        self.frames = 0
+
+    def __call__(self, source, classes=None, conf=0.25, verbose=False):
+        if self.crash_journal and os.path.isdir(self.crash_journal) \
+                and any(n.endswith(".json") for n in os.listdir(self.crash_journal)):
+            os._exit(3)
+        self.frames += len(source) if isinstance(source, list) else 1
+        return super().__call__(source, classes=classes, conf=conf, verbose=verbose)
+
+
+def run_node(args):
+    """Startet object_search.main() als Knoten; Modell-Export und -Laden liefern den Ersatz-Detektor.
+    Abgeschlossene Videos und die pro Video ausgewerteten Frames protokolliert der Knoten in
+    <workdir>/nodes/<node>.json."""
+    detector = CountingDetector(cost_ms=args.stub_ms,
+                                crash_journal=os.path.join(args.queue_dir, "journal") if args.crash else None)
+    object_search.export_model = lambda model_path, *a, **k: model_path
+    object_search.InferenceModel = lambda *a, **k: detector
+
+    done = []
+    frames = {}
+    run_queue = object_search.run_queue
+    process_video = object_search.process_video
+
+    def counting_process_video(video_path, *a, **k):
+        before = detector.frames
+        try:
+            return process_video(video_path, *a, **k)
+        finally:
+            frames[os.path.abspath(video_path)] = detector.frames - before
+
+    def logged_run_queue(*a, **k):
+        on_done = k.get("on_done")
+
+        def record(v):
+            done.append(v)
+            if on_done:
+                on_done(v)
+        k["on_done"] = record
+        return run_queue(*a, **k)
+
+    object_search.run_queue = logged_run_queue
+    object_search.process_video = counting_process_video
+    sys.argv = [
+        "object_search.py", args.root, "--objects", str(benchmark.STUB_CLASS), "--confidence", "0.5",
+        "--queue-dir", args.queue_dir, "--node-id", args.node, "--lease-ttl", str(args.lease_ttl),
+        "--log", args.log, "--checkpoint-every", str(CHECKPOINT_EVERY), "--quiet",
+    ]
+    object_search.main()
+    nodes_dir = os.path.join(args.workdir, "nodes")
+    os.makedirs(nodes_dir, exist_ok=True)
+    object_search.write_json_atomic(os.path.join(nodes_dir, args.node + ".json"),
+                                    {"done": done, "frames": frames})
+
+# ------------------------
+# Test (Hauptprozess)
+# ------------------------
+def spawn(args, node, crash=False):
+    cmd = [sys.executable, os.path.abspath(__file__), "--node", node, "--workdir", args.workdir,
+           "--stub-ms", str(args.stub_ms), "--lease-ttl", str(args.lease_ttl)]
+    return subprocess.Popen(cmd + (["--crash"] if crash else []))
+
+
+def check(args):
+    root = os.path.join(args.workdir, "root")
+    queue_dir = os.path.join(args.workdir, "queue")
+    for d in (root, queue_dir, os.path.join(args.workdir, "nodes")):
+        shutil.rmtree(d, ignore_errors=True)
+    if os.path.exists(args.log):
+        os.remove(args.log)
+    os.makedirs(root)
+    source = benchmark.make_video(CHECK_SPEC, os.path.join(args.workdir, "videos"))
+    videos = []
+    for i in range(args.videos):
+        path = os.path.join(root, f"cam{i:02d}.mp4")
+        shutil.copyfile(source, path)
+        videos.append(os.path.abspath(path))
+
+    # Abstürzender Knoten zuerst, damit er sicher eine Lease hält, wenn er stirbt;
+    # er stirbt erst, nachdem er einen Checkpoint ins gemeinsame Journal geschrieben hat
+    crasher = spawn(args, "crash", crash=True)
+    if crasher.wait() != 3:
+        print("[!] Absturz-Knoten ist nicht wie geplant abgestürzt.")
+        return False
+    lease_dir = os.path.join(queue_dir, "leases")
+    held = [object_search.WorkQueue.read_json(os.path.join(lease_dir, n)) for n in os.listdir(lease_dir)]
+    held = [h["path"] for h in held if h and h.get("node") == "crash"]
+    journal_dir = os.path.join(queue_dir, "journal")
+    journals = [n for n in os.listdir(journal_dir) if n.endswith(".json")] if os.path.isdir(journal_dir) else []
+    print(f"[i] Absturz-Knoten hinterlässt Lease(s) {held} und {len(journals)} Checkpoint(s)")
+    ok = bool(held) and bool(journals)
+    if not ok:
+        print("[!] Kein verwaister Checkpoint – Übernahme ab Journal nicht prüfbar.")
+
+    t0 = time.perf_counter()
+    procs = [spawn(args, f"node{i}") for i in range(args.nodes)]
+    codes = [p.wait() for p in procs]
+    print(f"[i] {args.nodes} Knoten fertig in {time.perf_counter() - t0:.1f}s (Exit-Codes {codes})")
+
+    ok = ok and all(c == 0 for c in codes)
+    per_node = {}
+    frames = {}
+    for name in os.listdir(os.path.join(args.workdir, "nodes")):
+        with open(os.path.join(args.workdir, "nodes", name), "r", encoding="utf-8") as f:
+            rec = json.load(f)
+        per_node[name[:-5]] = [os.path.abspath(v) for v in rec["done"]]
+        frames[name[:-5]] = rec["frames"]
+    processed = [v for vs in per_node.values() for v in vs]
+    dupes = sorted({v for v in processed if processed.count(v) > 1})
+    missing = sorted(set(videos) - set(processed))
+    print(f"[i] Videos pro Knoten: " + ", ".join(f"{n}={len(vs)}" for n, vs in sorted(per_node.items())))
+    if dupes or missing:
+        print(f"[!] Doppelt: {dupes}, fehlend: {missing}")
+        ok = False
+
+    # Übernahme: Video der verwaisten Lease von einem anderen Knoten abgeschlossen, keine Lease übrig
+    work = object_search.WorkQueue(queue_dir, root)
+    for rel in held:
+        rec = object_search.WorkQueue.read_json(
+            os.path.join(work.done_dir, work._key(os.path.join(root, rel)) + ".json"))
+        if rec is None or rec.get("node") == "crash":
+            print(f"[!] Lease für {rel} wurde nicht übernommen")
+            ok = False
+            continue
+        # Fortsetzung am Checkpoint: der übernehmende Knoten wertet nur den Rest des Videos aus
+        total = benchmark.BENCH_FPS * CHECK_SPEC[3]
+        used = frames.get(rec["node"], {}).get(os.path.abspath(os.path.join(root, rel)))
+        print(f"[i] Lease für {rel} übernommen von {rec['node']}, {used} von {total} Frames ausgewertet")
+        if not used or used >= total:
+            print(f"[!] {rec['node']} hat nicht am Checkpoint fortgesetzt")
+            ok = False
+    stale = os.listdir(lease_dir)
+    left = [n for n in os.listdir(journal_dir) if n.endswith(".json")] if os.path.isdir(journal_dir) else []
+    if stale or left:
+        print(f"[!] Übrig nach dem Lauf: Leases {stale}, Checkpoints {left}")
+        ok = False
+
+    expected = sorted(benchmark.expected_log(v, CHECK_SPEC[3]) for v in videos)
+    with open(args.log, "r", encoding="utf-8") as f:
+        got = sorted(line.rstrip("\n") for line in f if line.strip())
+    if got != expected:
+        print(f"[!] Konsolidiertes Log weicht ab ({len(got)} statt {len(expected)} Zeilen)")
+        ok = False
+    print("[✓] Warteschlange ok" if ok else "[!] Warteschlange fehlerhaft")
+    return ok
+
+# ------------------------
+# CLI
+# ------------------------
+def build_argparser():
+    parser = argparse.ArgumentParser(description="Mehrprozess-Test für --queue-dir mit Ersatz-Detektor")
+    parser.add_argument("--nodes", type=int, default=3, help="Anzahl Knoten-Prozesse (Default 3)")
+    parser.add_argument("--videos", type=int, default=8, help="Anzahl Testvideos (Default 8)")
+    parser.add_argument("--workdir", default=".bench/queue_check")
+    parser.add_argument("--stub-ms", type=float, default=2.0,
+                        help="Simulierte Modell-Latenz pro Frame in ms (Default 2)")
+    parser.add_argument("--lease-ttl", type=float, default=3.0,
+                        help="Lease-Dauer in Sekunden (kurz, damit die Übernahme schnell greift)")
+    # intern: Kindprozess als Knoten
+    parser.add_argument("--node", help=argparse.SUPPRESS)
+    parser.add_argument("--crash", action="store_true", help=argparse.SUPPRESS)
+    return parser
+
+
+def main():
+    args = build_argparser().parse_args()
+    args.workdir = os.path.abspath(args.workdir)
+    args.root = os.path.join(args.workdir, "root")
+    args.queue_dir = os.path.join(args.workdir, "queue")
+    args.log = os.path.join(args.workdir, "log.txt")
+    if args.node:
+        run_node(args)
+        return
+    if not benchmark.available_encoders():
+        print("[!] ffmpeg nicht gefunden – Testvideos können nicht erzeugt werden.")
+        sys.exit(2)
+    sys.exit(0 if check(args) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+import object_search as osr
+
+
+def meta(**kw):
+    m = {"width": 1920, "height": 1080, "codec": "h264", "pix_fmt": "yuv420p", "profile": "High",
+         "level": 40, "extradata": "sha256:aa", "rate": "25/1", "avg_rate": "25/1",
+         "time_base": "1/12800", "sar": "1:1"}
+    m.update(kw)
+    return m
+
+
+def test_identical_clips_can_be_copied():
+    assert osr.can_copy_for_concat([meta(), meta()], 1920, 1080)
+
+
+def test_any_difference_forces_transcode():
+    assert not osr.can_copy_for_concat([], 1920, 1080)
+    assert not osr.can_copy_for_concat([meta()], 1280, 720)
+    assert not osr.can_copy_for_concat([meta(), meta(extradata="sha256:bb")], 1920, 1080)
+    assert not osr.can_copy_for_concat([meta(codec="hevc")], 1920, 1080)
+    assert not osr.can_copy_for_concat([meta(sar="4:3")], 1920, 1080)
+    assert not osr.can_copy_for_concat([meta(avg_rate="24000/1001")], 1920, 1080)
+    assert not osr.can_copy_for_concat([meta(extradata=None)], 1920, 1080)
+
+
+def test_concat_signature_ignores_unrelated_fields():
+    assert osr._concat_signature(meta(duration=3.0)) == osr._concat_signature(meta(duration=9.0))
+    assert osr._concat_signature(meta()) != osr._concat_signature(meta(time_base="1/90000"))
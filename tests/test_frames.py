@@ -0,0 +1,57 @@
+import object_search as osr
+
+
+def test_refine_windows_around_runs():
+    # Lauf 10..20 (step 5) und Einzeltreffer 50
+    assert osr.refine_windows([10, 15, 20, 50], 5) == [(6, 9), (21, 24), (46, 49), (51, 54)]
+
+
+def test_refine_windows_clamps_to_video():
+    # Frame 10 wurde gestichprobt (ohne Treffer) → die Fenster dazwischen bleiben getrennt
+    assert osr.refine_windows([5, 15], 5, total_frames=18) == [(1, 4), (6, 9), (11, 14), (16, 17)]
+    assert osr.refine_windows([0], 5) == [(1, 4)]
+
+
+def test_refine_windows_noop_without_sampling():
+    assert osr.refine_windows([1, 2, 3], 1) == []
+    assert osr.refine_windows([], 5) == []
+
+
+def box(x, cls=0, conf=0.9):
+    return (float(x), 0.0, float(x + 10), 10.0, cls, conf)
+
+
+def test_frame_boxes_out_of_order_add():
+    fb = osr.FrameBoxes()
+    fb.add(0, [box(1)])
+    fb.add(10, [box(2), box(3, cls=1)])
+    fb.add(5, [box(4)])  # Nachzügler aus der Verfeinerung
+    fb.add(6, [])
+    assert [f for f, _ in fb.hits()] == [0, 5, 10]
+    assert list(fb.hits())[2][1] == [0, 1]
+    assert fb.get(5)[0][0] == 4.0
+    assert fb.get(6) == []
+    assert fb.scanned_ranges() == [[0, 0], [5, 6], [10, 10]]
+    assert fb.is_scanned(6) and not fb.is_scanned(7)
+
+
+def test_frame_boxes_slice_is_independent_copy():
+    fb = osr.FrameBoxes()
+    for f in range(10):
+        fb.add(f, [box(f)] if f % 3 == 0 else [])
+    part = fb.slice(2, 7)
+    assert [f for f, _ in part.hits()] == [3, 6]
+    assert part.scanned_ranges() == [[2, 7]]
+    fb.add(10, [box(10)])
+    assert [f for f, _ in part.hits()] == [3, 6]
+
+
+def test_frame_boxes_dict_round_trip():
+    fb = osr.FrameBoxes()
+    fb.add(3, [box(1, cls=2, conf=0.5)])
+    fb.add(1, [])
+    back = osr.FrameBoxes.from_dict(fb.to_dict())
+    assert back.scanned_ranges() == fb.scanned_ranges() == [[1, 1], [3, 3]]
+    (x1, y1, x2, y2, c, cf), = back.get(3)
+    assert (x1, x2, c) == (1.0, 11.0, 2)
+    assert abs(cf - 0.5) < 1e-6
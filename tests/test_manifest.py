@@ -0,0 +1,27 @@
+import object_search as osr
+
+
+def test_manifest_change_detection(tmp_path):
+    path = str(tmp_path / "log.txt.manifest")
+    m = osr.VideoManifest(path)
+    assert m.changed("a.mp4", (1, 2, 3))
+    m.record("a.mp4", (1, 2, 3))
+    assert not m.changed("a.mp4", [1, 2, 3])
+    assert m.changed("a.mp4", (1, 2, 4))
+
+    m2 = osr.VideoManifest(path)
+    assert not m2.changed("a.mp4", (1, 2, 3))
+    m2.record("a.mp4", (5, 6, 7))
+    assert osr.VideoManifest(path).entries == {"a.mp4": (5, 6, 7)}
+
+
+def test_manifest_torn_line_and_compaction(tmp_path):
+    path = tmp_path / "m"
+    path.write_text('{"path": "a", "sig": [1, 1, 1]}\n{"path": "a", "sig": [2, 2, 2]}\n{"path": "b", "si',
+                    encoding="utf-8")
+    m = osr.VideoManifest(str(path))
+    assert m.entries == {"a": (2, 2, 2)}
+    # Beim Laden kompaktiert: ein Eintrag pro Pfad, kaputte Zeile weg
+    assert path.read_text(encoding="utf-8") == '{"path": "a", "sig": [2, 2, 2]}\n'
+    m.record("b", (3, 3, 3))
+    assert osr.VideoManifest(str(path)).entries == {"a": (2, 2, 2), "b": (3, 3, 3)}
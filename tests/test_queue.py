@@ -0,0 +1,74 @@
+import os
+import time
+
+import object_search as osr
+
+
+def make_queues(tmp_path, ttl=30.0):
+    root = tmp_path / "root"
+    root.mkdir()
+    queue_dir = str(tmp_path / "queue")
+    a = osr.WorkQueue(queue_dir, str(root), node="a", ttl=ttl, quiet=True)
+    b = osr.WorkQueue(queue_dir, str(root), node="b", ttl=ttl, quiet=True)
+    return a, b, str(root / "cam" / "x.mp4")
+
+
+def expire(lease):
+    """Heartbeat anhalten und die Lease-Datei als abgelaufen markieren (wie ein toter Knoten)."""
+    lease._stop.set()
+    lease._thread.join()
+    info = dict(lease.info, expires=time.time() - 1)
+    osr.write_json_atomic(lease.path, info)
+    lease.info = info
+
+
+def test_claim_is_exclusive_and_released(tmp_path):
+    a, b, video = make_queues(tmp_path)
+    lease = a.claim(video)
+    assert lease is not None
+    assert b.claim(video) is None
+    assert lease.renew()
+    lease.release()
+    assert os.listdir(a.lease_dir) == []
+    other = b.claim(video)
+    assert other is not None and other.info["node"] == "b"
+    other.release()
+
+
+def test_expired_lease_is_taken_over_and_old_owner_loses(tmp_path):
+    a, b, video = make_queues(tmp_path)
+    old = a.claim(video)
+    expire(old)
+    new = b.claim(video)
+    assert new is not None and new.info["token"] != old.info["token"]
+    # Der alte Besitzer merkt den Verlust beim Verlängern und lässt die neue Lease beim Freigeben liegen
+    assert not old.renew()
+    assert old.lost
+    old.release()
+    assert osr.WorkQueue.read_json(new.path)["token"] == new.info["token"]
+    assert new.renew()
+    new.release()
+    assert os.listdir(a.lease_dir) == []
+
+
+def test_take_over_puts_back_a_lease_renewed_in_the_meantime(tmp_path):
+    a, b, video = make_queues(tmp_path)
+    lease = a.claim(video)
+    stale = dict(lease.info, expires=time.time() - 1)  # so hat b die Lease gelesen
+    assert lease.renew()                                # Besitzer verlängert vor b's rename
+    assert not b._take_over(lease.path, stale)
+    assert osr.WorkQueue.read_json(lease.path)["token"] == lease.info["token"]
+    assert b.claim(video) is None
+    lease.release()
+
+
+def test_done_and_failed_markers(tmp_path):
+    a, b, video = make_queues(tmp_path)
+    sig = (1, 2, 3)
+    a.fail(video, sig, "kaputt")
+    assert b.is_failed(video, sig)
+    assert not b.is_failed(video, (1, 2, 4))
+    a.complete(video, sig, f"{video}: 00:05\n")
+    assert not b.is_failed(video, sig)
+    assert b.is_done(video, sig, only_changed=True)
+    assert not b.is_done(video, (9, 9, 9), only_changed=True)
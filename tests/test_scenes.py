@@ -0,0 +1,47 @@
+import object_search as osr
+
+
+def test_clusterer_splits_on_gap():
+    cl = osr.SceneClusterer(cluster_gap=2.0)
+    for t, ids in ((1.0, [0]), (2.5, [1]), (4.5, [0]), (7.0, [2])):
+        cl.add(t, ids)
+    assert cl.scenes == [(1.0, 4.5, (0, 1))]
+    assert cl.open_start == 7.0
+    assert cl.finish() == [(1.0, 4.5, (0, 1)), (7.0, 7.0, (2,))]
+    assert cl.open_start is None
+
+
+def test_clusterer_close_idle():
+    cl = osr.SceneClusterer(cluster_gap=2.0)
+    cl.add(1.0, [0])
+    cl.close_idle(3.0, idle=3.0)
+    assert cl.scenes == []
+    cl.close_idle(4.5, idle=3.0)
+    assert cl.scenes == [(1.0, 1.0, (0,))]
+
+
+def test_group_export_jobs_overlapping_windows():
+    scenes = [(5.0, 6.0, (0,)), (8.0, 9.0, (0,)), (20.0, 21.0, (0,))]
+    jobs = osr.group_export_jobs("v.mp4", scenes, 0, pre=2.0, post=2.0, overlay=False, fps=25)
+    assert [j[0] for j in jobs] == [0, 1]
+    assert jobs[0][1:3] == (3.0, 8.0)
+    jobs = osr.group_export_jobs("v.mp4", scenes, 2, pre=2.0, post=2.0, overlay=False, fps=25)
+    assert [j[0] for j in jobs] == [2]
+
+
+def test_group_export_jobs_compares_frames_not_seconds():
+    # Fenster 2 beginnt weniger als einen Frame nach dem Ende von Fenster 1 (13.6000…01 s vs. 13.6 s):
+    # beide landen in Frame 136 → eine Gruppe, sonst begänne Szene 2 einen Frame zu spät
+    scenes = [(10.0, 12.6, (0,)), (16.6, 17.0, (0,))]
+    jobs = osr.group_export_jobs("v.mp4", scenes, 0, pre=3.0, post=1.0, overlay=False, fps=10)
+    assert [j[0] for j in jobs] == [0, 1]
+    assert not osr.export_window_joins(16.8, 13.6, pre=3.0, fps=10)
+
+
+def test_nms_per_class():
+    a = (0, 0, 10, 10, 0, 0.9)
+    b = (1, 1, 11, 11, 0, 0.8)   # überlappt a, gleiche Klasse → weg
+    c = (1, 1, 11, 11, 1, 0.7)   # andere Klasse → bleibt
+    d = (50, 50, 60, 60, 0, 0.6)
+    assert osr.nms([b, c, a, d]) == [a, c, d]
+    assert osr.nms([a, b], iou=0.9) == [a, b]